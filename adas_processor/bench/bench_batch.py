@@ -0,0 +1,68 @@
+# bench/bench_batch.py
+"""
+So sánh fps của Detector ở các batch size (CPU).
+
+    python -m bench.bench_batch [--video clip.mp4] [--frames 64] [--sizes 1 4 8 16]
+"""
+import argparse
+import json
+import time
+
+import cv2
+
+from config.config import YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, H_FOV_DEG
+from core.detection import Detector
+from core.estimation import focal_pixels
+from core.tracking import ObjectTracker
+from bench.synthetic import synthetic_frames
+
+
+def load_frames(video, n_frames):
+    if video is None:
+        return list(synthetic_frames(n_frames))
+    cap = cv2.VideoCapture(str(video))
+    frames = []
+    while len(frames) < n_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def bench_batch_size(detector, frames, batch_size):
+    f_pix = focal_pixels(frames[0].shape[1], H_FOV_DEG)
+    tracker = ObjectTracker()
+    t0 = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        batch = frames[i:i + batch_size]
+        ts = [(i + k) / 30.0 for k in range(len(batch))]
+        detector.detect_objects_batch(batch, frames[0].shape[1], f_pix, tracker, ts)
+        detector.detect_signs_batch(batch)
+    elapsed = time.perf_counter() - t0
+    return {"batchSize": batch_size, "frames": len(frames), "seconds": round(elapsed, 3),
+            "fps": round(len(frames) / elapsed, 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--video", help="clip ngắn; mặc định dùng video giả")
+    ap.add_argument("--frames", type=int, default=64)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    ap.add_argument("--coco", default=YOLO_MODEL_PATH)
+    ap.add_argument("--sign", default=TRAFFIC_SIGN_MODEL_PATH)
+    args = ap.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    detector = Detector(args.coco, args.sign, "cpu")
+    detector.warmup(frames[0].shape[1], frames[0].shape[0])
+
+    results = [bench_batch_size(detector, frames, bs) for bs in args.sizes]
+    for r in results:
+        print(f"batch={r['batchSize']:>3}  {r['fps']:7.2f} fps  ({r['seconds']}s / {r['frames']} frames)")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bench/bench_encode.py
+"""
+So sánh 2 cách ghi video output (không chạy detector, chỉ encode):
+  - two_step: cv2.VideoWriter mp4v tạm -> finalize_video (ffmpeg libx264 đọc lại file)
+  - pipe:     FFmpegPipeWriter, frame BGR -> stdin ffmpeg, 1 lần encode
+Đo wall time và dung lượng đĩa cao nhất của thư mục output trong lúc chạy.
+
+    python -m bench.bench_encode [--video clip.mp4] [--frames 300] [--preset medium]
+"""
+import argparse
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+
+from service.video_utils import FFmpegPipeWriter, finalize_video, final_video_path
+from bench.bench_batch import load_frames
+
+
+class DiskPeak:
+    """Thread đo tổng dung lượng file trong `root` mỗi `interval` giây, giữ giá trị lớn nhất."""
+    def __init__(self, root, interval=0.01):
+        self.root = Path(root)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _size(self):
+        total = 0
+        for p in self.root.rglob("*"):
+            try:
+                total += p.stat().st_size if p.is_file() else 0
+            except FileNotFoundError:
+                pass
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._size())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._size())
+
+
+def run_two_step(frames, fps, out_dir):
+    H, W = frames[0].shape[:2]
+    raw = Path(out_dir) / "bench_raw.mp4"
+    writer = cv2.VideoWriter(str(raw), cv2.VideoWriter_fourcc(*"mp4v"), fps, (W, H))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+    t_written = time.perf_counter()
+    if finalize_video("bench_two_step", raw, Path(out_dir)) is None:
+        raise RuntimeError("finalize_video failed")
+    return t_written
+
+
+def run_pipe(frames, fps, out_dir, preset, crf, threads):
+    H, W = frames[0].shape[:2]
+    writer = FFmpegPipeWriter(final_video_path("bench_pipe", out_dir), fps, (W, H), preset, crf, threads)
+    for frame in frames:
+        writer.write(frame)
+    t_written = time.perf_counter()
+    writer.release()
+    return t_written
+
+
+def measure(name, fn):
+    """fn(out_dir) -> thời điểm (perf_counter) ghi xong frame cuối."""
+    with tempfile.TemporaryDirectory() as tmp:
+        with DiskPeak(tmp) as disk:
+            t0 = time.perf_counter()
+            t_written = fn(tmp)
+            t1 = time.perf_counter()
+        final = next(Path(tmp).glob("simulation_*.mp4"))
+        return {
+            "mode": name,
+            "seconds": round(t1 - t0, 3),
+            # thời gian sau frame cuối tới khi có file final (phần chạy tuần tự sau detection)
+            "tailSeconds": round(t1 - t_written, 3),
+            "peakDiskMB": round(disk.peak / 1e6, 2),
+            "finalMB": round(final.stat().st_size / 1e6, 2),
+        }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--video", help="clip; mặc định dùng video giả")
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--preset", default="medium")
+    ap.add_argument("--crf", type=int, default=23)
+    ap.add_argument("--threads", type=int, default=0)
+    args = ap.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    report = [
+        measure("two_step", lambda out: run_two_step(frames, args.fps, out)),
+        measure("pipe", lambda out: run_pipe(frames, args.fps, out, args.preset, args.crf, args.threads)),
+    ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
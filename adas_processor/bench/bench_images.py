@@ -0,0 +1,95 @@
+# bench/bench_images.py
+"""
+Benchmark ảnh tĩnh: ImageProcessor (core/images.py, decode song song + detect theo batch, không
+tracker / encode) vs cách cũ: mỗi ảnh qua ADASProcessor.run như video 1 frame (VideoCapture,
+ByteTrack, ffmpeg encode mp4). Ảnh JPEG sinh từ bench.synthetic, detector stub (không cần weights).
+In images/s của 2 đường, speedup và số ảnh có khoảng cách xe gần nhất lệch > 5% giữa 2 đường
+(video đi qua ByteTrack: box được làm mượt / ghép lại khi các xe chồng nhau nên lệch ở vài ảnh).
+
+    python -m bench.bench_images [--images 64] [--batch 8] [--annotate] [--out images.json]
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+import config.config as cfg
+from core.detection import Detector
+from core.images import ImageProcessor
+from core.processing import ADASProcessor
+from bench.bench_pipeline import RectangleBackend, SignStubBackend, git_commit
+from bench.synthetic import synthetic_frames
+
+
+def make_images(folder, n_images, width, height):
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    # mỗi ảnh lấy 1 frame cách nhau 7 frame -> vị trí xe khác nhau
+    for i, frame in enumerate(synthetic_frames(n_images * 7, width, height, n_objects=6)):
+        if i % 7 == 0:
+            path = folder / f"img_{i // 7:04d}.jpg"
+            cv2.imwrite(str(path), frame)
+            paths.append(path)
+    return paths
+
+
+def run_per_video(paths, tmp):
+    """Cách cũ: /process với từng ảnh (cv2.VideoCapture mở JPEG như video 1 frame)."""
+    processor = ADASProcessor(detector=Detector(RectangleBackend(), SignStubBackend()))
+    nearest = []
+    t0 = time.perf_counter()
+    for path in paths:
+        result = processor.run(path, tmp / f"{path.stem}.mp4", "bench-images", "veh", "user")
+        nearest.append(result["sensorData"][0]["distance_to_object"] if result["sensorData"] else None)
+    return len(paths) / (time.perf_counter() - t0), nearest
+
+
+def run_batched(paths, batch, annotate_dir):
+    processor = ImageProcessor(Detector(RectangleBackend(), SignStubBackend()), batch_size=batch)
+    t0 = time.perf_counter()
+    result = processor.run(paths, "bench-images", "veh", "user", annotate_dir=annotate_dir)
+    return len(paths) / (time.perf_counter() - t0), result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--images", type=int, default=64)
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--batch", type=int, default=cfg.IMAGE_BATCH_SIZE)
+    ap.add_argument("--annotate", action="store_true", help="ImageProcessor ghi cả ảnh đã vẽ box")
+    ap.add_argument("--out", help="ghi kết quả JSON ra file")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        paths = make_images(tmp / "images", args.images, args.width, args.height)
+        batched_ips, result = run_batched(paths, args.batch, tmp / "annotated" if args.annotate else None)
+        video_ips, video_nearest = run_per_video(paths, tmp)
+
+    # sensorData: 1 entry / ảnh (frame) có xe, khoảng cách xe gần nhất
+    nearest = {r["frame_index"]: r["distance_to_object"] for r in result["sensorData"]}
+    batched_nearest = [nearest.get(i) for i in range(len(paths))]
+    same = all((a is None) == (b is None) for a, b in zip(batched_nearest, video_nearest))
+    differ = sum(abs(a - b) > 0.05 * b for a, b in zip(batched_nearest, video_nearest) if a is not None and b)
+    report = {
+        "commit": git_commit(),
+        "config": {"images": args.images, "size": [args.width, args.height], "batchSize": args.batch,
+                   "decodeWorkers": cfg.IMAGE_DECODE_WORKERS, "annotate": args.annotate},
+        "perImageVideo": {"imagesPerS": round(video_ips, 2)},
+        "batched": {"imagesPerS": round(batched_ips, 2), **result["summary"]["images"]},
+        "speedup": round(batched_ips / video_ips, 1),
+        "sameVehiclePresence": same,
+        "nearestDistDiffer5pct": differ,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
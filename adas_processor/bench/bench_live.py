@@ -0,0 +1,117 @@
+# bench/bench_live.py
+"""
+Benchmark chế độ live: 1 thread phát frame giả (bench.synthetic) đúng nhịp fps vào FIFO như camera,
+LiveProcessor đọc "pipe:<fifo>" và xử lý. Đo latency capture -> xử lý xong frame / capture -> alert
+(p50/p95/p99) và tỉ lệ frame bị bỏ. Mặc định dùng detector stub của bench_pipeline (không cần
+weights); --infer-ms giả lập model chậm hơn camera để thấy latency vẫn bị chặn khi phải bỏ frame.
+
+    python -m bench.bench_live --seconds 10 --fps 30 --infer-ms 50 --out live.json
+    python -m bench.bench_live --models                  # YOLO thật (config.config)
+    python -m bench.bench_live --url http://127.0.0.1:8090/cam.mjpg --seconds 20 --models
+
+Stream thử bằng ffmpeg cho --url:
+    ffmpeg -re -stream_loop -1 -i clip.mp4 -f mpjpeg -listen 1 http://127.0.0.1:8090/cam.mjpg
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from config.config import YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE
+from core.detection import Detector
+from core.live import LiveProcessor, LiveSource
+from bench.bench_pipeline import RectangleBackend, SignStubBackend, git_commit
+from bench.synthetic import synthetic_frames
+
+
+class SlowBackend(RectangleBackend):
+    """RectangleBackend + thời gian inference cố định / frame."""
+    def __init__(self, delay_s: float):
+        super().__init__()
+        self.delay_s = delay_s
+
+    def predict(self, frames, imgsz, conf):
+        time.sleep(self.delay_s * len(frames))
+        return super().predict(frames, imgsz, conf)
+
+
+def feed(path, n_frames, width, height, fps, objects):
+    """Ghi frame BGR thô vào FIFO theo nhịp thời gian thực (camera không chờ consumer)."""
+    with open(path, "wb") as f:
+        t0 = time.perf_counter()
+        for i, frame in enumerate(synthetic_frames(n_frames, width, height, n_objects=objects)):
+            delay = t0 + i / fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                f.write(frame.tobytes())
+            except BrokenPipeError:
+                return
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="stream có sẵn thay cho generator")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--objects", type=int, default=6)
+    ap.add_argument("--infer-ms", type=float, default=0.0, help="stub: thêm N ms inference / frame")
+    ap.add_argument("--models", action="store_true", help="dùng YOLO thật thay cho stub")
+    ap.add_argument("--out", help="ghi kết quả JSON ra file")
+    args = ap.parse_args()
+
+    if args.models:
+        detector = Detector(YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE)
+        detector.warmup(args.width, args.height)
+    else:
+        backend = SlowBackend(args.infer_ms / 1000) if args.infer_ms else RectangleBackend()
+        detector = Detector(backend, SignStubBackend())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        feeder = None
+        if args.url:
+            source = LiveSource(args.url, fps=args.fps)
+            duration = args.seconds
+        else:
+            fifo = Path(tmp) / "camera.bgr"
+            os.mkfifo(fifo)
+            feeder = threading.Thread(target=feed, daemon=True, args=(
+                fifo, int(args.seconds * args.fps), args.width, args.height, args.fps, args.objects))
+            feeder.start()
+            # mở FIFO chờ writer -> sau dòng này generator đã bắt đầu phát
+            source = LiveSource(f"pipe:{fifo}", size=(args.width, args.height), fps=args.fps)
+            duration = None   # tới khi generator đóng pipe
+        result = LiveProcessor(detector).run(source, "bench-live", "bench-vehicle", "user", duration_s=duration)
+        if feeder is not None:
+            feeder.join(timeout=5)
+
+    summary = result["summary"]
+    live = summary["live"]
+    report = {
+        "commit": git_commit(),
+        "config": {
+            "source": "url" if args.url else "pipe", "seconds": args.seconds, "fps": args.fps,
+            "size": [args.width, args.height], "inferMs": args.infer_ms, "models": args.models,
+        },
+        "processedFps": summary["pipeline"]["fps"],
+        "captured": live["captured"],
+        "processed": summary["pipeline"]["frames"],
+        "dropped": live["dropped"],
+        "dropRate": round(live["dropped"] / live["captured"], 3) if live["captured"] else 0.0,
+        "frameLatency": live["frameLatency"],
+        "alertLatency": live["alertLatency"],
+        "alerts": summary.get("totalAlerts"),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# bench/bench_pipeline.py
+"""
+Benchmark toàn bộ ADASProcessor.run trên CPU, không cần weights: video giả (bench.synthetic)
++ detector stub tìm các hình chữ nhật bằng OpenCV, qua ByteTrack / post-processing / vẽ / encode thật.
+
+Đo từng stage (decode, detect, track, signs, postprocess, draw, encode, finalize) với p50/p95/p99,
+latency / frame, fps, peak RSS. Kết quả JSON để so sánh giữa các commit:
+
+    python -m bench.bench_pipeline --out bench_head.json
+    python -m bench.bench_pipeline --compare bench_head.json   # in thay đổi so với lần trước
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import config.config as cfg
+from core.backends import DetectorBackend
+from core.detection import Detector
+from core.processing import ADASProcessor
+from bench.synthetic import make_synthetic_video
+
+SKY, ROAD = (200, 170, 120), (70, 70, 70)
+
+
+class RectangleBackend(DetectorBackend):
+    """'Model' stub: mọi vùng khác màu trời / đường / vạch kẻ = 1 xe (class 2)."""
+    names = {2: "car"}
+
+    def __init__(self, scale: int = 4):
+        self.scale = scale
+
+    def predict(self, frames, imgsz, conf):
+        out = []
+        for frame in frames:
+            small = frame[::self.scale, ::self.scale].astype(np.int16)
+            # video nén (mp4v) làm lệch màu vài đơn vị -> so với ngưỡng
+            bg = np.zeros(small.shape[:2], dtype=bool)
+            for color in (SKY, ROAD, (255, 255, 255)):
+                bg |= np.abs(small - color).max(axis=2) < 24
+            n, _, stats, _ = cv2.connectedComponentsWithStats((~bg).astype(np.uint8), connectivity=4)
+            boxes = [[x * self.scale, y * self.scale, (x + w) * self.scale, (y + h) * self.scale, 0.9, 2]
+                     for x, y, w, h, area in stats[1:] if area >= 16]
+            out.append(np.array(boxes, dtype=np.float32).reshape(-1, 6))
+        return out
+
+
+class SignStubBackend(DetectorBackend):
+    """1 biển báo cố định / frame."""
+    names = {0: "stop"}
+
+    def predict(self, frames, imgsz, conf):
+        return [np.array([[10, 10, 40, 40, 0.9, 0]], dtype=np.float32) for _ in frames]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=cfg.BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """{metric: [baseline, current, %thay đổi]} cho fps, latency và thời gian trung bình từng stage."""
+    def pct(a, b):
+        return round((b - a) / a * 100, 1) if a else None
+
+    rows = {"fps": (baseline["fps"], current["fps"])}
+    for q in ("p50Ms", "p95Ms", "p99Ms"):
+        rows[f"frameLatency.{q}"] = (baseline["profile"]["frameLatency"][q], current["profile"]["frameLatency"][q])
+    for name, st in current["profile"]["stages"].items():
+        old = baseline["profile"]["stages"].get(name)
+        if old:
+            rows[f"{name}.meanMs"] = (old["meanMs"], st["meanMs"])
+    rows["peakRssMb"] = (baseline["profile"]["peakRssMb"], current["profile"]["peakRssMb"])
+    return {k: [a, b, pct(a, b)] for k, (a, b) in rows.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--objects", type=int, default=6)
+    ap.add_argument("--no-skip", action="store_true", help="detect mọi frame (tắt adaptive skip)")
+    ap.add_argument("--out", help="ghi kết quả JSON ra file")
+    ap.add_argument("--compare", help="file JSON của lần chạy trước")
+    args = ap.parse_args()
+
+    detector = Detector(RectangleBackend(), SignStubBackend())
+    processor = ADASProcessor(detector=detector, adaptive_skip=not args.no_skip)
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_synthetic_video(Path(tmp) / "synthetic.mp4", args.frames, args.width, args.height,
+                                     n_objects=args.objects)
+        result = processor.run(video, Path(tmp) / "out.mp4", "bench", "veh", "user", profile=True)
+
+    summary = result["summary"]
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "config": {
+            "frames": args.frames, "size": [args.width, args.height], "objects": args.objects,
+            "adaptiveSkip": not args.no_skip, "batchSize": cfg.INFERENCE_BATCH_SIZE,
+            "queueDepth": cfg.PIPELINE_QUEUE_DEPTH, "encoder": cfg.VIDEO_ENCODER,
+        },
+        "fps": summary["pipeline"]["fps"],
+        "wallTimeS": summary["pipeline"]["wallTimeS"],
+        "frameSchedule": summary["frameSchedule"],
+        "profile": summary["profile"],
+    }
+    if args.compare:
+        report["compare"] = compare(report, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
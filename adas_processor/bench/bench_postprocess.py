@@ -0,0 +1,119 @@
+# bench/bench_postprocess.py
+"""
+Micro-benchmark post-processing object của 1 frame (sau ByteTrack): vòng lặp từng box
+(cách cũ, giữ lại ở đây làm chuẩn) vs Detector.objects_from_tracks trên mảng + mask luật
+collision / obstacle của AlertEngine. Kiểm tra data và tập box (type, track_id) bị cảnh báo giống hệt nhau
+(exit code 1 nếu khác).
+
+    python -m bench.bench_postprocess [--boxes 10 50 200] [--frames 200]
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from config.config import COCO_NAMES, VEHICLES, DIST_WARN_M, H_FOV_DEG
+from core.alerts import COLLISION, OBSTACLE
+from core.detection import Detector
+from core.estimation import est_distance_m, focal_pixels
+from core.tracking import ObjectTracker
+
+
+def reference_postprocess(xyxy, ids, classes, f_pix, tracker, frame_ts=None):
+    """Cách cũ: từng box một."""
+    boxes = []
+    for (x1, y1, x2, y2), track_id, cls in zip(xyxy.tolist(), ids.tolist(), classes.tolist()):
+        cls = int(cls)
+        if cls not in COCO_NAMES:
+            continue
+        boxes.append((cls, (int(x1), int(y1), int(x2), int(y2)), int(track_id)))
+
+    data, alerts = [], []
+    for cls, (x1, y1, x2, y2), track_id in boxes:
+        name = COCO_NAMES[cls]
+        dist, speed_kmh, v_rel, ttc, warn = None, None, None, None, False
+        obstacle_detected = False
+        if cls in VEHICLES and track_id != -1:
+            dist = est_distance_m((x1, y1, x2, y2), f_pix, cls)
+            speed_kmh, v_rel = tracker.estimate_speed(track_id, dist, frame_ts)
+            if v_rel is not None and v_rel > 0.1:
+                ttc = dist / v_rel
+            if dist is not None and dist < DIST_WARN_M:
+                warn = True
+                obstacle_detected = True
+                alerts.append(("collision", track_id))
+            elif dist is not None and dist < DIST_WARN_M * 1.5:
+                alerts.append(("obstacle", track_id))
+        data.append({"cls": cls, "name": name, "dist": dist, "speed": speed_kmh, "ttc": ttc,
+                     "obstacle_detected": obstacle_detected, "lane_status": "within",
+                     "bbox": [x1, y1, x2, y2], "track_id": track_id, "warn": bool(warn)})
+    return data, alerts
+
+
+def vectorized_postprocess(xyxy, ids, classes, f_pix, tracker, frame_ts=None):
+    data, objs = Detector.objects_from_tracks(xyxy, ids, classes, f_pix, tracker, frame_ts)
+    collision, obstacle = COLLISION.match(objs), OBSTACLE.match(objs)
+    return data, [("collision" if collision[i] else "obstacle", int(objs.track_id[i]))
+                  for i in np.flatnonzero(collision | obstacle)]
+
+
+def make_track_frames(n_boxes, n_frames, width=1280, height=720, seed=0):
+    """Track giả: box xe tiến lại gần (rộng dần), vài class ngoài COCO_NAMES, vài box chưa có id."""
+    rng = np.random.default_rng(seed)
+    classes = rng.choice([0, 1, 2, 3, 5, 7, 9, 11, 15], n_boxes).astype(np.float32)
+    ids = np.arange(1, n_boxes + 1, dtype=np.float32)
+    ids[rng.random(n_boxes) < 0.1] = -1
+    x1 = rng.uniform(0, width - 400, n_boxes)
+    y1 = rng.uniform(height / 3, height - 200, n_boxes)
+    w0 = rng.uniform(20, 120, n_boxes)
+    grow = rng.uniform(-0.5, 3.0, n_boxes)
+    frames = []
+    for k in range(n_frames):
+        w = np.clip(w0 + grow * k, 4, 380)
+        xyxy = np.stack([x1, y1, x1 + w, y1 + w * 0.6], axis=1).astype(np.float32)
+        frames.append((xyxy, ids, classes))
+    return frames
+
+
+def run(fn, frames, f_pix, repeat=3, fps=30.0):
+    """Thời gian tốt nhất trong `repeat` lần (mỗi lần tracker mới) + output lần cuối."""
+    best = float("inf")
+    for _ in range(repeat):
+        tracker = ObjectTracker()
+        out = []
+        t0 = time.perf_counter()
+        for k, (xyxy, ids, classes) in enumerate(frames):
+            out.append(fn(xyxy, ids, classes, f_pix, tracker, k / fps))
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--boxes", type=int, nargs="+", default=[10, 50, 200])
+    ap.add_argument("--frames", type=int, default=200)
+    args = ap.parse_args()
+
+    f_pix = focal_pixels(1280, H_FOV_DEG)
+    report, identical = [], True
+    for n in args.boxes:
+        frames = make_track_frames(n, args.frames)
+        t_ref, ref = run(reference_postprocess, frames, f_pix)
+        t_vec, vec = run(vectorized_postprocess, frames, f_pix)
+        same = ref == vec
+        identical &= same
+        report.append({
+            "boxes": n,
+            "loopUsPerFrame": round(t_ref / len(frames) * 1e6, 1),
+            "vectorizedUsPerFrame": round(t_vec / len(frames) * 1e6, 1),
+            "speedup": round(t_ref / t_vec, 2),
+            "identical": same,
+        })
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# bench/bench_startup.py
+"""
+Thời gian khởi động (cold start) của service và CLI:
+- `python -X importtime` cho từng module: tổng thời gian import, module tốn nhất, và kiểm tra không
+  import torch / ultralytics / onnxruntime (chỉ được load khi worker cần inference)
+- service: spawn uvicorn, đo tới lúc port nhận kết nối ("listening") và tới lúc /readyz = 200
+  (worker đã load model, không tính vào budget)
+Exit code 1 nếu vượt --budget-s hoặc có module nặng bị import sớm.
+
+    python -m bench.bench_startup [--budget-s 3] [--runs 3] [--out startup.json]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from config.config import BASE_DIR
+
+HEAVY = ("torch", "ultralytics", "onnxruntime")
+MODULES = ("config.config", "core.processing", "core.live", "service.adas_service",
+           "demo.run_batch", "demo.replay", "demo.live")
+
+
+def import_profile(module: str, top: int = 5):
+    """Chạy `python -X importtime -c 'import module'` trong process mới."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=BASE_DIR,
+                          capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cum_us)))
+    total = next(cum for name, _, cum in rows if name == module)
+    heavy = sorted({name for name, _, _ in rows if name in HEAVY})
+    slowest = sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+    return {"importMs": round(total / 1000, 1), "heavy": heavy,
+            "slowestSelfMs": {name: round(us / 1000, 1) for name, us, _ in slowest}}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def service_start(timeout_s: float = 120.0):
+    """(giây tới khi port listening, giây tới khi /readyz = 200 hoặc None)."""
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "service.adas_service:app", "--port", str(port)],
+                            cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            env={**os.environ, "PYTHONUNBUFFERED": "1"})
+    listening = ready = None
+    try:
+        while time.perf_counter() - t0 < timeout_s and proc.poll() is None:
+            if listening is None:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                    listening = time.perf_counter() - t0
+                except OSError:
+                    time.sleep(0.01)
+                    continue
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1):
+                    ready = time.perf_counter() - t0
+                    break
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.05)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return listening, ready
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--budget-s", type=float, default=3.0, help="tối đa từ lúc spawn tới khi service listening")
+    ap.add_argument("--runs", type=int, default=3, help="số lần khởi động service (lấy median)")
+    ap.add_argument("--out", help="ghi kết quả JSON ra file")
+    args = ap.parse_args()
+
+    report = {"python": sys.version.split()[0], "imports": {m: import_profile(m) for m in MODULES}}
+    starts = [service_start() for _ in range(args.runs)]
+    listening = [s[0] for s in starts if s[0] is not None]
+    ready = [s[1] for s in starts if s[1] is not None]
+    report["service"] = {
+        "listeningS": round(statistics.median(listening), 3) if listening else None,
+        "readyS": round(statistics.median(ready), 3) if ready else None,
+        "runs": [[round(v, 3) if v is not None else None for v in s] for s in starts],
+        "budgetS": args.budget_s,
+    }
+    failures = [f"{m} imports {', '.join(r['heavy'])}" for m, r in report["imports"].items() if r["heavy"]]
+    if len(listening) < len(starts):
+        failures.append("service did not start listening")
+    elif report["service"]["listeningS"] > args.budget_s:
+        failures.append(f"service listening after {report['service']['listeningS']}s > {args.budget_s}s")
+    report["failures"] = failures
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
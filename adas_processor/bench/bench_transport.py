@@ -0,0 +1,155 @@
+# bench/bench_transport.py
+"""
+Benchmark transport frame giữa 2 process (decode -> inference): multiprocessing.Queue chở nguyên
+frame (pickle) vs FrameRing (core/frame_ring.py, shared memory, queue chỉ chở slot index).
+Producer (process spawn) ghi 1 frame BGR / lần như decoder, consumer giữ `--depth` frame (như batch
++ queue encoder) rồi mới trả slot. Đo fps, MB/s, latency producer -> consumer (p50/p95) và CPU
+của consumer / frame ở 720p và 1080p.
+
+--pipeline: thêm ADASProcessor end-to-end (detector stub) với PIPELINE_TRANSPORT "thread" vs "shm".
+
+    python -m bench.bench_transport [--frames 600] [--sizes 1280x720 1920x1080] [--pipeline] [--out t.json]
+"""
+import argparse
+import collections
+import json
+import multiprocessing as mp
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from core.frame_ring import FrameRing, ring_slots
+from bench.bench_pipeline import RectangleBackend, SignStubBackend, git_commit
+
+
+def _base_frame(shape):
+    return np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+
+def _queue_producer(n_frames, shape, frames_q):
+    base = _base_frame(shape)
+    for i in range(n_frames):
+        frame = base.copy()   # decoder cấp phát frame mới mỗi lần
+        frame[0, 0, 0] = i % 256
+        frames_q.put((i, time.perf_counter(), frame))
+    frames_q.put(None)
+
+
+def _ring_producer(n_frames, spec, free_q, ready_q):
+    ring = FrameRing.attach(spec)
+    base = _base_frame(ring.shape)
+    for i in range(n_frames):
+        slot = free_q.get()
+        np.copyto(ring.frames[slot], base)   # decoder ghi thẳng vào slot
+        ring.frames[slot, 0, 0, 0] = i % 256
+        ring.seq[slot] = i
+        ready_q.put((slot, i, time.perf_counter()))
+    ready_q.put(None)
+    ring.close()
+
+
+def _report(name, shape, n, wall, cpu, latency):
+    p50, p95 = np.percentile(latency, (50, 95)) * 1000
+    return {"transport": name, "fps": round(n / wall, 1),
+            "mbPerS": round(n * int(np.prod(shape)) / wall / 1e6, 1),
+            "latencyP50Ms": round(p50, 2), "latencyP95Ms": round(p95, 2),
+            "consumerCpuUsPerFrame": round(cpu / n * 1e6, 1)}
+
+
+def run_queue(shape, n_frames, depth):
+    ctx = mp.get_context("spawn")
+    frames_q = ctx.Queue(maxsize=depth)
+    proc = ctx.Process(target=_queue_producer, args=(n_frames, shape, frames_q), daemon=True)
+    proc.start()
+    first = frames_q.get()   # bỏ thời gian spawn process
+    held, latency = collections.deque(), []
+    t0, c0 = time.perf_counter(), time.process_time()
+    item, n = first, 0
+    while item is not None:
+        i, ts, frame = item
+        latency.append(time.perf_counter() - ts)
+        assert frame[0, 0, 0] == i % 256
+        held.append(frame)
+        if len(held) > depth:
+            held.popleft()
+        n += 1
+        item = frames_q.get()
+    wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    proc.join()
+    return _report("queue", shape, n, wall, cpu, latency)
+
+
+def run_ring(shape, n_frames, depth):
+    ctx = mp.get_context("spawn")
+    ring = FrameRing(ring_slots(depth), shape)
+    free_q, ready_q = ctx.Queue(), ctx.Queue()
+    for slot in range(ring.slots):
+        free_q.put(slot)
+    proc = ctx.Process(target=_ring_producer, args=(n_frames, ring.spec, free_q, ready_q), daemon=True)
+    proc.start()
+    first = ready_q.get()
+    held, latency = collections.deque(), []
+    t0, c0 = time.perf_counter(), time.process_time()
+    item, n = first, 0
+    while item is not None:
+        slot, i, ts = item
+        latency.append(time.perf_counter() - ts)
+        frame = ring.frames[slot]   # view, không copy
+        assert frame[0, 0, 0] == i % 256
+        held.append(slot)
+        if len(held) > depth:
+            free_q.put(held.popleft())
+        n += 1
+        item = ready_q.get()
+    wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    proc.join()
+    del frame
+    ring.close()
+    return _report("shm", shape, n, wall, cpu, latency)
+
+
+def run_pipeline(width, height, n_frames):
+    from core.detection import Detector
+    from core.processing import ADASProcessor
+    from bench.synthetic import make_synthetic_video
+
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_synthetic_video(Path(tmp) / "synthetic.mp4", n_frames, width, height)
+        for transport in ("thread", "shm"):
+            processor = ADASProcessor(detector=Detector(RectangleBackend(), SignStubBackend()), transport=transport)
+            result = processor.run(video, Path(tmp) / f"{transport}.mp4", "bench-transport", "veh", "user")
+            stats = result["summary"]["pipeline"]
+            out[transport] = {k: stats[k] for k in ("fps", "decodeFps", "inferFps", "encodeFps")}
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--sizes", nargs="+", default=["1280x720", "1920x1080"], metavar="WxH")
+    ap.add_argument("--depth", type=int, default=8, help="số frame consumer giữ trước khi trả slot")
+    ap.add_argument("--pipeline", action="store_true", help="thêm ADASProcessor thread vs shm (detector stub)")
+    ap.add_argument("--out", help="ghi kết quả JSON ra file")
+    args = ap.parse_args()
+
+    report = {"commit": git_commit(), "frames": args.frames, "depth": args.depth, "sizes": {}}
+    for size in args.sizes:
+        width, height = map(int, size.lower().split("x"))
+        shape = (height, width, 3)
+        rows = [run_queue(shape, args.frames, args.depth), run_ring(shape, args.frames, args.depth)]
+        entry = {"transport": rows, "speedup": round(rows[1]["fps"] / rows[0]["fps"], 2)}
+        if args.pipeline:
+            entry["pipeline"] = run_pipeline(width, height, min(args.frames, 300))
+        report["sizes"][size] = entry
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
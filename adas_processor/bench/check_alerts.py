@@ -0,0 +1,168 @@
+# bench/check_alerts.py
+"""
+Kiểm tra AlertEngine (core/alerts.py) không cần model: các kịch bản dựng tay trên FrameObjects
+(cooldown theo timestamp video, scope track / sign, ngưỡng theo DIST_WARN_M / TTC_WARN_S, FCW theo
+TTC, luật tự định nghĩa) + throughput đánh giá luật trên frame ngẫu nhiên (µs / frame, detection / giây).
+Exit code 1 nếu có kịch bản sai.
+
+    python -m bench.check_alerts [--objects 50] [--frames 3000] [--out alerts.json]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from core.alerts import AlertEngine, AlertRule, FrameObjects, LANE_CODES, RULES
+from core.params import TuningParams
+
+ALL_RULES = tuple(RULES)
+
+
+def objects(cls=(), track_id=(), dist=(), ttc=(), lane=None) -> FrameObjects:
+    n = len(cls)
+    return FrameObjects(np.asarray(cls, np.int64), np.asarray(track_id, np.int64),
+                        np.asarray(dist, np.float64), np.asarray(ttc, np.float64),
+                        np.zeros(n, np.int8) if lane is None else np.array([LANE_CODES[l] for l in lane], np.int8))
+
+
+def sign(name, conf=0.9):
+    return {"cls": 0, "name": name, "conf": conf, "bbox": [0, 0, 10, 10]}
+
+
+def run(engine, frames):
+    """[(frame_ts, objs, signs)] -> [(frame_ts, type, description[, track_id])]."""
+    out = []
+    for ts, objs, signs in frames:
+        for a in engine.evaluate(ts, objs, signs):
+            out.append((ts, a["type"], a["description"]) + ((a["track_id"],) if "track_id" in a else ()))
+    return out
+
+
+def scenarios():
+    nan = float("nan")
+    car_close = objects([2], [1], [5.0], [nan])            # < DIST_WARN_M (8m)
+    car_near = objects([2], [1], [10.0], [nan])            # [8, 12) -> obstacle
+    cases = {}
+
+    # cooldown 5s theo timestamp video, strict >: 5.0s sau chưa phát lại, 5.01s thì phát
+    frames = [(t, car_close, []) for t in (0.0, 1.0, 4.9, 5.0, 5.01, 6.0)]
+    cases["cooldown_video_ts"] = (run(AlertEngine(), frames),
+                                  [(0.0, "collision", "Collision risk detected"),
+                                   (5.01, "collision", "Collision risk detected")])
+
+    # mỗi luật global có cooldown riêng; không phải xe / chưa có track (dist NaN) không bao giờ khớp
+    frames = [(0.0, car_near, []), (1.0, car_close, []),
+              (7.0, objects([0, 2], [5, -1], [nan, nan], [nan, nan]), [])]
+    cases["per_rule_cooldown"] = (run(AlertEngine(), frames),
+                                  [(0.0, "obstacle", "Obstacle detected ahead"),
+                                   (1.0, "collision", "Collision risk detected")])
+
+    # ngưỡng khoảng cách theo params.dist_warn_m (replay --set DIST_WARN_M=4)
+    params = TuningParams(dist_warn_m=4.0)
+    cases["dist_warn_param"] = (run(AlertEngine(params=params), [(0.0, car_close, [])]),
+                                [(0.0, "obstacle", "Obstacle detected ahead")])
+
+    # biển báo: cooldown theo tên biển báo
+    frames = [(0.0, objects(), [sign("stop"), sign("speed_50")]), (2.0, objects(), [sign("stop")]),
+              (3.0, objects(), [sign("no_entry")]), (5.5, objects(), [sign("stop"), sign("stop")])]
+    cases["sign_scope"] = (run(AlertEngine(), frames),
+                           [(0.0, "traffic_sign", "Detected sign: stop"),
+                            (0.0, "traffic_sign", "Detected sign: speed_50"),
+                            (3.0, "traffic_sign", "Detected sign: no_entry"),
+                            (5.5, "traffic_sign", "Detected sign: stop")])
+
+    # FCW: TTC < TTC_WARN_S, cooldown riêng từng track, box chưa có track bỏ qua
+    fcw = AlertEngine(["forward_collision"])
+    frames = [(0.0, objects([2, 7, 2, 2], [1, 2, 3, -1], [20, 30, 40, 10], [2.0, 1.5, 6.0, 1.0]), []),
+              (1.0, objects([2, 7, 2], [1, 2, 3], [18, 28, 20], [1.8, 1.4, 2.5]), []),
+              (5.5, objects([2], [1], [9], [0.9]), [])]
+    cases["fcw_track_scope"] = (run(fcw, frames),
+                                [(0.0, "collision", "Forward collision warning: car TTC 2.0s", 1),
+                                 (0.0, "collision", "Forward collision warning: truck TTC 1.5s", 2),
+                                 (1.0, "collision", "Forward collision warning: car TTC 2.5s", 3),
+                                 (5.5, "collision", "Forward collision warning: car TTC 0.9s", 1)])
+
+    # ngưỡng TTC theo params.ttc_warn_s (replay --set TTC_WARN_S=2): TTC 2.5s không còn khớp
+    frames = [(0.0, objects([2, 2], [1, 2], [20, 15], [2.5, 1.5]), [])]
+    cases["ttc_warn_param"] = (run(AlertEngine(["forward_collision"], TuningParams(ttc_warn_s=2.0)), frames),
+                               [(0.0, "collision", "Forward collision warning: car TTC 1.5s", 2)])
+
+    # luật tự định nghĩa: lane departure theo track, cooldown 1s, mô tả có khoảng cách
+    custom = AlertRule("lane_track", "lane_departure", "high", "{name} leaving lane at {dist:.0f}m",
+                       scope="track", lanes=("departing", "crossed"), cooldown_s=1.0)
+    frames = [(0.0, objects([2, 2], [1, 2], [12, 15], [nan, nan], ["departing", "within"]), []),
+              (0.5, objects([2, 2], [1, 2], [12, 15], [nan, nan], ["crossed", "crossed"]), []),
+              (1.2, objects([2], [1], [11], [nan], ["crossed"]), [])]
+    cases["custom_rule"] = (run(AlertEngine([custom]), frames),
+                            [(0.0, "lane_departure", "car leaving lane at 12m", 1),
+                             (0.5, "lane_departure", "car leaving lane at 15m", 2),
+                             (1.2, "lane_departure", "car leaving lane at 11m", 1)])
+
+    # tất định: cùng input -> cùng output, không phụ thuộc thời gian thực
+    frames = random_frames(20, 300, seed=1)
+    cases["deterministic"] = (run(AlertEngine(ALL_RULES), frames), run(AlertEngine(ALL_RULES), frames))
+
+    try:
+        AlertEngine(["no_such_rule"])
+        cases["unknown_rule"] = ("accepted", "ValueError")
+    except ValueError:
+        cases["unknown_rule"] = ("ValueError", "ValueError")
+    return cases
+
+
+def random_frames(n_objects, n_frames, fps=30.0, seed=0):
+    """Frame ngẫu nhiên: xe có / không có track, khoảng cách 2-60m, TTC thưa, lane phần lớn within."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for k in range(n_frames):
+        cls = rng.choice([0, 2, 3, 5, 7], n_objects)
+        ids = rng.integers(-1, 3 * n_objects, n_objects)
+        veh = (cls != 0) & (ids != -1)
+        dist = np.where(veh, rng.uniform(2, 60, n_objects), np.nan)
+        ttc = np.where(veh & (rng.random(n_objects) < 0.3), rng.uniform(0.5, 10, n_objects), np.nan)
+        lane = rng.choice(4, n_objects, p=[0.94, 0.03, 0.02, 0.01]).astype(np.int8)
+        signs = [sign(f"sign{int(c)}") for c in rng.integers(0, 10, rng.integers(0, 3))] if k % 3 == 0 else []
+        frames.append((k / fps, FrameObjects(cls, ids, dist, ttc, lane), signs))
+    return frames
+
+
+def throughput(n_objects, n_frames, rules, repeat=3):
+    frames = random_frames(n_objects, n_frames)
+    best, alerts = float("inf"), 0
+    for _ in range(repeat):
+        engine = AlertEngine(rules)
+        t0 = time.perf_counter()
+        alerts = sum(len(engine.evaluate(ts, objs, signs)) for ts, objs, signs in frames)
+        best = min(best, time.perf_counter() - t0)
+    return {"objects": n_objects, "rules": len(rules), "usPerFrame": round(best / n_frames * 1e6, 1),
+            "detectionsPerS": int(n_objects * n_frames / best), "alerts": alerts}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--objects", type=int, nargs="+", default=[10, 50, 200])
+    ap.add_argument("--frames", type=int, default=3000)
+    ap.add_argument("--out", help="ghi kết quả JSON ra file")
+    args = ap.parse_args()
+
+    report = {"scenarios": {}, "throughput": []}
+    failed = False
+    for name, (got, expected) in scenarios().items():
+        ok = got == expected
+        failed |= not ok
+        report["scenarios"][name] = "ok" if ok else {"got": got, "expected": expected}
+    for n in args.objects:
+        report["throughput"].append(throughput(n, args.frames, ALL_RULES))
+
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# bench/check_backend_parity.py
+"""
+Parity check torch vs onnx backend: cùng frame, so khớp từng box (cùng class,
+IoU >= --iou, |conf chênh| <= --score-tol), và so output thô của model (tensor (B, 4 + nc, anchors)
+trước NMS, cùng input đã letterbox): lệch box <= --raw-box-tol px, lệch score <= --raw-score-tol.
+Batch khác kích thước (frame + crop, như ảnh tĩnh khác size / ROI crop + frame khám phá): onnx phải
+chạy được (letterbox cố định imgsz x imgsz) và khớp torch trên cùng batch.
+Exit code 1 nếu output thô lệch, batch khác kích thước lỗi, hoặc tỉ lệ khớp box < --min-match. Model
+không ra box nào trên ngưỡng (weights chưa train) thì chỉ còn so output thô -> in cảnh báo, thử hạ --conf.
+
+    python -m bench.check_backend_parity [--video clip.mp4] [--frames 30] [--conf 0.05]
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from config.config import YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, COCO_IMGSZ, COCO_CONF, SIGN_IMGSZ, SIGN_CONF
+from core.backends import TorchBackend, OnnxBackend, letterbox
+from bench.bench_batch import load_frames
+from bench.check_frame_skip import REFERENCE_CLIP
+
+
+def iou_matrix(a, b):
+    iw = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    ih = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match(ref, other, iou_thres, score_tol, conf, margin=0.05):
+    """
+    Đếm box của ref có box tương ứng trong other. Box có conf sát ngưỡng (conf + margin)
+    bỏ qua vì có thể rơi ra/vào ngưỡng chỉ do sai số float.
+    """
+    ref = ref[ref[:, 4] >= conf + margin]
+    if len(ref) == 0:
+        return 0, 0
+    if len(other) == 0:
+        return 0, len(ref)
+    ious = iou_matrix(ref[:, :4], other[:, :4])
+    ious[ref[:, None, 5] != other[None, :, 5]] = 0
+    matched = 0
+    for i in range(len(ref)):
+        j = int(ious[i].argmax())
+        if ious[i, j] >= iou_thres and abs(ref[i, 4] - other[j, 4]) <= score_tol:
+            matched += 1
+    return matched, len(ref)
+
+
+def raw_outputs(torch_be, onnx_be, frame, imgsz, auto=True):
+    """Output thô (trước NMS) của 2 backend trên cùng 1 input -> (torch, onnx), shape (1, 4 + nc, anchors)."""
+    import torch
+
+    img, _, _ = letterbox(frame, imgsz, auto=auto)
+    x = np.ascontiguousarray(img[None, ..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+    with torch.no_grad():
+        ref = torch_be.model.model.eval()(torch.from_numpy(x))
+    ref = (ref[0] if isinstance(ref, (list, tuple)) else ref).cpu().numpy()
+    return ref, onnx_be.session.run(None, {onnx_be.input_name: x})[0]
+
+
+def compare(name, torch_be, onnx_be, frames, imgsz, conf, args):
+    matched = total = 0
+    t_torch = t_onnx = 0.0
+    raw_box = raw_score = 0.0
+    h, w = frames[0].shape[:2]
+    crop = np.ascontiguousarray(frames[0][h // 4:, : w // 2])   # khác tỉ lệ với frame
+    raw_inputs = [(frame, True) for frame in frames[:args.raw_frames]] + [(crop, False)]
+    for frame, auto in raw_inputs:
+        ref, out = raw_outputs(torch_be, onnx_be, frame, imgsz, auto)
+        raw_box = max(raw_box, float(np.abs(ref[:, :4] - out[:, :4]).max()))
+        raw_score = max(raw_score, float(np.abs(ref[:, 4:] - out[:, 4:]).max()))
+    mixed = {"boxes": 0, "matched": 0, "error": None}
+    try:
+        a_list = torch_be.predict([frames[0], crop], imgsz, conf)
+        b_list = onnx_be.predict([frames[0], crop], imgsz, conf)
+        for a, b in zip(a_list, b_list):
+            m, n = match(a, b, args.iou, args.score_tol, conf)
+            mixed["matched"] += m
+            mixed["boxes"] += n
+    except ValueError as e:
+        mixed["error"] = str(e)
+    for frame in frames:
+        t0 = time.perf_counter()
+        a = torch_be.predict([frame], imgsz, conf)[0]
+        t1 = time.perf_counter()
+        b = onnx_be.predict([frame], imgsz, conf)[0]
+        t2 = time.perf_counter()
+        t_torch += t1 - t0
+        t_onnx += t2 - t1
+        m, n = match(a, b, args.iou, args.score_tol, conf)
+        matched, total = matched + m, total + n
+    return {
+        "model": name,
+        "boxes": total,
+        "matched": matched,
+        "matchRate": round(matched / total, 4) if total else None,
+        "rawBoxMaxDiff": raw_box,
+        "rawScoreMaxDiff": raw_score,
+        "rawOk": raw_box <= args.raw_box_tol and raw_score <= args.raw_score_tol,
+        "mixedShape": mixed,
+        "torchFps": round(len(frames) / t_torch, 2),
+        "onnxFps": round(len(frames) / t_onnx, 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--video", default=str(REFERENCE_CLIP))
+    ap.add_argument("--frames", type=int, default=30)
+    ap.add_argument("--iou", type=float, default=0.9)
+    ap.add_argument("--score-tol", type=float, default=0.05)
+    ap.add_argument("--min-match", type=float, default=0.95)
+    ap.add_argument("--coco", default=YOLO_MODEL_PATH)
+    ap.add_argument("--sign", default=TRAFFIC_SIGN_MODEL_PATH)
+    ap.add_argument("--raw-frames", type=int, default=3, help="số frame so output thô")
+    ap.add_argument("--raw-box-tol", type=float, default=0.5, help="px, theo input đã letterbox")
+    ap.add_argument("--raw-score-tol", type=float, default=1e-3)
+    ap.add_argument("--conf", type=float, help="ngưỡng conf cho cả 2 model (mặc định COCO_CONF / SIGN_CONF)")
+    args = ap.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    report = [
+        compare("coco", TorchBackend(args.coco), OnnxBackend(args.coco, COCO_IMGSZ),
+                frames, COCO_IMGSZ, args.conf or COCO_CONF, args),
+        compare("sign", TorchBackend(args.sign), OnnxBackend(args.sign, SIGN_IMGSZ),
+                frames, SIGN_IMGSZ, args.conf or SIGN_CONF, args),
+    ]
+    print(json.dumps(report, indent=2))
+    for r in report:
+        if not r["boxes"]:
+            print(f"{r['model']}: no box above conf, only raw outputs compared (try --conf)", file=sys.stderr)
+
+    def passed(r):
+        mixed = r["mixedShape"]
+        return (r["rawOk"] and (not r["boxes"] or r["matchRate"] >= args.min_match) and mixed["error"] is None
+                and (not mixed["boxes"] or mixed["matched"] / mixed["boxes"] >= args.min_match))
+
+    ok = all(passed(r) for r in report)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# bench/check_frame_ring.py
+"""
+Kiểm tra FrameRing / ShmFrameReader (core/frame_ring.py):
+- slot không bao giờ bị ghi đè khi đang dùng: ring nhỏ, consumer giữ ngẫu nhiên tới (slots - 1) frame
+  và trả slot không theo thứ tự, có sleep để decoder chạy trước; crc32 từng frame lúc nhận = lúc trả
+  = crc32 của frame cùng index khi decode thẳng bằng cv2 (đúng nội dung, đúng thứ tự)
+- release 2 lần / array ngoài ring -> ValueError; slot bị ghi đè (giả lập) -> RuntimeError
+- ADASProcessor với transport "shm" cho sensorData / alerts giống hệt "thread" (detector stub)
+Exit code 1 nếu có lỗi.
+
+    python -m bench.check_frame_ring [--frames 240] [--depth 2] [--seed 0]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from core.detection import Detector
+from core.frame_ring import ShmFrameReader
+from core.processing import ADASProcessor
+from bench.bench_pipeline import RectangleBackend, SignStubBackend
+from bench.synthetic import make_synthetic_video
+
+
+def reference_crcs(video):
+    cap = cv2.VideoCapture(str(video))
+    crcs = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        crcs.append(zlib.crc32(frame))
+    cap.release()
+    return crcs
+
+
+def frame_shape(video):
+    cap = cv2.VideoCapture(str(video))
+    shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+    cap.release()
+    return shape
+
+
+def release(reader, frame, idx, crc, errors):
+    """Kiểm tra nội dung frame không đổi từ lúc nhận rồi trả slot (release tự kiểm tra seq header)."""
+    if zlib.crc32(frame) != crc:
+        errors.append(f"frame {idx}: content changed while in use")
+    try:
+        reader.release(frame)
+    except (RuntimeError, ValueError) as e:   # header seq đổi / slot đã bị cấp lại
+        errors.append(f"frame {idx}: {e}")
+
+
+def check_no_overwrite(video, depth, seed):
+    """Giữ / trả slot ngẫu nhiên; trả về danh sách lỗi."""
+    expected, shape = reference_crcs(video), frame_shape(video)
+    rng = random.Random(seed)
+    reader = ShmFrameReader(video, shape, depth, threading.Event()).start()
+    errors, held, n = [], [], 0   # held: (frame, index, crc)
+    try:
+        for frame in reader:
+            crc = zlib.crc32(frame)
+            if n >= len(expected) or crc != expected[n]:
+                errors.append(f"frame {n}: content differs from direct decode")
+            held.append((frame, n, crc))
+            n += 1
+            # giữ tối đa slots - 1 frame (giữ hết slot thì decoder phải chờ -> kẹt)
+            while held and (len(held) >= reader.ring.slots - 1 or rng.random() < 0.4):
+                time.sleep(rng.random() * 0.003)   # decoder có thời gian ghi các slot free
+                release(reader, *held.pop(rng.randrange(len(held))), errors)
+        for item in held:
+            release(reader, *item, errors)
+        if n != len(expected):
+            errors.append(f"got {n} frames, expected {len(expected)}")
+    finally:
+        reader.join()
+    return errors, n, reader.ring.slots
+
+
+def check_misuse(video, depth):
+    """release sai cách phải bị phát hiện."""
+    shape = frame_shape(video)
+    reader = ShmFrameReader(video, shape, depth, threading.Event()).start()
+    errors = []
+    try:
+        frames = iter(reader)
+        first, second = next(frames), next(frames)
+        reader.release(first)
+        for label, fn, exc in (
+            ("double release", lambda: reader.release(first), ValueError),
+            ("foreign array", lambda: reader.release(np.zeros(shape, np.uint8)), ValueError),
+            ("overwritten slot", lambda: (reader.ring.seq.__setitem__(reader.ring.slot_of(second), 10 ** 6),
+                                          reader.release(second)), RuntimeError),
+        ):
+            try:
+                fn()
+                errors.append(f"{label}: not detected")
+            except exc:
+                pass
+        del first, second, frames
+    finally:
+        reader.join()
+    return errors
+
+
+def check_processor_parity(video):
+    strip = lambda records: [{k: v for k, v in r.items() if k != "timestamp"} for r in records]
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for transport in ("thread", "shm"):
+            processor = ADASProcessor(detector=Detector(RectangleBackend(), SignStubBackend()), transport=transport)
+            result = processor.run(video, Path(tmp) / f"{transport}.mp4", "check-ring", "veh", "user")
+            out[transport] = (strip(result["sensorData"]), strip(result["alerts"]),
+                              result["summary"]["pipeline"]["frames"])
+    return [] if out["thread"] == out["shm"] else ["processor output differs between thread and shm transport"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=240)
+    ap.add_argument("--depth", type=int, default=2, help="depth nhỏ -> ít slot, slot bị tái dùng liên tục")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_synthetic_video(Path(tmp) / "synthetic.mp4", args.frames)
+        overwrite, frames, slots = check_no_overwrite(video, args.depth, args.seed)
+        report = {
+            "frames": frames, "slots": slots,
+            "noOverwrite": overwrite or "ok",
+            "misuse": check_misuse(video, args.depth) or "ok",
+            "processorParity": check_processor_parity(video) or "ok",
+        }
+    failed = any(v != "ok" for k, v in report.items() if k not in ("frames", "slots"))
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# bench/check_frame_skip.py
+"""
+Regression check cho adaptive frame skipping: chạy cùng 1 clip ở chế độ full-rate và
+adaptive, so sánh throughput và kiểm tra mọi đợt cảnh báo collision của full-rate
+cũng xuất hiện ở adaptive. Exit code 1 nếu thiếu, hoặc nếu bản full-rate không có đợt
+collision nào (check không chứng minh được gì).
+
+Mặc định: video giả bench.synthetic "approach" (xe tiến lại gần rồi lùi ra, xen đoạn đường
+trống) + detector stub, không cần weights. --video: clip thật với model (--coco / --sign).
+
+    python -m bench.check_frame_skip [--frames 450] [--video clip.mp4]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from config.config import YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE, BASE_DIR
+from core.alerts import COLLISION
+from core.detection import Detector
+from core.params import DEFAULT_PARAMS
+from core.processing import ADASProcessor
+from bench.bench_pipeline import RectangleBackend, SignStubBackend
+from bench.synthetic import make_synthetic_video
+
+REFERENCE_CLIP = BASE_DIR.parent / "server" / "Uploads" / "videos" / "1757508814973-test1.mp4"
+
+
+class RecordingDetector:
+    """Bọc Detector, ghi lại timestamp các frame có collision (cả frame detect lẫn nội suy)."""
+    def __init__(self, detector):
+        self._detector = detector
+        self.collision_ts = set()
+
+    def __getattr__(self, name):
+        return getattr(self._detector, name)
+
+    def _record(self, out, frame_ts):
+        if COLLISION.match(out[1], DEFAULT_PARAMS).any():
+            self.collision_ts.add(frame_ts)
+        return out
+
+    def postprocess_objects(self, res, f_pix, tracker, frame_ts=None, **kwargs):
+        return self._record(self._detector.postprocess_objects(res, f_pix, tracker, frame_ts, **kwargs), frame_ts)
+
+    def build_objects(self, boxes, f_pix, tracker, frame_ts=None):
+        return self._record(self._detector.build_objects(boxes, f_pix, tracker, frame_ts), frame_ts)
+
+
+def episodes(frames):
+    """Gom frame index liên tiếp thành các đợt [start, end]."""
+    out = []
+    for f in sorted(frames):
+        if out and f - out[-1][1] <= 1:
+            out[-1][1] = f
+        else:
+            out.append([f, f])
+    return out
+
+
+def run_mode(detector, video, out_dir, adaptive, fps):
+    rec = RecordingDetector(detector)
+    processor = ADASProcessor(detector=rec, adaptive_skip=adaptive)
+    t0 = time.perf_counter()
+    result = processor.run(video, Path(out_dir) / f"check_{int(adaptive)}.mp4",
+                           f"check{int(adaptive)}", "veh", "user")
+    elapsed = time.perf_counter() - t0
+    frames = result["summary"]["pipeline"]["frames"]
+    collisions = {round(ts * fps) for ts in rec.collision_ts}
+    return {"seconds": elapsed, "fps": frames / elapsed, "collisions": collisions,
+            "schedule": result["summary"]["frameSchedule"]}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--video", help=f"clip thật, vd. {REFERENCE_CLIP}")
+    ap.add_argument("--frames", type=int, default=450, help="số frame video giả")
+    ap.add_argument("--coco", default=YOLO_MODEL_PATH)
+    ap.add_argument("--sign", default=TRAFFIC_SIGN_MODEL_PATH)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.video:
+            video = args.video
+            detector = Detector(args.coco, args.sign, DEVICE)
+            detector.warmup()
+        else:
+            video = make_synthetic_video(Path(tmp) / "approach.mp4", args.frames, scenario="approach")
+            detector = Detector(RectangleBackend(), SignStubBackend())
+        cap = cv2.VideoCapture(str(video))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        full = run_mode(detector, video, tmp, False, fps)
+        adaptive = run_mode(detector, video, tmp, True, fps)
+
+    base_eps = episodes(full["collisions"])
+    missed = [ep for ep in base_eps if not any(ep[0] <= f <= ep[1] for f in adaptive["collisions"])]
+    report = {
+        "fullFps": round(full["fps"], 2),
+        "adaptiveFps": round(adaptive["fps"], 2),
+        "speedup": round(adaptive["fps"] / full["fps"], 2),
+        "inferredFrames": adaptive["schedule"]["inferredFrames"],
+        "interpolatedFrames": adaptive["schedule"]["interpolatedFrames"],
+        "collisionEpisodes": len(base_eps),
+        "missedEpisodes": missed,
+    }
+    print(json.dumps(report, indent=2))
+    if not base_eps:
+        print("full-rate run has no collision episode: nothing to compare", file=sys.stderr)
+    sys.exit(1 if missed or not base_eps else 0)
+
+
+if __name__ == "__main__":
+    main()
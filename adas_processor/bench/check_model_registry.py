@@ -0,0 +1,75 @@
+# bench/check_model_registry.py
+"""
+Kiểm tra ModelRegistry (core/model_registry.py) qua JobManager thật: 1 worker, N job liên tiếp trên
+video giả -> model chỉ được load 1 lần trong worker đó (loadCount == 1, cùng pid trước / sau các job),
+mọi job completed. Dùng model theo config (YOLO_MODEL_PATH / TRAFFIC_SIGN_MODEL_PATH).
+Exit code 1 nếu model bị load lại, worker bị thay, hoặc có job không completed.
+
+    python -m bench.check_model_registry [--jobs 4] [--frames 30]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import wait
+from pathlib import Path
+
+from service.jobs import JobManager
+from bench.synthetic import make_synthetic_video
+
+
+def _registry_status():
+    """Chạy trong worker: (pid, ModelRegistry.status()) của process đó."""
+    from core.model_registry import get_registry
+    return os.getpid(), get_registry().status()
+
+
+def worker_status(manager: JobManager):
+    return manager._pool.submit(_registry_status).result(timeout=600)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--jobs", type=int, default=4)
+    ap.add_argument("--frames", type=int, default=30)
+    ap.add_argument("--width", type=int, default=640)
+    ap.add_argument("--height", type=int, default=360)
+    args = ap.parse_args()
+
+    manager = JobManager(workers=1, queue_max=args.jobs)
+    manager.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            video = make_synthetic_video(tmp / "registry.mp4", args.frames, args.width, args.height)
+            pid_before, before = worker_status(manager)
+            t0 = time.perf_counter()
+            jobs = [manager.submit(str(video), str(tmp / f"out_{i}.mp4"), f"registry-{i}", "veh", "user")
+                    for i in range(args.jobs)]
+            wait([job.future for job in jobs])
+            wall_s = time.perf_counter() - t0
+            pid_after, after = worker_status(manager)
+    finally:
+        manager.shutdown()
+
+    statuses = [job.status for job in jobs]
+    report = {
+        "jobs": args.jobs,
+        "statuses": statuses,
+        "errors": [job.error for job in jobs if job.error],
+        "wallS": round(wall_s, 2),
+        "workerPid": {"before": pid_before, "after": pid_after},
+        "loadCount": after["loadCount"],
+        "loadTimeS": after["loadTimeS"],
+        "device": after["device"],
+    }
+    print(json.dumps(report, indent=2))
+    ok = (before["loadCount"] == 1 and after["loadCount"] == 1 and pid_before == pid_after
+          and all(s == "completed" for s in statuses))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench/check_replay.py
+"""
+Regression check cho detection store + replay: chạy processor 1 lần có ghi store, replay
+với tham số không đổi và kiểm tra sensorData / alerts giống hệt, sau đó replay với DIST_WARN_M
+khác và kiểm tra alert thay đổi theo (tham số thật sự được đánh giá lại), đo thời gian so với
+chạy lại cả model. Exit code 1 nếu replay khác bản gốc, bản gốc không có alert nào, hoặc đổi
+tham số không làm alert thay đổi.
+
+Mặc định: video giả bench.synthetic "approach" + detector stub (không cần weights);
+--video: clip thật với model (--coco / --sign).
+
+    python -m bench.check_replay [--frames 450] [--warn 4] [--video clip.mp4]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from config.config import YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE, BASE_DIR
+from core.detection import Detector
+from core.params import TuningParams
+from core.processing import ADASProcessor
+from core.replay import replay
+from bench.bench_pipeline import RectangleBackend, SignStubBackend
+from bench.synthetic import make_synthetic_video
+
+REFERENCE_CLIP = BASE_DIR.parent / "server" / "Uploads" / "videos" / "1757508814973-test1.mp4"
+
+
+def first_diff(a, b):
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return {"index": i, "original": x, "replay": y}
+    if len(a) != len(b):
+        return {"lengths": [len(a), len(b)]}
+    return None
+
+
+def alert_keys(alerts):
+    return [(a["frame_index"], a["type"], a["description"]) for a in alerts]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--video", help=f"clip thật, vd. {REFERENCE_CLIP}")
+    ap.add_argument("--frames", type=int, default=450, help="số frame video giả")
+    ap.add_argument("--coco", default=YOLO_MODEL_PATH)
+    ap.add_argument("--sign", default=TRAFFIC_SIGN_MODEL_PATH)
+    ap.add_argument("--warn", type=float, default=4.0, help="DIST_WARN_M cho lần replay thứ 2")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.video:
+            video = args.video
+            detector = Detector(args.coco, args.sign, DEVICE)
+            detector.warmup()
+        else:
+            video = make_synthetic_video(Path(tmp) / "approach.mp4", args.frames, scenario="approach")
+            detector = Detector(RectangleBackend(), SignStubBackend())
+        store = Path(tmp) / "store.parquet"
+        t0 = time.perf_counter()
+        original = ADASProcessor(detector=detector).run(video, Path(tmp) / "check.mp4",
+                                                        "check", "veh", "user", store_path=store)
+        full_s = time.perf_counter() - t0
+
+        same = replay(store)
+        tuned = replay(store, TuningParams.from_overrides({"DIST_WARN_M": args.warn}))
+        store_bytes = store.stat().st_size
+
+    diffs = {
+        "sensorData": first_diff(original["sensorData"], same["sensorData"]),
+        "alerts": first_diff(original["alerts"], same["alerts"]),
+    }
+    report = {
+        "frames": same["summary"]["replay"]["frames"],
+        "storeBytes": store_bytes,
+        "fullRunSeconds": round(full_s, 2),
+        "replaySeconds": same["summary"]["replay"]["seconds"],
+        "speedup": round(full_s / max(same["summary"]["replay"]["seconds"], 1e-6), 1),
+        "alerts": {"original": original["summary"]["totalAlerts"],
+                   f"distWarn={args.warn}": tuned["summary"]["totalAlerts"]},
+        "identical": not any(diffs.values()),
+        "diffs": {k: v for k, v in diffs.items() if v},
+        "tunedAlertsChanged": alert_keys(tuned["alerts"]) != alert_keys(original["alerts"]),
+    }
+    print(json.dumps(report, indent=2, default=str))
+    if not original["alerts"]:
+        print("original run has no alert: parameter re-evaluation not exercised", file=sys.stderr)
+    ok = report["identical"] and report["tunedAlertsChanged"] and bool(original["alerts"])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
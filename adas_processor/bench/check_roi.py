@@ -0,0 +1,118 @@
+# bench/check_roi.py
+"""
+ROI + adaptive imgsz: đo fps so với detect cả frame ở COCO_IMGSZ và kiểm tra mọi đợt cảnh báo
+collision của bản gốc vẫn xuất hiện. Mặc định tắt adaptive skip ở mọi chế độ để chỉ so ảnh hưởng
+của ROI / độ phân giải. ROI learned: chạy warm-up (tối đa --warmup-runs lần) tới khi grid đủ
+ROI_MIN_SAMPLES box, rồi 1 lần dùng ROI học được.
+Exit code 1 nếu thiếu đợt collision, bản gốc không có đợt nào, hoặc ROI learned không được dùng.
+
+Mặc định: video giả bench.synthetic "approach" + detector stub, không cần weights.
+--video: clip thật với model (--coco / --sign).
+
+    python -m bench.check_roi [--frames 450] [--video clip.mp4] [--roi 0 0.25 1 0.92] [--skip]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from config.config import YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE, OBJECT_ROI, OBJECT_ROI_BY_VEHICLE
+from core.detection import Detector
+from core.processing import ADASProcessor
+from core.roi import ObjectRoi
+from bench.bench_pipeline import RectangleBackend, SignStubBackend
+from bench.check_frame_skip import REFERENCE_CLIP, RecordingDetector, episodes
+from bench.synthetic import make_synthetic_video
+
+VEHICLE_ID = "check-roi"
+
+
+def run_mode(detector, video, tmp, fps, name, skip, **kwargs):
+    rec = RecordingDetector(detector)
+    processor = ADASProcessor(detector=rec, adaptive_skip=skip, roi_dir=Path(tmp) / "roi", **kwargs)
+    t0 = time.perf_counter()
+    result = processor.run(video, Path(tmp) / f"check_{name}.mp4", f"check_{name}", VEHICLE_ID, "user")
+    elapsed = time.perf_counter() - t0
+    summary = result["summary"]
+    return {
+        "fps": summary["pipeline"]["frames"] / elapsed,
+        "collisions": {round(ts * fps) for ts in rec.collision_ts},
+        "lowResFrames": summary["frameSchedule"]["lowResFrames"],
+        "roi": summary.get("roi"),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--video", help=f"clip thật, vd. {REFERENCE_CLIP}")
+    ap.add_argument("--frames", type=int, default=450, help="số frame video giả")
+    ap.add_argument("--coco", default=YOLO_MODEL_PATH)
+    ap.add_argument("--sign", default=TRAFFIC_SIGN_MODEL_PATH)
+    ap.add_argument("--roi", type=float, nargs=4, default=OBJECT_ROI, metavar=("X1", "Y1", "X2", "Y2"),
+                    help="ROI static (tỉ lệ frame)")
+    ap.add_argument("--skip", action="store_true", help="bật adaptive skip ở mọi chế độ")
+    ap.add_argument("--warmup-runs", type=int, default=5, help="số lần chạy tối đa để học ROI learned")
+    args = ap.parse_args()
+
+    OBJECT_ROI_BY_VEHICLE[VEHICLE_ID] = tuple(args.roi)   # ROI static của camera dùng trong check
+    modes = {
+        "full": {},
+        "roiStatic": {"roi_mode": "static"},
+        "adaptiveImgsz": {"adaptive_imgsz": True},
+        "roiStatic+adaptiveImgsz": {"roi_mode": "static", "adaptive_imgsz": True},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.video:
+            video = args.video
+            detector = Detector(args.coco, args.sign, DEVICE)
+            detector.warmup()
+        else:
+            video = make_synthetic_video(Path(tmp) / "approach.mp4", args.frames, scenario="approach")
+            detector = Detector(RectangleBackend(), SignStubBackend())
+        cap = cv2.VideoCapture(str(video))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        W, H = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        results = {name: run_mode(detector, video, tmp, fps, name, args.skip, **kw)
+                   for name, kw in modes.items()}
+        # học grid tới khi đủ ROI_MIN_SAMPLES box (ROI learned khác None), rồi chạy với ROI đó
+        warmups = 0
+        while warmups < args.warmup_runs and ObjectRoi(W, H, VEHICLE_ID, "learned", Path(tmp) / "roi").roi is None:
+            warmups += 1
+            results["roiLearnedWarmup"] = run_mode(detector, video, tmp, fps, f"warmup{warmups}", args.skip,
+                                                   roi_mode="learned")
+        results["roiLearned"] = run_mode(detector, video, tmp, fps, "roiLearned", args.skip, roi_mode="learned")
+
+    base = results["full"]
+    base_eps = episodes(base["collisions"])
+    learned_roi = results["roiLearned"]["roi"] or {}
+    report = {"collisionEpisodes": len(base_eps), "fullFps": round(base["fps"], 2),
+              "learnedWarmupRuns": warmups, "modes": {}}
+    failed = not base_eps
+    if not base_eps:
+        print("full-frame run has no collision episode: nothing to compare", file=sys.stderr)
+    if learned_roi.get("roi") is None or not learned_roi.get("roiDetects"):
+        print(f"learned ROI not applied after {warmups} warm-up run(s)", file=sys.stderr)
+        failed = True
+    for name, r in results.items():
+        if name == "full":
+            continue
+        missed = [ep for ep in base_eps if not any(ep[0] <= f <= ep[1] for f in r["collisions"])]
+        failed |= bool(missed) and name != "roiLearnedWarmup"
+        report["modes"][name] = {
+            "fps": round(r["fps"], 2),
+            "speedup": round(r["fps"] / base["fps"], 2),
+            "lowResFrames": r["lowResFrames"],
+            "roi": r["roi"],
+            "missedEpisodes": missed,
+        }
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
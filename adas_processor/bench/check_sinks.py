@@ -0,0 +1,116 @@
+# bench/check_sinks.py
+"""
+Kiểm tra sink ghi batch (core/sinks.py) với record thật của pipeline (stub detector, video giả):
+- ndjson / sqlite / http (server giả trên localhost: 503 ngẫu nhiên + lỗi SAU khi đã lưu batch
+  -> client retry 1 batch đã ghi) đều phải chứa đúng tập key của bản chạy collect, không trùng
+- in số batch, retry, pending tối đa (bộ nhớ bị chặn bởi SINK_MAX_PENDING)
+Exit code 1 nếu có sink thiếu / thừa / trùng record.
+
+    python -m bench.check_sinks [--frames 600] [--batch 50] [--fail-rate 0.3]
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from core.detection import Detector
+from core.processing import ADASProcessor
+from core.sinks import open_sink, record_key
+from bench.bench_pipeline import RectangleBackend, SignStubBackend
+from bench.synthetic import make_synthetic_video
+
+
+class BulkServer(ThreadingHTTPServer):
+    """Endpoint bulk giả: lưu theo key (idempotent), fail_rate request lỗi trước / sau khi lưu."""
+    def __init__(self, fail_rate: float, seed: int = 0):
+        super().__init__(("127.0.0.1", 0), BulkHandler)
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.rows = {}
+        self.received = Counter()   # key -> số lần nhận
+        self.requests = Counter()
+        self.lock = threading.Lock()
+
+
+class BulkHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        srv = self.server
+        with srv.lock:
+            roll = srv.rng.random()
+            srv.requests["total"] += 1
+            if roll < srv.fail_rate / 2:
+                srv.requests["503"] += 1
+                return self._reply(503)
+            for rec in body["sensorData"] + body["alerts"]:
+                srv.rows[rec["key"]] = rec
+                srv.received[rec["key"]] += 1
+            if roll < srv.fail_rate:
+                srv.requests["500AfterStore"] += 1   # đã lưu nhưng client không biết -> retry
+                return self._reply(500)
+        self._reply(200)
+
+    def _reply(self, code):
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--batch", type=int, default=50)
+    ap.add_argument("--fail-rate", type=float, default=0.3, help="tỉ lệ request lỗi của server giả")
+    args = ap.parse_args()
+
+    detector = Detector(RectangleBackend(), SignStubBackend())
+    processor = ADASProcessor(detector=detector)
+    server = BulkServer(args.fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/bulk"
+    kw = {"batch_size": args.batch, "backoff_s": 0.01, "retries": 8}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        video = make_synthetic_video(tmp / "synthetic.mp4", args.frames)
+        ref = processor.run(video, tmp / "ref.mp4", "check-sinks", "veh", "user")
+        expected = {record_key("sensor", r, "check-sinks") for r in ref["sensorData"]} | \
+                   {record_key("alert", r, "check-sinks") for r in ref["alerts"]}
+
+        report = {"records": len(expected), "sinks": {}}
+        failed = False
+        for spec in (f"ndjson:{tmp}/out.ndjson", f"sqlite:{tmp}/out.sqlite3", url):
+            sink = open_sink(spec, "check-sinks", "veh", "user", **kw)
+            processor.run(video, tmp / "sink.mp4", "check-sinks", "veh", "user",
+                          on_record=sink.add, collect=False)
+            sink.close()
+            if sink.name == "ndjson":
+                keys = [json.loads(line)["key"] for line in (tmp / "out.ndjson").read_text().splitlines()]
+            elif sink.name == "sqlite":
+                with sqlite3.connect(tmp / "out.sqlite3") as db:
+                    keys = [k for (k,) in db.execute("SELECT key FROM sensor_data UNION ALL SELECT key FROM alerts")]
+            else:
+                keys = list(server.rows)
+            dup = len(keys) - len(set(keys))
+            ok = set(keys) == expected and dup == 0
+            failed |= not ok
+            report["sinks"][sink.name] = {"ok": ok, "stored": len(keys), "duplicates": dup,
+                                          "missing": len(expected - set(keys)), **sink.stats()}
+        report["sinks"]["http"]["server"] = {
+            **server.requests, "redelivered": sum(n - 1 for n in server.received.values())}
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-import torch
+import ast
+import json
+import os
 from pathlib import Path
 
 # Base project directory
@@ -11,16 +13,121 @@ TRAFFIC_SIGN_MODEL_PATH = str(BASE_DIR / "models" / "best.pt")
 # Directories for syncing with NodeJS server
 FRAMES_DIR = BASE_DIR.parent / "server" / "Processed" / "frames"
 VIDEOS_DIR = BASE_DIR.parent / "server" / "Processed" / "videos"
+IMAGES_DIR = BASE_DIR.parent / "server" / "Processed" / "images"   # ảnh đã vẽ box (POST /images, annotate)
 
 # ADAS parameters
-FRAME_INTERVAL = 0.5       # log sensorData mỗi 0.5s
+FRAME_INTERVAL = 0.5       # log sensorData mỗi 0.5s (thời gian video)
 ALERT_COOLDOWN_S = 5.0     # cooldown 5s cho cùng loại alert
+# luật cảnh báo của AlertEngine (core/alerts.py RULES), theo thứ tự phát; thêm "forward_collision"
+# để bật cảnh báo va chạm theo TTC (< TTC_WARN_S, cooldown riêng từng xe). "lane_departure" không bật
+# mặc định: chưa có lane detection, lane_status của object luôn "within" nên luật không bao giờ khớp
+ALERT_RULES = ("collision", "obstacle", "traffic_sign")
 DISTANCE_THRESHOLD_COLLISION = 5.0      # m
 DISTANCE_THRESHOLD_OBSTACLE = 10.0      # m
 LANE_DEPARTURE_THRESHOLD = 0.5          # lane offset threshold
 TRAFFIC_SIGN_CONFIDENCE_THRESHOLD = 0.7
 OPTICAL_FLOW_SPEED_SCALE = 10.0
 
+# Detector options
+COCO_IMGSZ = 1280
+COCO_CONF = 0.35
+SIGN_IMGSZ = 640
+SIGN_CONF = 0.4
+MODEL_WARMUP = True    # chạy 1 frame giả khi load model để lần infer đầu không chậm
+
+# Inference backend: "torch" (ultralytics .pt) hoặc "onnx" (onnxruntime, export .pt -> .onnx 1 lần)
+DETECTOR_BACKEND = "torch"
+ONNX_OPSET = 18             # torch >= 2.9 (exporter dynamo) không xuất được opset < 18; export_onnx kiểm tra opset thực tế
+ONNX_INTRA_OP_THREADS = 0   # 0 = onnxruntime tự chọn theo số core
+ONNX_INTER_OP_THREADS = 0
+
+# Job queue (service)
+JOB_WORKERS = 2             # số process xử lý video song song
+JOB_QUEUE_MAX = 8           # số job tối đa đang chờ, vượt quá -> 429
+JOB_RESULT_TTL_S = 3600     # giữ kết quả job đã xong trong bộ nhớ (giây)
+PROGRESS_EVERY_FRAMES = 10  # báo tiến độ mỗi N frame
+STREAM_BACKLOG = 256        # streaming: số event gần nhất giữ lại cho client kết nối muộn (record cũ hơn -> event "dropped")
+STREAM_QUEUE_MAX = 1024     # streaming: event chờ gửi / client; đầy -> bỏ progress, sensor / alert bị bỏ được báo bằng event "dropped"
+
+# Live stream (POST /live, core/live.py): camera rtsp / http MJPEG, chỉ xử lý frame mới nhất
+LIVE_URL_SCHEMES = ("rtsp", "rtsps", "rtmp", "http", "https", "udp", "tcp", "srt")   # service không mở file / device
+LIVE_RECONNECT_TRIES = 5    # đọc lỗi liên tiếp -> mở lại stream tối đa N lần rồi kết thúc phiên
+LIVE_RECONNECT_DELAY_S = 1.0
+LIVE_FRAME_TIMEOUT_S = 10.0 # không có frame mới trong N giây -> coi như stream đã dừng
+LIVE_MAX_DURATION_S = 4 * 3600   # phiên live dài nhất (service)
+LIVE_LATENCY_SAMPLES = 18000     # latency p50/p95/p99 tính trên N mẫu gần nhất (~10 phút ở 30 fps), RAM cố định
+
+# Persistence sink: ghi sensor data / alert theo batch trong lúc xử lý (core/sinks.py).
+# Bật sink -> kết quả job không còn giữ sensorData / alerts (NodeJS không insert lại), result cache tắt.
+SINK = None                 # None | "ndjson[:path]" | "sqlite[:path]" | "http(s)://..." (POST bulk)
+SINKS_DIR = BASE_DIR / "sinks"
+SINK_BATCH_SIZE = 200       # flush khi đủ N record ...
+SINK_FLUSH_INTERVAL_S = 2.0 # ... hoặc sau N giây
+SINK_MAX_PENDING = 5000     # writer chậm hơn pipeline -> pipeline chờ (giới hạn bộ nhớ)
+SINK_RETRIES = 3            # retry mỗi batch, backoff nhân đôi
+SINK_RETRY_BACKOFF_S = 0.5
+SINK_HTTP_TIMEOUT_S = 10.0
+SINK_HTTP_HEADERS = {}      # vd {"Authorization": "Bearer ..."}
+
+# Metrics (service): GET /metrics, format Prometheus
+METRICS = True
+
+# Result cache (service): upload trùng nội dung -> trả kết quả cũ
+RESULT_CACHE = True
+CACHE_DIR = BASE_DIR / "cache"
+CACHE_MAX_BYTES = 5 * 1024 ** 3   # LRU, xóa entry cũ nhất khi vượt
+
+# Detection store: lưu detection từng frame (Parquet) để replay post-processing (core/replay.py)
+DETECTION_STORE = False
+DETECTIONS_DIR = BASE_DIR / "detections"
+STORE_FLUSH_FRAMES = 512    # ghi 1 row group mỗi N frame
+
+# Pipeline decode -> infer -> encode
+PIPELINE_QUEUE_DEPTH = 8    # số frame tối đa chờ giữa các stage (0 = chạy tuần tự)
+PIPELINE_TRANSPORT = "thread"   # "thread": decode ở thread | "shm": decode ở process riêng, frame qua
+                                # shared memory ring (core/frame_ring.py), tránh GIL khi decode nặng (1080p)
+INFERENCE_BATCH_SIZE = 1    # số frame / 1 lần forward (COCO + sign); >1 có lợi trên GPU, CPU thường không (xem bench.bench_batch)
+PROFILE_STAGES = False      # đo thời gian từng stage (p50/p95/p99, peak RSS) -> summary["profile"]
+
+# Ảnh tĩnh (POST /images, core/images.py): JPEG / PNG upload từ NodeJS (fileType "image"),
+# không tracker, không encode video; decode song song bằng thread, detect theo batch
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+IMAGE_BATCH_SIZE = 8        # số ảnh / 1 lần forward (COCO + sign)
+IMAGE_DECODE_WORKERS = 4    # thread decode / ghi ảnh (cv2 nhả GIL)
+IMAGE_MAX_FILES = 1000      # số ảnh tối đa / request
+
+# Video output
+VIDEO_ENCODER = "ffmpeg_pipe"   # "ffmpeg_pipe": frame -> stdin ffmpeg (1 lần encode) | "opencv": mp4v tạm rồi convert
+FFMPEG_PRESET = "medium"        # libx264 preset (ultrafast ... veryslow)
+FFMPEG_CRF = 23
+FFMPEG_THREADS = 0              # 0 = ffmpeg tự chọn
+
+# Tracking (tốc độ / TTC theo timestamp video)
+TRACK_HISTORY = 8           # số sample khoảng cách / track, v_rel = hồi quy tuyến tính trên cửa sổ này
+TRACK_EVICT_S = 2.0         # track không xuất hiện quá N giây (thời gian video) -> xóa
+TRACK_CAPACITY = 64         # số slot cấp sẵn, tự nhân đôi khi đầy
+
+# Adaptive frame skipping
+ADAPTIVE_SKIP = False       # opt-in: True = bỏ qua detect ở frame an toàn (kiểm tra bằng bench.check_frame_skip)
+SKIP_MIN_INTERVAL = 1       # có xe gần / TTC ngắn -> detect mỗi frame
+SKIP_MAX_INTERVAL = 5       # không có xe -> detect mỗi 5 frame, frame giữa nội suy từ track
+SIGN_DETECT_INTERVAL = 10   # biển báo ít thay đổi -> detect mỗi 10 frame
+
+# Độ phân giải input COCO theo mức nguy hiểm: không có xe trong vùng cảnh báo -> COCO_IMGSZ_LOW
+ADAPTIVE_IMGSZ = False
+COCO_IMGSZ_LOW = 640
+
+# ROI object detection: chỉ đưa vùng ROI vào model (bỏ trời / nắp capo), box map lại toạ độ frame gốc
+ROI_MODE = "off"                        # "off" | "static" | "learned" (xem core/roi.py)
+OBJECT_ROI = (0.0, 0.25, 1.0, 0.92)     # static: (x1, y1, x2, y2) theo tỉ lệ frame
+OBJECT_ROI_BY_VEHICLE = {}              # vehicleId -> ROI riêng của camera đó
+ROI_DIR = BASE_DIR / "roi"              # learned: grid vị trí detection / vehicleId
+ROI_GRID = (32, 18)                     # số ô (cột, hàng)
+ROI_COVERAGE = 0.995                    # ROI chứa 99.5% khối lượng detection
+ROI_MARGIN = 0.05                       # nới thêm mỗi cạnh (tỉ lệ frame)
+ROI_MIN_SAMPLES = 500                   # số box tối thiểu trước khi dùng ROI học được
+ROI_EXPLORE_EVERY = 30                  # learned: cứ N lần detect chạy 1 lần cả frame
+
 # Runtime options
 SHOW_PREVIEW = False   # default off for headless server
 SAVE_FRAMES = False    # disable saving frames unless needed
@@ -36,5 +143,51 @@ COCO_NAMES = {
 VEHICLES = {1, 2, 3, 5, 7}
 W_REAL_M = {1: 0.6, 2: 1.8, 3: 0.7, 5: 2.5, 7: 2.5}
 
-# Device selection
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# Device selection: "auto" = cuda nếu có GPU, không thì cpu; chỉ xác định khi load model
+# (core.backends.resolve_device) để import config không kéo theo torch
+DEVICE = "auto"
+
+
+# ------------------------------------------------------------------
+# Override không cần sửa file: ADAS_CONFIG=<file .json> và biến môi trường ADAS_<TÊN>
+# (vd. ADAS_JOB_WORKERS=4, ADAS_DEVICE=cuda:1, ADAS_ROI_MODE=static). Giá trị môi trường đọc như
+# literal Python (số, True/False, None, tuple, dict), không được thì giữ nguyên chuỗi.
+# ------------------------------------------------------------------
+def _coerce(name, value, current):
+    if isinstance(current, Path):
+        return Path(value)
+    if isinstance(current, bool) or isinstance(value, bool):
+        ok = isinstance(current, bool) and isinstance(value, bool)
+    elif isinstance(current, int):
+        ok = isinstance(value, int)
+    elif isinstance(current, float):
+        ok = isinstance(value, (int, float))
+        value = float(value) if ok else value
+    else:
+        ok = True
+    if not ok:
+        raise ValueError(f"Config {name}: expected {type(current).__name__}, got {value!r}")
+    if isinstance(current, tuple) and isinstance(value, list):
+        return tuple(value)   # JSON không có tuple
+    return value
+
+
+def _apply_overrides(env=os.environ):
+    names = {k for k, v in globals().items() if k.isupper() and not callable(v)}
+    overrides = {}
+    if env.get("ADAS_CONFIG"):
+        overrides.update(json.loads(Path(env["ADAS_CONFIG"]).read_text(encoding="utf-8")))
+    for key, raw in env.items():
+        if key.startswith("ADAS_") and key[5:] in names:
+            try:
+                overrides[key[5:]] = ast.literal_eval(raw)
+            except (ValueError, SyntaxError):
+                overrides[key[5:]] = raw
+    for name, value in overrides.items():
+        if name not in names:
+            raise ValueError(f"Unknown config option: {name}")
+        current = globals()[name]
+        globals()[name] = value if current is None or value is None else _coerce(name, value, current)
+
+
+_apply_overrides()
@@ -0,0 +1,154 @@
+# core/alerts.py
+"""
+Alert engine: luật cảnh báo khai báo (AlertRule), đánh giá 1 lần / frame trên mảng object của frame
+(FrameObjects, do build_object_data trả về) + danh sách biển báo mới detect.
+
+- điều kiện object: khoảng cách (bội số của params.dist_warn_m), TTC (bội số của params.ttc_warn_s)
+  -> replay đổi DIST_WARN_M / TTC_WARN_S vẫn đúng, lane_status; box không có khoảng cách / TTC (không phải xe, chưa có track) = NaN, không khớp
+- phạm vi cooldown: "global" (1 cooldown / luật), "track" (/ track_id), "sign" (/ tên biển báo)
+- cooldown theo timestamp video của frame -> cùng input cho cùng output, không phụ thuộc tốc độ xử lý
+- luật global đang cooldown thì không cần tính mask
+
+Bộ luật theo params.alert_rules (config ALERT_RULES, replay override được): tên trong RULES, theo thứ tự phát alert.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from config.config import ALERT_RULES, COCO_NAMES
+from .params import TuningParams, DEFAULT_PARAMS
+
+LANE_CODES = {"within": 0, "departing": 1, "crossed": 2, "lost": 3}
+
+
+class FrameObjects(NamedTuple):
+    """Object của 1 frame dạng mảng (N,), cùng thứ tự với obj_data."""
+    cls: np.ndarray        # int64
+    track_id: np.ndarray   # int64, -1 = chưa có track
+    dist: np.ndarray       # float64 (m), NaN = không ước lượng
+    ttc: np.ndarray        # float64 (s), NaN = không tiến lại gần
+    lane: np.ndarray       # int8, LANE_CODES
+    conf: Optional[np.ndarray] = None   # float64, NaN = box nội suy; chỉ cho detection store, không vào obj_data
+
+    def __len__(self):
+        return len(self.cls)
+
+
+EMPTY_OBJECTS = FrameObjects(np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0), np.zeros(0),
+                             np.zeros(0, np.int8))
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    name: str                          # khoá cooldown, tên trong ALERT_RULES
+    type: str                          # "type" của alert record (enum Alert bên NodeJS)
+    severity: str                      # low | medium | high
+    description: str                   # template: {name} (class / biển báo), {dist}, {ttc}
+    source: str = "objects"            # "objects" | "signs"
+    scope: str = "global"              # "global" | "track" | "sign"
+    dist_lt: Optional[float] = None    # dist < dist_lt * params.dist_warn_m
+    dist_ge: Optional[float] = None    # dist >= dist_ge * params.dist_warn_m
+    ttc_lt: Optional[float] = None     # TTC < ttc_lt * params.ttc_warn_s
+    lanes: Tuple[str, ...] = ()        # lane_status thuộc tập này
+    min_conf: float = 0.0              # signs: conf tối thiểu
+    cooldown_s: Optional[float] = None # None = params.alert_cooldown_s
+
+    def match(self, objs: FrameObjects, params: TuningParams = DEFAULT_PARAMS) -> np.ndarray:
+        """Mask (N,) các object thoả mọi điều kiện của luật."""
+        mask = np.ones(len(objs), dtype=bool)
+        if self.dist_lt is not None:
+            mask &= objs.dist < self.dist_lt * params.dist_warn_m
+        if self.dist_ge is not None:
+            mask &= objs.dist >= self.dist_ge * params.dist_warn_m
+        if self.ttc_lt is not None:
+            mask &= objs.ttc < self.ttc_lt * params.ttc_warn_s
+        if self.lanes:
+            mask &= np.isin(objs.lane, [LANE_CODES[lane] for lane in self.lanes])
+        return mask
+
+
+# LANE_DEPARTURE cần lane_status từ lane detection (chưa có, build_object_data luôn "within")
+COLLISION = AlertRule("collision", "collision", "high", "Collision risk detected", dist_lt=1.0)
+LANE_DEPARTURE = AlertRule("lane_departure", "lane_departure", "high", "Lane departure detected",
+                           lanes=("departing", "crossed"))
+OBSTACLE = AlertRule("obstacle", "obstacle", "low", "Obstacle detected ahead", dist_ge=1.0, dist_lt=1.5)
+TRAFFIC_SIGN = AlertRule("traffic_sign", "traffic_sign", "medium", "Detected sign: {name}",
+                         source="signs", scope="sign")
+# FCW theo TTC, cooldown riêng từng xe; type "collision" để NodeJS nhận như cảnh báo va chạm
+FORWARD_COLLISION = AlertRule("forward_collision", "collision", "high",
+                              "Forward collision warning: {name} TTC {ttc:.1f}s", scope="track",
+                              ttc_lt=1.0)
+
+RULES = {r.name: r for r in (COLLISION, LANE_DEPARTURE, OBSTACLE, TRAFFIC_SIGN, FORWARD_COLLISION)}
+
+
+def build_rules(rules: Sequence[Union[str, AlertRule]] = ALERT_RULES) -> List[AlertRule]:
+    """Tên (RULES) hoặc AlertRule -> danh sách luật."""
+    out = []
+    for rule in rules:
+        if isinstance(rule, str):
+            if rule not in RULES:
+                raise ValueError(f"Unknown alert rule: {rule} (choose from {', '.join(RULES)})")
+            rule = RULES[rule]
+        out.append(rule)
+    return out
+
+
+class AlertEngine:
+    def __init__(self, rules: Optional[Sequence[Union[str, AlertRule]]] = None,
+                 params: Optional[TuningParams] = None):
+        self.params = params or DEFAULT_PARAMS
+        self.rules = build_rules(self.params.alert_rules if rules is None else rules)
+        self.counts: Counter = Counter()
+        self._last: Dict = {}   # khoá cooldown -> frame_ts lần phát gần nhất
+
+    def reset(self):
+        """Bỏ trạng thái cooldown (ảnh tĩnh: mỗi ảnh đánh giá độc lập), giữ counts."""
+        self._last.clear()
+
+    def _cooling(self, key, frame_ts: float, cooldown: float) -> bool:
+        last = self._last.get(key)
+        return last is not None and frame_ts - last <= cooldown
+
+    def _emit(self, out: List[Dict], key, frame_ts: float, rule: AlertRule, track_id=None, **fields):
+        self._last[key] = frame_ts
+        self.counts[rule.type] += 1
+        record = {"type": rule.type, "description": rule.description.format(**fields), "severity": rule.severity}
+        if track_id is not None:
+            record["track_id"] = track_id
+        out.append(record)
+
+    def evaluate(self, frame_ts: float, objs: FrameObjects = EMPTY_OBJECTS, signs: Sequence[Dict] = ()) -> List[Dict]:
+        """Alert phát ở frame này ({type, description, severity[, track_id]}), đã qua cooldown."""
+        out: List[Dict] = []
+        for rule in self.rules:
+            cooldown = self.params.alert_cooldown_s if rule.cooldown_s is None else rule.cooldown_s
+            if rule.source == "signs":
+                for s in signs:
+                    key = (rule.name, s["name"])
+                    if s["conf"] >= rule.min_conf and not self._cooling(key, frame_ts, cooldown):
+                        self._emit(out, key, frame_ts, rule, name=s["name"])
+                continue
+            if not len(objs) or (rule.scope == "global" and self._cooling(rule.name, frame_ts, cooldown)):
+                continue
+            idx = np.flatnonzero(rule.match(objs, self.params))
+            if not len(idx):
+                continue
+            if rule.scope == "track":
+                for i in idx.tolist():
+                    tid = int(objs.track_id[i])
+                    if tid != -1 and not self._cooling((rule.name, tid), frame_ts, cooldown):
+                        self._emit(out, (rule.name, tid), frame_ts, rule, tid, **self._fields(objs, i))
+            else:
+                # global: mô tả theo object gần nhất khớp luật
+                dist = objs.dist[idx]
+                i = int(idx[np.nanargmin(dist)]) if not np.isnan(dist).all() else int(idx[0])
+                self._emit(out, rule.name, frame_ts, rule, **self._fields(objs, i))
+        return out
+
+    @staticmethod
+    def _fields(objs: FrameObjects, i: int) -> Dict:
+        return {"name": COCO_NAMES.get(int(objs.cls[i]), str(objs.cls[i])),
+                "dist": float(objs.dist[i]), "ttc": float(objs.ttc[i])}
@@ -0,0 +1,39 @@
+# core/annotation.py
+import cv2
+
+COLOR_OK = (0, 255, 0)
+COLOR_WARN = (0, 0, 255)
+COLOR_SIGN = (255, 165, 0)
+
+
+def draw_objects(frame, obj_data):
+    for d in obj_data:
+        x1, y1, x2, y2 = d["bbox"]
+        color = COLOR_WARN if d["warn"] else COLOR_OK
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        label = f"{d['name']}"
+        if d["dist"] is not None:
+            label += f" {d['dist']:.2f}m"
+        if d["speed"] is not None:
+            label += f" {d['speed']:+.1f}km/h"
+        if d["ttc"] is not None:
+            label += f" TTC:{d['ttc']:.1f}s"
+        if d["warn"]:
+            label += " WARN"
+        cv2.putText(frame, label, (x1, y1 - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return frame
+
+
+def draw_signs(frame, signs):
+    for s in signs:
+        x1, y1, x2, y2 = s["bbox"]
+        cv2.rectangle(frame, (x1, y1), (x2, y2), COLOR_SIGN, 2)
+        cv2.putText(frame, f"{s['name']} {s['conf']:.2f}", (x1, y1 - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, COLOR_SIGN, 2)
+    return frame
+
+
+def annotate_frame(frame, obj_data, signs):
+    """Vẽ object + biển báo lên frame (in-place)."""
+    draw_objects(frame, obj_data)
+    draw_signs(frame, signs)
+    return frame
@@ -0,0 +1,250 @@
+# core/backends.py
+"""
+Inference backend cho Detector.
+
+Mọi backend trả về cùng 1 format: với mỗi frame 1 mảng float32 (N, 6)
+[x1, y1, x2, y2, conf, cls] theo toạ độ frame gốc. Detector không cần biết model
+chạy bằng torch hay onnxruntime.
+"""
+import ast
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from config.config import (
+    DETECTOR_BACKEND, ONNX_OPSET, ONNX_INTRA_OP_THREADS, ONNX_INTER_OP_THREADS
+)
+from utils.logger import get_logger
+
+logger = get_logger("Backend")
+
+NMS_IOU = 0.7       # giống mặc định của ultralytics predict
+MAX_DET = 300
+MAX_NMS = 30000
+_CLASS_OFFSET = 7680  # batched NMS: đẩy box của mỗi class ra vùng riêng
+
+_thread_limit = 0     # limit_threads(); 0 = không giới hạn
+
+
+def limit_threads(n: int, kind: str = DETECTOR_BACKEND):
+    """
+    Giới hạn số thread inference của process hiện tại (torch, onnxruntime, OpenCV).
+    Nhiều worker process trên cùng máy -> mỗi worker n thread để không tranh core.
+    Gọi trước khi load model (onnxruntime đọc giá trị lúc tạo session).
+    torch chỉ được import khi backend là "torch" (bản deploy ONNX có thể không cài torch).
+    """
+    global _thread_limit
+    _thread_limit = n
+    cv2.setNumThreads(n)
+    if kind == "torch":
+        import torch
+        torch.set_num_threads(n)
+
+
+def resolve_device(device: str, kind: str = DETECTOR_BACKEND) -> str:
+    """"auto" -> "cuda" nếu có GPU (theo backend), không thì "cpu"; import framework khi cần."""
+    if device != "auto":
+        return device
+    if kind == "onnx":
+        import onnxruntime as ort
+        return "cuda" if "CUDAExecutionProvider" in ort.get_available_providers() else "cpu"
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+class DetectorBackend:
+    """Interface: predict(frames, imgsz, conf) -> list[np.ndarray (N, 6)]."""
+    names: Dict[int, str] = {}
+
+    def predict(self, frames: Sequence[np.ndarray], imgsz: int, conf: float) -> List[np.ndarray]:
+        raise NotImplementedError
+
+
+class TorchBackend(DetectorBackend):
+    """Ultralytics YOLO (.pt) như trước đây."""
+    def __init__(self, weights: str, device: str = "cpu"):
+        from ultralytics import YOLO
+        self.model = YOLO(str(weights))
+        self.names = self.model.names
+        self.device = device
+
+    def predict(self, frames, imgsz, conf):
+        results = self.model.predict(list(frames), imgsz=imgsz, conf=conf, device=self.device, verbose=False)
+        return [r.boxes.data.cpu().numpy().astype(np.float32) for r in results]
+
+
+# ------------------------------------------------------------------
+# ONNX Runtime
+# ------------------------------------------------------------------
+def weights_hash(path, chunk_size=1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def onnx_cache_path(weights, imgsz: int, opset: int = ONNX_OPSET) -> Path:
+    weights = Path(weights)
+    return weights.with_name(f"{weights.stem}.{weights_hash(weights)}.{imgsz}.op{opset}.onnx")
+
+
+def verify_onnx(path, opset: int = ONNX_OPSET):
+    """
+    File ONNX phải có opset đúng như tên cache và load được bằng onnxruntime; exporter có thể âm thầm
+    đổi opset (vd. torch exporter dynamo nâng lên 18 rồi hạ lại không trọn vẹn) -> RuntimeError.
+    """
+    import onnx
+    import onnxruntime as ort
+
+    model = onnx.load(str(path), load_external_data=False)
+    emitted = next((o.version for o in model.opset_import if o.domain in ("", "ai.onnx")), None)
+    if emitted != opset:
+        raise RuntimeError(f"{path.name}: exporter emitted opset {emitted}, expected {opset} (set ONNX_OPSET={emitted})")
+    try:
+        ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+    except Exception as e:
+        raise RuntimeError(f"{path.name}: exported model does not load in onnxruntime: {e}") from e
+
+
+def export_onnx(weights, imgsz: int, opset: int = ONNX_OPSET) -> Path:
+    """
+    Export .pt -> .onnx 1 lần, lưu cạnh file weights với tên
+    <stem>.<hash>.<imgsz>.op<opset>.onnx; lần sau dùng lại file đã có.
+    File chỉ được đưa vào cache sau khi verify_onnx thành công.
+    """
+    target = onnx_cache_path(weights, imgsz, opset)
+    if target.exists():
+        return target
+
+    from ultralytics import YOLO
+    logger.info(f"Exporting {weights} -> {target.name}")
+    # export trong thư mục tạm rồi os.replace -> các worker export song song không ghi đè nhau
+    tmp_dir = Path(tempfile.mkdtemp(dir=target.parent, prefix=".export_"))
+    try:
+        tmp_weights = tmp_dir / Path(weights).name
+        shutil.copy2(weights, tmp_weights)
+        exported = YOLO(str(tmp_weights)).export(
+            format="onnx", imgsz=imgsz, opset=opset, dynamic=True, simplify=False
+        )
+        verify_onnx(Path(exported), opset)
+        os.replace(exported, target)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return target
+
+
+def letterbox(img, new_shape: int, stride: int = 32, auto: bool = True):
+    """
+    Resize giữ tỉ lệ + pad (giống LetterBox của ultralytics): auto=True pad tới bội số của stride,
+    auto=False pad đủ new_shape x new_shape (mọi ảnh cùng shape, stack được thành 1 batch).
+    """
+    h, w = img.shape[:2]
+    r = min(new_shape / h, new_shape / w)
+    new_unpad = int(round(w * r)), int(round(h * r))
+    dw, dh = new_shape - new_unpad[0], new_shape - new_unpad[1]
+    if auto:
+        dw, dh = dw % stride, dh % stride
+    dw, dh = dw / 2, dh / 2
+    if (w, h) != new_unpad:
+        img = cv2.resize(img, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return img, r, (left, top)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_thres: float) -> np.ndarray:
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_thres]
+    return np.asarray(keep, dtype=np.int64)
+
+
+class OnnxBackend(DetectorBackend):
+    """YOLO export ONNX chạy bằng onnxruntime (CPU mặc định)."""
+    def __init__(self, weights: str, imgsz: int, device: str = "cpu", opset: int = ONNX_OPSET,
+                 intra_threads: Optional[int] = None, inter_threads: int = ONNX_INTER_OP_THREADS):
+        import onnxruntime as ort
+
+        path = Path(weights)
+        if path.suffix != ".onnx":
+            path = export_onnx(path, imgsz, opset)
+        opts = ort.SessionOptions()
+        if intra_threads is None:
+            intra_threads = _thread_limit or ONNX_INTRA_OP_THREADS
+        opts.intra_op_num_threads = intra_threads
+        opts.inter_op_num_threads = inter_threads
+        providers = ["CPUExecutionProvider"]
+        if str(device).startswith("cuda") and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        self.session = ort.InferenceSession(str(path), opts, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        self.path = path
+
+    def predict(self, frames, imgsz, conf):
+        if not frames:
+            return []
+        batch, scales = [], []
+        # frame khác kích thước (ảnh tĩnh, ROI crop + frame khám phá cả frame) -> pad cố định imgsz x imgsz,
+        # như ultralytics (LetterBox auto chỉ khi mọi ảnh cùng shape)
+        auto = len({frame.shape[:2] for frame in frames}) == 1
+        for frame in frames:
+            img, r, pad = letterbox(frame, imgsz, auto=auto)
+            batch.append(img)
+            scales.append((r, pad, frame.shape[:2]))
+        x = np.ascontiguousarray(np.stack(batch)[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+        out = self.session.run(None, {self.input_name: x})[0]   # (B, 4 + nc, anchors)
+        return [self._postprocess(p.T, conf, *s) for p, s in zip(out, scales)]
+
+    @staticmethod
+    def _postprocess(pred, conf_thres, r, pad, orig_shape):
+        scores = pred[:, 4:]
+        cls = scores.argmax(1)
+        conf = scores[np.arange(len(scores)), cls]
+        keep = conf > conf_thres
+        pred, cls, conf = pred[keep], cls[keep], conf[keep]
+        if len(conf) > MAX_NMS:
+            top = conf.argsort()[::-1][:MAX_NMS]
+            pred, cls, conf = pred[top], cls[top], conf[top]
+
+        xy, wh = pred[:, :2], pred[:, 2:4] / 2
+        boxes = np.concatenate([xy - wh, xy + wh], axis=1)
+        idx = nms(boxes + cls[:, None] * _CLASS_OFFSET, conf, NMS_IOU)[:MAX_DET]
+        boxes, conf, cls = boxes[idx], conf[idx], cls[idx]
+
+        # về toạ độ frame gốc
+        boxes[:, [0, 2]] -= pad[0]
+        boxes[:, [1, 3]] -= pad[1]
+        boxes /= r
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, orig_shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, orig_shape[0])
+        return np.concatenate([boxes, conf[:, None], cls[:, None]], axis=1).astype(np.float32)
+
+
+def create_backend(weights: str, imgsz: int, device: str = "cpu", kind: str = DETECTOR_BACKEND) -> DetectorBackend:
+    if isinstance(weights, DetectorBackend):
+        return weights   # backend dựng sẵn (vd. stub trong bench)
+    if kind == "torch":
+        return TorchBackend(weights, device)
+    if kind == "onnx":
+        return OnnxBackend(weights, imgsz, device)
+    raise ValueError(f"Unknown detector backend: {kind}")
@@ -1,125 +1,229 @@
-from ultralytics import YOLO
-import cv2
-from config.config import COCO_NAMES, VEHICLES, DIST_WARN_M, SAVE_FRAMES, FRAMES_DIR
-from .estimation import est_distance_m
-from pathlib import Path
+import threading
+import time
+import numpy as np
+from config.config import (
+    COCO_NAMES, VEHICLES,
+    COCO_IMGSZ, COCO_CONF, SIGN_IMGSZ, SIGN_CONF, DETECTOR_BACKEND
+)
+from .alerts import EMPTY_OBJECTS, FrameObjects
+from .backends import create_backend, resolve_device
+from .estimation import est_distance_m_batch
+from .params import DEFAULT_PARAMS
+
+Boxes = None   # ultralytics.engine.results.Boxes, import khi tạo tracker đầu tiên (_load_tracking)
+
+
+def _load_tracking():
+    """Import ByteTrack của ultralytics lần đầu cần tới (import ultralytics mất ~1s, kéo theo torch)."""
+    global Boxes
+    from ultralytics.engine.results import Boxes as _Boxes
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    from ultralytics.utils import IterableSimpleNamespace, YAML
+    from ultralytics.utils.checks import check_yaml
+    Boxes = _Boxes
+    return BYTETracker, IterableSimpleNamespace, YAML, check_yaml
+
+def _class_lut(ids):
+    lut = np.zeros(max(ids) + 2, dtype=bool)   # phần tử cuối = False cho class id ngoài bảng
+    lut[list(ids)] = True
+    return lut
+
+
+def _in_lut(lut, cls):
+    return lut[np.minimum(cls, len(lut) - 1)]
+
+
+_IS_COCO = _class_lut(COCO_NAMES)
+_IS_VEHICLE = _class_lut(VEHICLES)
+
+
+def build_object_data(cls, xyxy, ids, f_pix, tracker, frame_ts=None, conf=None, params=None):
+    """
+    Distance / speed / TTC cho tất cả box của 1 frame, tính trên mảng.
+    cls: (N,) int, xyxy: (N, 4) int, ids: (N,) int (-1 = chưa có track),
+    conf: (N,) float hoặc None (box nội suy), params: TuningParams
+    tracker=None: ảnh tĩnh (core/images.py) -> khoảng cách cho mọi xe, không có tốc độ / TTC
+    -> (data, FrameObjects) -- FrameObjects là input của AlertEngine (core/alerts.py)
+    """
+    n = len(cls)
+    if n == 0:
+        return [], EMPTY_OBJECTS
+    params = params or DEFAULT_PARAMS
+    # video: chỉ xe đã có track mới tính khoảng cách / tốc độ
+    veh = _in_lut(_IS_VEHICLE, cls)
+    if tracker is not None:
+        veh &= ids != -1
+    dist = est_distance_m_batch(xyxy, f_pix, cls, params.w_lut)   # tính cho mọi box, chỉ dùng ở box `veh`
+    warn = veh & (dist < params.dist_warn_m)
+
+    speed = np.full(n, np.nan)
+    v_rel = np.full(n, np.nan)
+    if tracker is not None and veh.any():
+        speed[veh], v_rel[veh] = tracker.estimate_speeds(ids[veh], dist[veh], frame_ts)
+    approaching = v_rel > 0.1
+    ttc = np.full(n, np.nan)
+    ttc[approaching] = dist[approaching] / v_rel[approaching]
+
+    cls_l, ids_l, dist_l = cls.tolist(), ids.tolist(), dist.tolist()
+    conf = np.full(n, np.nan) if conf is None else np.asarray(conf, dtype=np.float64)
+    objs = FrameObjects(cls, ids, np.where(veh, dist, np.nan), ttc, np.zeros(n, dtype=np.int8), conf)
+    speed = [None if s != s else s for s in speed.tolist()]   # NaN -> None
+    ttc = [None if t != t else t for t in ttc.tolist()]
+
+    names = [COCO_NAMES[c] for c in cls_l]
+    data = [{
+        "cls": c,
+        "name": name,
+        "dist": d if v else None,
+        "speed": s,
+        "ttc": t,
+        "obstacle_detected": w,
+        "lane_status": "within",
+        "bbox": bbox,
+        "track_id": tid,
+        "warn": w
+    } for c, name, d, v, s, t, w, bbox, tid in zip(
+        cls_l, names, dist_l, veh.tolist(), speed, ttc, warn.tolist(), xyxy.tolist(), ids_l
+    )]
+    return data, objs
 
-FRAMES_DIR = Path(FRAMES_DIR)
-FRAMES_DIR.mkdir(parents=True, exist_ok=True)
 
 class Detector:
-    def __init__(self, coco_model_path, sign_model_path, device="cpu"):
-        self.model_coco = YOLO(str(coco_model_path))
-        self.model_sign = YOLO(str(sign_model_path))
+    def __init__(self, coco_model_path, sign_model_path, device="cpu", backend=DETECTOR_BACKEND):
+        device = resolve_device(device, backend)
+        self.model_coco = create_backend(coco_model_path, COCO_IMGSZ, device, backend)
+        self.model_sign = create_backend(sign_model_path, SIGN_IMGSZ, device, backend)
         self.device = device
-
-    def detect_objects(self, frame, W, f_pix, tracker, frame_idx=None, simulation_id=None):
-        results = self.model_coco.track(
-            frame, imgsz=1280, conf=0.35,
-            device=self.device, persist=True,
-            tracker="bytetrack.yaml", verbose=False
-        )
-
-        data, alerts = [], []
-        res = results[0]
-
-        if getattr(res, "boxes", None) is None:
-            return frame, data, alerts
-
-        for b in res.boxes:
-            try:
-                cls = int(b.cls[0])
-            except Exception:
-                cls = int(b.cls) if hasattr(b, "cls") else None
-            if cls is None or cls not in COCO_NAMES:
-                continue
-
-            xyxy = b.xyxy[0].tolist()
-            x1, y1, x2, y2 = map(int, xyxy)
-
-            track_id = -1
-            if hasattr(b, "id") and b.id is not None:
-                try:
-                    track_id = int(b.id[0])
-                except Exception:
-                    try:
-                        track_id = int(b.id)
-                    except Exception:
-                        track_id = -1
-
-            name = COCO_NAMES[cls]
-            dist, speed_kmh, v_rel, ttc, warn = None, None, None, None, False
-            obstacle_detected = False
-            lane_status = "within"
-
-            if cls in VEHICLES and track_id != -1:
-                dist = est_distance_m((x1, y1, x2, y2), f_pix, cls)
-                speed_kmh, v_rel = tracker.estimate_speed(track_id, dist)
-
-                if v_rel is not None and v_rel > 0.1:  # approaching
-                    ttc = dist / v_rel
-
-                if dist is not None and dist < DIST_WARN_M:
-                    warn = True
-                    obstacle_detected = True
-                    alerts.append({
-                        "type": "collision",
-                        "description": f"{name} too close ({dist:.1f}m)",
-                        "severity": "high",
-                        "track_id": track_id
-                    })
-                elif dist is not None and dist < DIST_WARN_M * 1.5:
-                    alerts.append({
-                        "type": "obstacle",
-                        "description": f"{name} detected at {dist:.1f}m",
-                        "severity": "low",
-                        "track_id": track_id
-                    })
-
-            color = (0, 0, 255) if warn else (0, 255, 0)
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            label = f"{name}"
-            if dist is not None:
-                label += f" {dist:.2f}m"
-            if speed_kmh is not None:
-                label += f" {speed_kmh:+.1f}km/h"
-            if ttc is not None:
-                label += f" TTC:{ttc:.1f}s"
-            if warn:
-                label += " WARN"
-            cv2.putText(frame, label, (x1, y1 - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-
-            data.append({
-                "cls": cls,
-                "name": name,
-                "dist": dist,
-                "speed": speed_kmh,
-                "ttc": ttc,
-                "obstacle_detected": obstacle_detected,
-                "lane_status": lane_status,
-                "bbox": [x1, y1, x2, y2],
-                "track_id": track_id,
-                "warn": bool(warn)
-            })
-
-        return frame, data, alerts
+        self.backend = backend
+        # Models are shared between simulations -> one inference at a time
+        self._lock = threading.Lock()
+        self._tracker_cfg = None
+
+    def warmup(self, width=1280, height=720):
+        """Run one dummy frame through both models so the first real frame is not slow."""
+        dummy = np.zeros((height, width, 3), dtype=np.uint8)
+        with self._lock:
+            self.model_coco.predict([dummy], COCO_IMGSZ, COCO_CONF)
+            self.model_sign.predict([dummy], SIGN_IMGSZ, SIGN_CONF)
+
+    def new_mot_tracker(self, frame_rate=30):
+        """
+        Create a fresh ByteTrack instance for one simulation. frame_rate = fps của video:
+        track_buffer (số frame giữ track bị mất) tính theo frame video, xem postprocess_objects.
+        """
+        BYTETracker, IterableSimpleNamespace, YAML, check_yaml = _load_tracking()
+        if self._tracker_cfg is None:
+            self._tracker_cfg = IterableSimpleNamespace(**YAML.load(check_yaml("bytetrack.yaml")))
+        return BYTETracker(args=self._tracker_cfg, frame_rate=frame_rate)
+
+    def detect_objects(self, frame, W, f_pix, tracker, frame_idx=None, simulation_id=None, frame_ts=None):
+        if frame_ts is None and frame_idx is not None:
+            frame_ts = frame_idx / tracker.fps
+        return self.detect_objects_batch([frame], W, f_pix, tracker, [frame_ts])[0]
+
+    def detect_objects_batch(self, frames, W, f_pix, tracker, frame_ts=None):
+        """
+        1 forward pass cho cả list frame; kết quả đưa vào ByteTrack lần lượt theo thứ tự frame.
+        frame_ts: timestamp (s) của từng frame trong video (bắt buộc nếu có xe), dùng để tính tốc độ.
+        Returns list of (data, FrameObjects), 1 phần tử / frame.
+        """
+        results = self.predict_objects(frames)
+        if frame_ts is None:
+            frame_ts = [None] * len(results)
+        return [self.postprocess_objects(res, f_pix, tracker, ts) for res, ts in zip(results, frame_ts)]
+
+    def predict_objects(self, frames, imgsz=None, rois=None):
+        """
+        Raw COCO detections (chưa tracking), mỗi frame 1 mảng (N, 6) [x1, y1, x2, y2, conf, cls].
+        imgsz: mặc định COCO_IMGSZ. rois: (x1, y1, x2, y2) / frame hoặc None (cả frame); chỉ vùng ROI
+        được đưa vào model, box trả về vẫn theo toạ độ frame gốc.
+        """
+        if not frames:
+            return []
+        if rois is not None:
+            frames = [f if r is None else f[r[1]:r[3], r[0]:r[2]] for f, r in zip(frames, rois)]
+        with self._lock:
+            dets = self.model_coco.predict(list(frames), imgsz or COCO_IMGSZ, COCO_CONF)
+        if rois is not None:
+            for det, r in zip(dets, rois):
+                if r is not None and len(det):
+                    det[:, [0, 2]] += r[0]
+                    det[:, [1, 3]] += r[1]
+        return dets
+
+    def postprocess_objects(self, det, f_pix, tracker, frame_ts=None, timer=None, frame_idx=None):
+        """
+        ByteTrack update + distance/speed/TTC cho detections của 1 frame (gọi đúng thứ tự frame).
+        timer: core.profiling.StageTimer -> đo riêng stage "track" và "postprocess".
+        """
+        t0 = time.perf_counter()
+        # ByteTrack state belongs to the simulation (tracker), not to the shared model
+        if tracker.mot_tracker is None:
+            tracker.mot_tracker = self.new_mot_tracker(tracker.fps)
+        mot = tracker.mot_tracker
+        if frame_ts is not None:
+            # frame_id theo thời gian video thay vì số lần update: frame bị bỏ qua (adaptive skip) /
+            # frame live bị drop vẫn được tính vào thời gian mất track (max_time_lost)
+            mot.frame_id = max(mot.frame_id, int(round(frame_ts * tracker.fps)))
+
+        # tracks: [x1, y1, x2, y2, id, score, cls, idx]; chưa có track nào -> giữ box gốc, id = -1
+        # (orig_shape của Boxes chỉ dùng cho toạ độ normalized, ByteTrack không cần)
+        tracks = mot.update(Boxes(det, (0, 0)), None)
+        if len(tracks):
+            xyxy, ids, scores, classes = tracks[:, :4], tracks[:, 4], tracks[:, 5], tracks[:, 6]
+        else:
+            xyxy, ids, scores, classes = det[:, :4], np.full(len(det), -1), det[:, 4], det[:, 5]
+
+        if timer is None:
+            return self.objects_from_tracks(xyxy, ids, classes, f_pix, tracker, frame_ts, scores)
+        t1 = time.perf_counter()
+        out = self.objects_from_tracks(xyxy, ids, classes, f_pix, tracker, frame_ts, scores)
+        timer.add("track", t1 - t0, frame_idx)
+        timer.add("postprocess", time.perf_counter() - t1, frame_idx)
+        return out
+
+    @staticmethod
+    def unconfirmed_tracks(tracker) -> int:
+        """Số track ByteTrack mới chưa được xác nhận (chưa xuất hiện trong output, chưa có id)."""
+        mot = tracker.mot_tracker
+        return 0 if mot is None else sum(not t.is_activated for t in mot.tracked_stracks)
+
+    @staticmethod
+    def objects_from_tracks(xyxy, ids, classes, f_pix, tracker, frame_ts=None, conf=None):
+        """Mảng box/id/class (float) của 1 frame -> bỏ class ngoài COCO_NAMES -> build_object_data."""
+        classes = classes.astype(np.int64)
+        keep = _in_lut(_IS_COCO, classes)
+        return build_object_data(classes[keep], xyxy[keep].astype(np.int64), ids[keep].astype(np.int64),
+                                 f_pix, tracker, frame_ts, None if conf is None else conf[keep])
+
+    def build_objects(self, boxes, f_pix, tracker, frame_ts=None):
+        """
+        boxes: [(cls, (x1, y1, x2, y2), track_id)] -> (data, FrameObjects).
+        Dùng cho box nội suy (InferenceScheduler).
+        """
+        if not boxes:
+            return [], EMPTY_OBJECTS
+        cls, xyxy, ids = zip(*boxes)
+        return build_object_data(np.array(cls, dtype=np.int64), np.array(xyxy, dtype=np.int64),
+                                 np.array(ids, dtype=np.int64), f_pix, tracker, frame_ts)
 
     def detect_signs(self, frame):
-        results = self.model_sign.predict(frame, imgsz=640, conf=0.4, device=self.device, verbose=False)
-        alerts = []
-        res = results[0]
-        if getattr(res, "boxes", None) is not None:
-            for b in res.boxes:
-                cls = int(b.cls[0]) if hasattr(b, "cls") else int(b.cls)
-                conf = float(b.conf[0]) if hasattr(b, "conf") else float(b.conf)
-                x1, y1, x2, y2 = map(int, b.xyxy[0].tolist())
-                name = self.model_sign.names.get(cls, f"sign{cls}") if hasattr(self.model_sign, "names") else f"sign{cls}"
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 165, 0), 2)
-                cv2.putText(frame, f"{name} {conf:.2f}", (x1, y1 - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 165, 0), 2)
-
-                alerts.append({
-                    "type": "traffic_sign",
-                    "description": f"Detected sign: {name}",
-                    "severity": "medium"
-                })
-        return frame, alerts
+        """Return signs = [{cls, name, conf, bbox}] (vẽ + input traffic_sign của AlertEngine)."""
+        return self.detect_signs_batch([frame])[0]
+
+    def detect_signs_batch(self, frames):
+        return [self.postprocess_signs(res) for res in self.predict_signs(frames)]
+
+    def predict_signs(self, frames):
+        if not frames:
+            return []
+        with self._lock:
+            return self.model_sign.predict(list(frames), SIGN_IMGSZ, SIGN_CONF)
+
+    def postprocess_signs(self, det):
+        signs = []
+        for x1, y1, x2, y2, conf, cls in det.tolist():
+            cls = int(cls)
+            name = self.model_sign.names.get(cls, f"sign{cls}")
+            signs.append({"cls": cls, "name": name, "conf": conf, "bbox": [int(x1), int(y1), int(x2), int(y2)]})
+        return signs
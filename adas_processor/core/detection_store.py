@@ -0,0 +1,145 @@
+# core/detection_store.py
+"""
+Lưu detection thô từng frame (sau tracking, trước khi tính khoảng cách / cảnh báo) ra Parquet
+để replay post-processing với tham số khác mà không chạy lại model.
+
+1 file / simulation, mỗi dòng 1 record, ghi theo thứ tự frame:
+  kind = 0 object  : cls, conf (NaN nếu box nội suy), bbox, track_id
+  kind = 1 sign    : cls, conf, bbox (chỉ ở frame có detect biển báo)
+  kind = 2 frame   : 1 dòng / frame; pts, interpolated (object nội suy), sign_frame (có detect biển báo)
+Metadata (fps, kích thước, video nguồn, tên biển báo, ...) nằm trong schema metadata của file.
+"""
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from config.config import STORE_FLUSH_FRAMES
+from .alerts import FrameObjects
+
+STORE_VERSION = 1
+KIND_OBJECT, KIND_SIGN, KIND_FRAME = 0, 1, 2
+
+_COLUMNS = {
+    "frame_idx": np.int32, "pts": np.float64, "kind": np.int8, "cls": np.int16, "conf": np.float32,
+    "x1": np.int32, "y1": np.int32, "x2": np.int32, "y2": np.int32, "track_id": np.int32,
+    "interpolated": np.bool_, "sign_frame": np.bool_,
+}
+
+
+def _schema(meta: Dict):
+    import pyarrow as pa
+    return pa.schema(
+        [(name, pa.from_numpy_dtype(dtype)) for name, dtype in _COLUMNS.items()],
+        metadata={"adas": json.dumps({**meta, "version": STORE_VERSION})},
+    )
+
+
+class DetectionStoreWriter:
+    """Gom record trong bộ nhớ, ghi 1 row group mỗi `flush_frames` frame -> bộ nhớ không tăng theo video."""
+    def __init__(self, path, meta: Dict, flush_frames: int = STORE_FLUSH_FRAMES):
+        import pyarrow.parquet as pq
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.with_name(self.path.name + ".part")
+        self._schema = _schema(meta)
+        self._writer = pq.ParquetWriter(str(self._tmp), self._schema, compression="zstd")
+        self.flush_frames = flush_frames
+        self.frames = 0
+        self._rows = {name: [] for name in _COLUMNS}
+
+    def _row(self, frame_idx, pts, kind, cls=-1, conf=np.nan, bbox=(0, 0, 0, 0), track_id=-1,
+             interpolated=False, sign_frame=False):
+        r = self._rows
+        r["frame_idx"].append(frame_idx)
+        r["pts"].append(pts)
+        r["kind"].append(kind)
+        r["cls"].append(cls)
+        r["conf"].append(np.nan if conf is None else conf)
+        for name, v in zip(("x1", "y1", "x2", "y2"), bbox):
+            r[name].append(v)
+        r["track_id"].append(track_id)
+        r["interpolated"].append(interpolated)
+        r["sign_frame"].append(sign_frame)
+
+    def add_frame(self, frame_idx: int, pts: float, obj_data: List[Dict], objs: FrameObjects, interpolated: bool,
+                  signs: Optional[List[Dict]] = None):
+        """objs: FrameObjects của obj_data (conf lấy từ đây); signs = None: frame không chạy detect biển báo."""
+        self._row(frame_idx, pts, KIND_FRAME, interpolated=interpolated, sign_frame=signs is not None)
+        conf = objs.conf if objs.conf is not None else np.full(len(obj_data), np.nan)
+        for d, c in zip(obj_data, conf.tolist()):
+            self._row(frame_idx, pts, KIND_OBJECT, d["cls"], c, d["bbox"], d["track_id"])
+        for s in signs or ():
+            self._row(frame_idx, pts, KIND_SIGN, s["cls"], s["conf"], s["bbox"])
+        self.frames += 1
+        if self.frames % self.flush_frames == 0:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        if not self._rows["frame_idx"]:
+            return
+        arrays = [pa.array(np.asarray(self._rows[name], dtype=dtype)) for name, dtype in _COLUMNS.items()]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self._rows = {name: [] for name in _COLUMNS}
+
+    def close(self) -> Path:
+        self._flush()
+        self._writer.close()
+        self._tmp.replace(self.path)
+        return self.path
+
+    def abort(self):
+        try:
+            self._writer.close()
+        finally:
+            self._tmp.unlink(missing_ok=True)
+
+
+class StoredFrame:
+    """Detection của 1 frame đọc lại từ store."""
+    __slots__ = ("frame_idx", "pts", "interpolated", "sign_frame", "objects", "signs")
+
+    def __init__(self, frame_idx, pts, interpolated, sign_frame, objects, signs):
+        self.frame_idx = frame_idx
+        self.pts = pts
+        self.interpolated = interpolated
+        self.sign_frame = sign_frame
+        self.objects = objects   # dict cột: cls, conf, xyxy, track_id (numpy)
+        self.signs = signs
+
+
+class DetectionStore:
+    """Đọc store (cả file vào bộ nhớ dạng cột, vài chục byte / box)."""
+    def __init__(self, path):
+        import pyarrow.parquet as pq
+        self.path = Path(path)
+        table = pq.read_table(str(self.path))
+        self.meta = json.loads(table.schema.metadata[b"adas"])
+        self._cols = {name: table.column(name).to_numpy() for name in _COLUMNS}
+
+    def __len__(self):
+        return int((self._cols["kind"] == KIND_FRAME).sum())
+
+    def _select(self, idx):
+        c = self._cols
+        return {
+            "cls": c["cls"][idx].astype(np.int64),
+            "conf": c["conf"][idx],
+            "xyxy": np.stack([c["x1"][idx], c["y1"][idx], c["x2"][idx], c["y2"][idx]], axis=1).astype(np.int64),
+            "track_id": c["track_id"][idx].astype(np.int64),
+        }
+
+    def frames(self) -> Iterator[StoredFrame]:
+        c = self._cols
+        frame_rows = np.flatnonzero(c["kind"] == KIND_FRAME)
+        bounds = np.append(frame_rows, len(c["kind"]))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            rows = np.arange(start + 1, end)
+            kinds = c["kind"][rows]
+            yield StoredFrame(
+                int(c["frame_idx"][start]), float(c["pts"][start]),
+                bool(c["interpolated"][start]), bool(c["sign_frame"][start]),
+                self._select(rows[kinds == KIND_OBJECT]), self._select(rows[kinds == KIND_SIGN]),
+            )
@@ -1,6 +1,8 @@
 # core/estimation.py
 import math
+import numpy as np
 from config.config import W_REAL_M
+from .params import DEFAULT_PARAMS
 
 def focal_pixels(img_w, hfov_deg):
     return (img_w / 2.0) / math.tan(math.radians(hfov_deg / 2.0))
@@ -15,3 +17,18 @@ def est_distance_m(box, f_pix, cls=None):
     w_pix = max(1, (x2 - x1))
     Wm = W_REAL_M.get(cls, 1.8) if cls is not None else 1.8
     return (Wm * f_pix) / w_pix
+
+
+def est_distance_m_batch(xyxy, f_pix, cls, w_lut=None):
+    """
+    Như est_distance_m cho cả mảng box.
+    xyxy: (N, 4) int, cls: (N,) int -> (N,) float64 (cùng kết quả từng phần tử)
+    w_lut: width thật theo class id (TuningParams.w_lut), mặc định từ W_REAL_M
+    """
+    if w_lut is None:
+        w_lut = DEFAULT_PARAMS.w_lut
+    xyxy = np.asarray(xyxy)
+    cls = np.asarray(cls)
+    w_pix = np.maximum(1, xyxy[:, 2] - xyxy[:, 0])
+    Wm = w_lut[np.minimum(cls, len(w_lut) - 1)]
+    return (Wm * f_pix) / w_pix
@@ -0,0 +1,180 @@
+# core/frame_ring.py
+"""
+Transport frame decode -> inference qua shared memory, thay cho pickle frame BGR (1280x720x3 = 2.7MB,
+1080p = 6.2MB) qua multiprocessing.Queue.
+
+FrameRing: `slots` frame cấp phát sẵn trong 1 SharedMemory + header seq / slot.
+Vòng đời 1 slot:
+    free -> process decode ghi thẳng vào slot (cap.read(slot)) -> ready (queue chỉ chở slot + metadata)
+    -> inference đọc view trên slot (zero-copy) -> encoder vẽ + ghi -> release -> free
+Slot chỉ quay lại free-list khi consumer release -> decoder không bao giờ ghi đè slot đang dùng;
+release kiểm tra seq trong header vẫn là seq lúc nhận (RuntimeError nếu bị ghi đè).
+
+ShmFrameReader cùng interface với core.pipeline.FrameReader (iterate, stats, join), decode chạy ở
+process riêng (spawn) nên không tranh GIL với inference / encode.
+"""
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .pipeline import StageStats
+
+_SEQ_BYTES = 8   # header: int64 seq / slot, -1 = chưa ghi
+
+
+def ring_slots(depth: int, batch: int = 1) -> int:
+    """Số slot tối thiểu để không kẹt: queue ready + batch đang infer + queue encoder + frame đang ghi."""
+    return 2 * depth + batch + 2
+
+
+class FrameRing:
+    """`slots` frame uint8 `shape` trong 1 SharedMemory. name=None -> tạo mới (owner, unlink khi close)."""
+    def __init__(self, slots: int, shape: Tuple[int, ...], name: Optional[str] = None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.frame_bytes = int(np.prod(self.shape))
+        self.owner = name is None
+        size = slots * (_SEQ_BYTES + self.frame_bytes)
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.seq = np.ndarray((slots,), np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots, *self.shape), np.uint8, buffer=self.shm.buf, offset=slots * _SEQ_BYTES)
+        if self.owner:
+            self.seq[:] = -1
+        self._closed = False
+
+    @property
+    def spec(self) -> Tuple:
+        """Truyền sang process khác (pickle được) -> FrameRing.attach(spec)."""
+        return self.shm.name, self.slots, self.shape
+
+    @classmethod
+    def attach(cls, spec: Tuple) -> "FrameRing":
+        name, slots, shape = spec
+        return cls(slots, shape, name)
+
+    def slot_of(self, frame: np.ndarray) -> int:
+        """Slot chứa view `frame` (theo địa chỉ bộ nhớ)."""
+        offset = frame.__array_interface__["data"][0] - self.frames.__array_interface__["data"][0]
+        slot, rem = divmod(offset, self.frame_bytes)
+        if rem or not 0 <= slot < self.slots or frame.shape != self.shape:
+            raise ValueError("frame is not a slot of this ring")
+        return slot
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.seq = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass   # còn view frame ở ngoài -> mapping được giải phóng khi view bị GC
+        if self.owner:
+            self.shm.unlink()
+
+
+def _decode_worker(source: str, spec: Tuple, free_q, ready_q, stop):
+    """Process decode: lấy slot free -> decode thẳng vào slot -> gửi ("frame", slot, seq, decode_s)."""
+    ring = FrameRing.attach(spec)
+    cap = cv2.VideoCapture(source)
+    frame = None
+    try:
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video: {source}")
+        seq = 0
+        while not stop.is_set():
+            try:
+                slot = free_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            t0 = time.perf_counter()
+            ret, frame = cap.read(ring.frames[slot])
+            if not ret:
+                break
+            if not np.may_share_memory(frame, ring.frames):
+                ring.frames[slot] = frame   # backend không decode in-place được -> 1 lần copy
+            ring.seq[slot] = seq
+            ready_q.put(("frame", slot, seq, time.perf_counter() - t0))
+            seq += 1
+        ready_q.put(("end",))
+    except Exception as e:
+        ready_q.put(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        cap.release()
+        del frame
+        ring.close()
+
+
+class ShmFrameReader:
+    """Như FrameReader nhưng decode ở process riêng; frame yield ra là view trên FrameRing, phải release()."""
+    transport = "shm"
+
+    def __init__(self, source, shape: Tuple[int, int, int], depth: int, stop: threading.Event, timer=None,
+                 batch: int = 1, slots: Optional[int] = None):
+        self.depth = depth
+        self.stop = stop
+        self.timer = timer
+        self.stats = StageStats()
+        self.ring = FrameRing(slots or ring_slots(depth, batch), shape)
+        ctx = mp.get_context("spawn")
+        self._free = ctx.Queue()
+        self._ready = ctx.Queue()
+        self._stop = ctx.Event()
+        for slot in range(self.ring.slots):
+            self._free.put(slot)
+        self._proc = ctx.Process(target=_decode_worker, name="adas-decode", daemon=True,
+                                 args=(str(source), self.ring.spec, self._free, self._ready, self._stop))
+        self._held = {}   # slot -> seq đang được inference / encoder giữ
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._proc.start()
+        return self
+
+    def __iter__(self):
+        while not self.stop.is_set():
+            try:
+                msg = self._ready.get(timeout=0.1)
+            except queue.Empty:
+                if not self._proc.is_alive() and self._ready.empty():
+                    raise RuntimeError(f"Decode process exited unexpectedly (exit code {self._proc.exitcode})")
+                continue
+            if msg[0] == "end":
+                return
+            if msg[0] == "error":
+                raise RuntimeError(f"Decode process failed: {msg[1]}")
+            _, slot, seq, dt = msg
+            if self.timer is not None:
+                self.timer.add("decode", dt, self.stats.frames)
+            self.stats.add(dt)
+            with self._lock:
+                self._held[slot] = seq
+            yield self.ring.frames[slot]
+
+    def release(self, frame: np.ndarray):
+        """Trả slot của frame về free-list (gọi sau khi encoder ghi xong)."""
+        slot = self.ring.slot_of(frame)
+        with self._lock:
+            seq = self._held.pop(slot, None)
+        if seq is None:
+            raise ValueError(f"Slot {slot} released but not held")
+        if self.ring.seq[slot] != seq:
+            raise RuntimeError(f"Slot {slot} overwritten while in use (seq {seq} -> {self.ring.seq[slot]})")
+        self._free.put(slot)
+
+    def join(self):
+        self._stop.set()
+        self._proc.join(timeout=5)
+        if self._proc.is_alive():
+            self._proc.terminate()
+            self._proc.join()
+        for q in (self._free, self._ready):
+            q.cancel_join_thread()
+            q.close()
+        self.ring.close()
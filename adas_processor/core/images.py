@@ -0,0 +1,154 @@
+# core/images.py
+"""
+Xử lý ảnh tĩnh (JPEG / PNG) theo batch, thay cho việc mở từng ảnh như video 1 frame
+(cv2.VideoCapture + tracker + ffmpeg):
+- decode song song (ThreadPoolExecutor, cv2.imread nhả GIL), đọc trước 2 batch trong lúc detect
+- COCO + sign: 1 forward / batch IMAGE_BATCH_SIZE ảnh. Ảnh khác kích thước vẫn chung batch: backend
+  letterbox cả batch về imgsz x imgsz (pad nhiều hơn batch cùng kích thước, chỉ pad tới bội số 32)
+- không tracker: khoảng cách cho mọi xe (build_object_data tracker=None), không có tốc độ / TTC
+- alert qua AlertEngine, cooldown reset mỗi ảnh (các ảnh độc lập với nhau)
+- sensorData / alerts cùng format với video (SimulationLog, frame_index = thứ tự ảnh), nên stream /
+  sink dùng lại được; ảnh đã vẽ box chỉ ghi khi có annotate_dir
+"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from config.config import IMAGE_BATCH_SIZE, IMAGE_DECODE_WORKERS
+from .annotation import annotate_frame
+from .detection import Detector
+from .estimation import focal_pixels
+from .params import TuningParams, DEFAULT_PARAMS
+from .simulation_log import SimulationLog
+from utils.logger import get_logger
+
+logger = get_logger("ImageProcessor")
+
+
+def image_url(path: Path) -> str:
+    """Đường dẫn web (frontend) tới ảnh đã vẽ trong IMAGES_DIR/<simulation>/."""
+    return f"/Processed/images/{path.parent.name}/{path.name}"
+
+
+def _decode(path: Path):
+    t0 = time.perf_counter()
+    return cv2.imread(str(path), cv2.IMREAD_COLOR), time.perf_counter() - t0
+
+
+def _write_annotated(path: Path, image, obj_data, signs):
+    if not cv2.imwrite(str(path), annotate_frame(image, obj_data, signs)):
+        raise RuntimeError(f"Cannot write image: {path}")
+
+
+class ImageProcessor:
+    def __init__(self, detector: Detector, batch_size: int = IMAGE_BATCH_SIZE,
+                 workers: int = IMAGE_DECODE_WORKERS, params: Optional[TuningParams] = None):
+        # detector chia sẻ được (ModelRegistry), không giữ state của simulation
+        self.detector = detector
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        # 1 sensor entry / ảnh có object
+        self.params = replace(params or DEFAULT_PARAMS, frame_interval=0.0)
+
+    def run(self, paths: Sequence[Any], simulation_id: str, vehicle_id: str, user_id: str,
+            annotate_dir: Any = None, progress_cb: Optional[Callable[[int, int, float], None]] = None,
+            on_record: Optional[Callable[[str, Dict], None]] = None, collect: bool = True) -> Dict:
+        """
+        paths: ảnh theo thứ tự (index trong kết quả = frame_index của record).
+        annotate_dir: ghi ảnh đã vẽ box vào thư mục này (None = không ghi).
+        progress_cb(images_done, total, images/s) sau mỗi batch; exception (cancel) dừng xử lý.
+        on_record / collect: như ADASProcessor.run.
+        Ảnh không decode được -> entry có "error", không làm hỏng cả batch.
+        """
+        paths = [Path(p) for p in paths]
+        if annotate_dir is not None:
+            annotate_dir = Path(annotate_dir)
+            annotate_dir.mkdir(parents=True, exist_ok=True)
+        t_start = time.time()
+        log = SimulationLog(simulation_id, vehicle_id, user_id, self.params, start_epoch=t_start,
+                            on_record=on_record, collect=collect)
+        images: List[Optional[Dict]] = [None] * len(paths)
+        decode_s = infer_s = 0.0
+        done = failed = 0
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="adas-image") as pool:
+            todo = iter(enumerate(paths))
+            pending = deque()   # (index, path, future decode), đúng thứ tự
+            writes = []
+
+            def prefetch():
+                while len(pending) < 2 * self.batch_size:
+                    item = next(todo, None)
+                    if item is None:
+                        return
+                    pending.append((*item, pool.submit(_decode, item[1])))
+
+            prefetch()
+            while pending:
+                batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+                prefetch()   # batch sau decode trong lúc batch này detect
+                decoded = []
+                for idx, path, fut in batch:
+                    image, dt = fut.result()
+                    decode_s += dt
+                    if image is None:
+                        images[idx] = {"index": idx, "image": path.name, "error": "Cannot decode image"}
+                        failed += 1
+                    else:
+                        decoded.append((idx, path, image))
+
+                t0 = time.perf_counter()
+                frames = [image for _, _, image in decoded]
+                obj_raw = self.detector.predict_objects(frames)
+                sign_raw = self.detector.predict_signs(frames)
+                for (idx, path, image), det, sign_det in zip(decoded, obj_raw, sign_raw):
+                    H, W = image.shape[:2]
+                    obj_data, objs = Detector.objects_from_tracks(
+                        det[:, :4], np.full(len(det), -1), det[:, 5], focal_pixels(W, self.params.h_fov_deg),
+                        None, conf=det[:, 4])
+                    signs = self.detector.postprocess_signs(sign_det)
+                    log.engine.reset()
+                    alerts = log.add_frame(idx, 0.0, obj_data, objs, signs)
+                    entry = {"index": idx, "image": path.name, "width": W, "height": H,
+                             "objects": obj_data, "signs": signs, "alerts": alerts}
+                    if annotate_dir is not None:
+                        out = annotate_dir / f"{idx:04d}_{path.stem}.jpg"
+                        writes.append(pool.submit(_write_annotated, out, image, obj_data, signs))
+                        entry["imageUrl"] = image_url(out)
+                    images[idx] = entry
+                infer_s += time.perf_counter() - t0
+
+                done += len(batch)
+                if progress_cb:
+                    progress_cb(done, len(paths), done / max(time.time() - t_start, 1e-6))
+            for fut in writes:
+                fut.result()
+
+        wall_s = time.time() - t_start
+        logger.info(f"Processed {done} images ({failed} failed) in {wall_s:.2f}s")
+        summary = {
+            **log.summary(),
+            "images": {
+                "total": len(paths),
+                "failed": failed,
+                "batchSize": self.batch_size,
+                "wallTimeS": round(wall_s, 3),
+                "imagesPerS": round((done - failed) / wall_s, 2) if wall_s > 0 else 0.0,   # ảnh decode được
+                "decodeS": round(decode_s, 3),
+                "inferS": round(infer_s, 3),
+            },
+        }
+        return {
+            "status": "completed",
+            "summary": summary,
+            "sensorData": log.sensor_data,
+            "alerts": log.alerts,
+            "images": images,
+            "videoUrl": None,
+        }
@@ -0,0 +1,279 @@
+# core/live.py
+"""
+Chạy ADAS trên camera trực tiếp thay vì file đã upload.
+
+LiveSource đọc từ URL bất kỳ mà cv2.VideoCapture mở được (rtsp://, http(s):// MJPEG, file, ...)
+hoặc pipe frame BGR thô ("pipe:<path>" hoặc "-" = stdin, cần size). Thread capture luôn ghi
+đè frame mới nhất vào buffer 1 chỗ: inference chậm hơn camera -> frame cũ bị bỏ, độ trễ cảnh báo
+bị chặn (~ 1 khung hình + thời gian xử lý) thay vì tăng dần theo hàng đợi.
+
+LiveProcessor xử lý từng frame lấy được (detect + track + cảnh báo như ADASProcessor), đẩy sensor
+data / alert ra on_record ngay khi có và đo latency capture -> record.
+"""
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+from config.config import (
+    LIVE_URL_SCHEMES, LIVE_RECONNECT_TRIES, LIVE_RECONNECT_DELAY_S, LIVE_FRAME_TIMEOUT_S, LIVE_LATENCY_SAMPLES,
+    SIGN_DETECT_INTERVAL, ADAPTIVE_IMGSZ, ROI_MODE, ROI_DIR, PROGRESS_EVERY_FRAMES
+)
+from .detection import Detector
+from .estimation import focal_pixels
+from .params import DEFAULT_PARAMS
+from .roi import ObjectRoi
+from .scheduler import InferenceScheduler
+from .simulation_log import SimulationLog
+from .tracking import ObjectTracker
+from utils.logger import get_logger
+
+logger = get_logger("Live")
+
+
+class RawPipeCapture:
+    """cv2.VideoCapture-like: đọc frame BGR thô (W*H*3 byte / frame) từ file / FIFO / stdin."""
+    def __init__(self, path: str, size: Tuple[int, int], fps: float = 0.0):
+        self.W, self.H = size
+        self.fps = fps
+        self._f = sys.stdin.buffer if path == "-" else open(path, "rb", buffering=0)
+        self._nbytes = self.W * self.H * 3
+
+    def isOpened(self) -> bool:
+        return not self._f.closed
+
+    def read(self):
+        buf = bytearray(self._nbytes)
+        view, got = memoryview(buf), 0
+        while got < self._nbytes:
+            n = self._f.readinto(view[got:])
+            if not n:
+                return False, None   # hết stream (hoặc frame cuối không đủ byte)
+            got += n
+        return True, np.frombuffer(buf, dtype=np.uint8).reshape(self.H, self.W, 3)
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.W, cv2.CAP_PROP_FRAME_HEIGHT: self.H,
+                cv2.CAP_PROP_FPS: self.fps}.get(prop, 0.0)
+
+    def release(self):
+        if self._f is not sys.stdin.buffer:
+            self._f.close()
+
+
+class LatestFrame:
+    """Buffer 1 chỗ: producer ghi đè, consumer luôn lấy frame mới nhất."""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None   # (seq, capture_ts, frame)
+        self._closed = False
+
+    def put(self, seq: int, ts: float, frame):
+        with self._cond:
+            self._item = (seq, ts, frame)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get(self, after_seq: int, timeout: float):
+        """Frame có seq > after_seq; None nếu stream đã đóng / hết timeout mà không có frame mới."""
+        with self._cond:
+            ok = self._cond.wait_for(
+                lambda: self._closed or (self._item is not None and self._item[0] > after_seq), timeout)
+            if not ok or self._item is None or self._item[0] <= after_seq:
+                return None
+            return self._item
+
+
+class LiveSource:
+    def __init__(self, url: str, size: Optional[Tuple[int, int]] = None, fps: float = 0.0,
+                 reconnect_tries: int = LIVE_RECONNECT_TRIES):
+        self.url = url
+        self.size = size
+        self.reconnect_tries = reconnect_tries
+        self.captured = 0
+        self.error: Optional[str] = None
+        self._buf = LatestFrame()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.cap = self._open()
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or fps or 30.0
+        self.W = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.H = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # pipe / file / clip có số frame (kể cả qua http): hết = kết thúc, mở lại sẽ phát lại từ đầu
+        self.finite = self.is_pipe or not self.is_network or self.cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0
+
+    @property
+    def is_pipe(self) -> bool:
+        return self.url == "-" or self.url.startswith("pipe:")
+
+    @property
+    def is_network(self) -> bool:
+        return urlsplit(self.url).scheme.lower() in LIVE_URL_SCHEMES
+
+    def _open(self):
+        if self.is_pipe:
+            if self.size is None:
+                raise ValueError("Raw frame pipe needs a frame size (WxH)")
+            return RawPipeCapture(self.url[len("pipe:"):] if self.url != "-" else "-", self.size)
+        cap = cv2.VideoCapture(self.url)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open live source: {self.url}")
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)   # backend hỗ trợ thì giữ ít frame trong buffer riêng
+        return cap
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="live-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        tries = 0
+        try:
+            while not self._stop.is_set():
+                ret, frame = self.cap.read()
+                if ret:
+                    self.captured += 1
+                    tries = 0
+                    self._buf.put(self.captured, time.time(), frame)
+                    continue
+                # rớt kết nối (rtsp / http live) -> mở lại; pipe / file hết -> kết thúc
+                if self.finite or tries >= self.reconnect_tries:
+                    break
+                tries += 1
+                logger.warning(f"Live source read failed, reconnecting ({tries}/{self.reconnect_tries})")
+                self.cap.release()
+                time.sleep(LIVE_RECONNECT_DELAY_S)
+                try:
+                    self.cap = self._open()
+                except RuntimeError:
+                    continue
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self._buf.close()
+
+    def frames(self, timeout: float = LIVE_FRAME_TIMEOUT_S) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """(seq, capture_ts, frame) mới nhất mỗi lần; seq nhảy cóc = frame bị bỏ."""
+        seq = 0
+        while not self._stop.is_set():
+            item = self._buf.get(seq, timeout)
+            if item is None:
+                return
+            seq = item[0]
+            yield item
+
+    def close(self):
+        self._stop.set()
+        self._buf.close()
+        if self._thread is not None and not self.is_pipe:
+            self._thread.join(timeout=2)   # pipe: read() có thể đang block, thread daemon tự kết thúc
+        self.cap.release()
+
+
+def _latency_ms(samples) -> Dict:
+    if not samples:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(samples, (50, 95, 99)) * 1000
+    return {"count": len(samples), "p50Ms": round(p50, 1), "p95Ms": round(p95, 1),
+            "p99Ms": round(p99, 1), "maxMs": round(max(samples) * 1000, 1)}
+
+
+class LiveProcessor:
+    def __init__(self, detector: Detector, adaptive_imgsz: bool = ADAPTIVE_IMGSZ,
+                 roi_mode: str = ROI_MODE, roi_dir=ROI_DIR, sign_interval: int = SIGN_DETECT_INTERVAL):
+        self.detector = detector
+        self.adaptive_imgsz = adaptive_imgsz
+        self.roi_mode = roi_mode
+        self.roi_dir = roi_dir
+        self.sign_interval = max(1, sign_interval)
+
+    def run(self, source: LiveSource, simulation_id: str, vehicle_id: str, user_id: str,
+            on_record: Optional[Callable[[str, Dict], None]] = None,
+            should_stop: Optional[Callable[[], bool]] = None,
+            progress_cb: Optional[Callable[[int, int, float], None]] = None,
+            duration_s: Optional[float] = None, max_frames: Optional[int] = None) -> Dict:
+        """
+        Chạy tới khi stream kết thúc, hết duration_s / max_frames (frame đã xử lý) hoặc should_stop().
+        Record không được giữ lại (phiên live không giới hạn độ dài) -> chỉ đi qua on_record.
+        """
+        W, H = source.W, source.H
+        params = DEFAULT_PARAMS
+        f_pix = focal_pixels(W, params.h_fov_deg)
+        tracker = ObjectTracker(fps=source.fps)
+        scheduler = InferenceScheduler(enabled=False, adaptive_imgsz=self.adaptive_imgsz, params=params)
+        roi = ObjectRoi(W, H, vehicle_id, self.roi_mode, self.roi_dir)
+
+        # cửa sổ trượt: phiên live dài hàng giờ không giữ mọi mẫu
+        frame_latency, alert_latency = deque(maxlen=LIVE_LATENCY_SAMPLES), deque(maxlen=LIVE_LATENCY_SAMPLES)
+        current = {"ts": 0.0}
+
+        def emit(kind, record):
+            if kind == "alert":
+                alert_latency.append(time.time() - current["ts"])
+            if on_record:
+                on_record(kind, record)
+
+        t_start = time.time()
+        log = SimulationLog(simulation_id, vehicle_id, user_id, params, start_epoch=t_start,
+                            on_record=emit, collect=False)
+        processed = 0
+        source.start()
+        try:
+            for seq, cap_ts, frame in source.frames():
+                current["ts"] = cap_ts
+                frame_ts = cap_ts - t_start   # tốc độ / cooldown theo thời điểm capture thật
+                rois = [roi.next()] if roi.active else None
+                det = self.detector.predict_objects([frame], scheduler.object_imgsz(1), rois)[0]
+                obj_data, objs = self.detector.postprocess_objects(det, f_pix, tracker, frame_ts)
+                scheduler.adapt(obj_data)
+                roi.observe(obj_data)
+                signs = self.detector.detect_signs(frame) if processed % self.sign_interval == 0 else []
+                log.add_frame(seq - 1, frame_ts, obj_data, objs, signs)
+                frame_latency.append(time.time() - cap_ts)
+                processed += 1
+
+                elapsed = time.time() - t_start
+                if progress_cb and processed % PROGRESS_EVERY_FRAMES == 0:
+                    progress_cb(processed, 0, processed / max(elapsed, 1e-6))
+                if (should_stop and should_stop()) or (max_frames and processed >= max_frames) \
+                        or (duration_s and elapsed >= duration_s):
+                    break
+        finally:
+            source.close()
+        roi.save()
+
+        wall = time.time() - t_start
+        if source.error:
+            logger.warning(f"Live source stopped with error: {source.error}")
+        summary = {
+            **log.summary(),
+            "pipeline": {
+                "frames": processed,
+                "wallTimeS": round(wall, 3),
+                "fps": round(processed / wall, 2) if wall > 0 else 0.0,
+                "videoS": round(wall, 3),
+            },
+            "live": {
+                "source": source.url,
+                "sourceFps": round(source.fps, 2),
+                "captured": source.captured,
+                "dropped": max(source.captured - processed, 0),
+                "sourceError": source.error,
+                # capture -> xử lý xong frame / capture -> phát alert
+                "frameLatency": _latency_ms(frame_latency),
+                "alertLatency": _latency_ms(alert_latency),
+            },
+        }
+        if roi.active:
+            summary["roi"] = roi.report()
+        logger.info(f"📡 Live session {simulation_id} ended: {processed}/{source.captured} frames processed")
+        return {"status": "completed", "summary": summary, "sensorData": [], "alerts": [], "videoUrl": None}
@@ -0,0 +1,80 @@
+# core/model_registry.py
+import threading
+import time
+from typing import Dict, Optional
+
+from config.config import YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE, MODEL_WARMUP
+from .detection import Detector
+from utils.logger import get_logger
+
+logger = get_logger("ModelRegistry")
+
+
+class ModelRegistry:
+    """
+    Process-wide holder of the YOLO models.
+    Models are loaded (and warmed up) once; every ADASProcessor of this process
+    shares the same Detector. Per-simulation state stays in ObjectTracker.
+    """
+    def __init__(self, coco_model_path: str = YOLO_MODEL_PATH,
+                 sign_model_path: str = TRAFFIC_SIGN_MODEL_PATH, device: str = DEVICE):
+        self.coco_model_path = coco_model_path
+        self.sign_model_path = sign_model_path
+        self.device = device
+        self._detector: Optional[Detector] = None
+        self._lock = threading.Lock()
+        self.load_count = 0
+        self.load_time_s: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._detector is not None
+
+    def load(self) -> Detector:
+        """Load + warm up the models (no-op if already loaded)."""
+        with self._lock:
+            if self._detector is None:
+                t0 = time.time()
+                try:
+                    detector = Detector(self.coco_model_path, self.sign_model_path, self.device)
+                    if MODEL_WARMUP:
+                        detector.warmup()
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"❌ Model load failed: {e}")
+                    raise
+                self._detector = detector
+                self.device = detector.device   # "auto" -> thiết bị thật
+                self.load_count += 1
+                self.load_time_s = time.time() - t0
+                self.error = None
+                logger.info(f"✅ Models loaded on {self.device} in {self.load_time_s:.2f}s")
+        return self._detector
+
+    def get_detector(self) -> Detector:
+        if self._detector is not None:
+            return self._detector
+        return self.load()
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "device": self.device,
+            "loadCount": self.load_count,
+            "loadTimeS": self.load_time_s,
+            "error": self.error,
+        }
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Return the registry of this process (created on first use)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
@@ -0,0 +1,73 @@
+# core/params.py
+"""
+Tham số chỉ dùng sau inference (khoảng cách, cảnh báo, lấy mẫu sensor data).
+Đổi các tham số này không cần chạy lại model: replay từ detection store (core/replay.py).
+"""
+import ast
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, Tuple
+
+import numpy as np
+
+from config.config import (
+    H_FOV_DEG, DIST_WARN_M, TTC_WARN_S, ALERT_COOLDOWN_S, ALERT_RULES, FRAME_INTERVAL, W_REAL_M
+)
+
+
+@dataclass
+class TuningParams:
+    h_fov_deg: float = H_FOV_DEG
+    dist_warn_m: float = DIST_WARN_M
+    ttc_warn_s: float = TTC_WARN_S
+    alert_cooldown_s: float = ALERT_COOLDOWN_S
+    alert_rules: Tuple[str, ...] = ALERT_RULES
+    frame_interval: float = FRAME_INTERVAL
+    w_real_m: Dict[int, float] = field(default_factory=lambda: dict(W_REAL_M))
+
+    # tên hằng số trong config.py -> field
+    CONFIG_NAMES = {
+        "H_FOV_DEG": "h_fov_deg",
+        "DIST_WARN_M": "dist_warn_m",
+        "TTC_WARN_S": "ttc_warn_s",
+        "ALERT_COOLDOWN_S": "alert_cooldown_s",
+        "ALERT_RULES": "alert_rules",
+        "FRAME_INTERVAL": "frame_interval",
+        "W_REAL_M": "w_real_m",
+    }
+
+    @cached_property
+    def w_lut(self) -> np.ndarray:
+        """width thật (m) theo class id, class không có trong w_real_m -> 1.8 như est_distance_m."""
+        lut = np.full(max(self.w_real_m, default=0) + 2, 1.8)   # phần tử cuối cho class id ngoài bảng
+        lut[list(self.w_real_m)] = list(self.w_real_m.values())
+        return lut
+
+    @classmethod
+    def from_overrides(cls, overrides: Dict[str, str]) -> "TuningParams":
+        """
+        {"DIST_WARN_M": "6", "W_REAL_M": "{2: 1.9}", "ALERT_RULES": "collision,forward_collision"}
+        -> TuningParams (W_REAL_M được merge, ALERT_RULES: tên luật cách nhau bởi dấu phẩy hoặc tuple).
+        """
+        params = cls()
+        for name, raw in overrides.items():
+            attr = cls.CONFIG_NAMES.get(name.upper())
+            if attr is None:
+                raise ValueError(f"Unknown tuning parameter: {name} (choose from {', '.join(cls.CONFIG_NAMES)})")
+            if attr == "alert_rules":
+                from .alerts import build_rules   # alerts import params
+                value = tuple(r.strip() for r in raw.split(",") if r.strip()) if isinstance(raw, str) else tuple(raw)
+                build_rules(value)                # tên luật sai -> ValueError
+            elif attr == "w_real_m":
+                value = ast.literal_eval(raw) if isinstance(raw, str) else raw
+                value = {**params.w_real_m, **{int(k): float(v) for k, v in value.items()}}
+            else:
+                value = float(ast.literal_eval(raw) if isinstance(raw, str) else raw)
+            setattr(params, attr, value)
+        return params
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, attr) for name, attr in self.CONFIG_NAMES.items()}
+
+
+DEFAULT_PARAMS = TuningParams()
@@ -0,0 +1,208 @@
+# core/pipeline.py
+"""
+Decode -> infer -> annotate/encode pipeline.
+
+FrameReader (decode thread) và FrameEncoder (annotate + encode thread) nối với
+stage inference (thread gọi) bằng queue giới hạn `depth`. Queue FIFO 1 producer /
+1 consumer nên thứ tự frame được giữ nguyên. depth = 0 -> chạy tuần tự, không thread.
+Decode ở process riêng + frame qua shared memory: core.frame_ring.ShmFrameReader.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+_END = object()
+
+
+class StageStats:
+    """Số frame + thời gian bận của 1 stage (để tính fps riêng của stage)."""
+    def __init__(self):
+        self.frames = 0
+        self.busy_s = 0.0
+
+    def add(self, seconds: float, frames: int = 1):
+        self.busy_s += seconds
+        self.frames += frames
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.busy_s if self.busy_s > 0 else 0.0
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up when the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Blocking get; returns _END when the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+class FrameReader:
+    """Đọc frame từ cv2.VideoCapture; iterate để lấy frame theo thứ tự."""
+    transport = "thread"
+
+    def __init__(self, cap, depth: int, stop: threading.Event, timer=None):
+        self.cap = cap
+        self.depth = depth
+        self.stop = stop
+        self.timer = timer   # core.profiling.StageTimer (tuỳ chọn)
+        self.stats = StageStats()
+        self.error = None
+        self._q = queue.Queue(maxsize=depth) if depth > 0 else None
+        self._thread = None
+
+    def start(self):
+        if self._q is not None:
+            self._thread = threading.Thread(target=self._run, name="adas-decode", daemon=True)
+            self._thread.start()
+        return self
+
+    def _read(self):
+        t0 = time.perf_counter()
+        ret, frame = self.cap.read()
+        if ret:
+            dt = time.perf_counter() - t0
+            if self.timer is not None:
+                self.timer.add("decode", dt, self.stats.frames)
+            self.stats.add(dt)
+        return frame if ret else None
+
+    def _run(self):
+        try:
+            while not self.stop.is_set():
+                frame = self._read()
+                if frame is None or not _put(self._q, frame, self.stop):
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            _put(self._q, _END, self.stop)
+
+    def __iter__(self):
+        if self._q is None:
+            while not self.stop.is_set():
+                frame = self._read()
+                if frame is None:
+                    return
+                yield frame
+            return
+        while True:
+            item = _get(self._q, self.stop)
+            if item is _END:
+                break
+            yield item
+        if self.error is not None:
+            raise self.error
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+
+class FrameEncoder:
+    """
+    Annotate + ghi frame ra writer theo đúng thứ tự đã put().
+    release(frame): gọi sau khi ghi xong (vd. trả slot về ShmFrameReader).
+    """
+    def __init__(self, writer, annotate: Callable, depth: int, stop: threading.Event, timer=None,
+                 release: Optional[Callable] = None):
+        self.writer = writer
+        self.annotate = annotate
+        self.release = release
+        self.depth = depth
+        self.stop = stop
+        self.timer = timer
+        self.stats = StageStats()
+        self.error = None
+        self._q = queue.Queue(maxsize=depth) if depth > 0 else None
+        self._thread = None
+
+    def start(self):
+        if self._q is not None:
+            self._thread = threading.Thread(target=self._run, name="adas-encode", daemon=True)
+            self._thread.start()
+        return self
+
+    def _write(self, frame, *meta):
+        t0 = time.perf_counter()
+        out = self.annotate(frame, *meta)
+        t1 = time.perf_counter()
+        self.writer.write(out)
+        t2 = time.perf_counter()
+        if self.release is not None:
+            self.release(frame)
+        if self.timer is not None:
+            self.timer.add("draw", t1 - t0, self.stats.frames)
+            self.timer.add("encode", t2 - t1, self.stats.frames)
+        self.stats.add(t2 - t0)
+
+    def _run(self):
+        try:
+            while True:
+                item = _get(self._q, self.stop)
+                if item is _END:
+                    break
+                self._write(*item)
+        except Exception as e:
+            self.error = e
+            self.stop.set()
+
+    def put(self, frame, *meta):
+        if self.error is not None:
+            raise self.error
+        if self._q is None:
+            self._write(frame, *meta)
+        else:
+            _put(self._q, (frame, *meta), self.stop)
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        """Chờ ghi hết frame còn trong queue."""
+        if self._thread is not None:
+            _put(self._q, _END, self.stop)
+            self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def batched(frames: Iterable, size: int) -> Iterator[List]:
+    """Gom frame thành list tối đa `size` phần tử (batch cuối có thể nhỏ hơn)."""
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stage_summary(reader: FrameReader, infer: StageStats, encoder: FrameEncoder,
+                  frames: int, wall_s: float) -> Dict:
+    return {
+        "transport": reader.transport,
+        "queueDepth": reader.depth,
+        "frames": frames,
+        "wallTimeS": round(wall_s, 3),
+        "fps": round(frames / wall_s, 2) if wall_s > 0 else 0.0,
+        "decodeFps": round(reader.stats.fps, 2),
+        "inferFps": round(infer.fps, 2),
+        "encodeFps": round(encoder.stats.fps, 2),
+    }
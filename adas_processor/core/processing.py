@@ -1,42 +1,67 @@
 # core/processing.py
 import cv2
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 from config.config import (
-    FRAMES_DIR, VIDEOS_DIR, H_FOV_DEG,
-    SAVE_FRAMES, SHOW_PREVIEW, DIST_WARN_M,
-    ALERT_COOLDOWN_S, FRAME_INTERVAL
+    DETECTIONS_DIR, SHOW_PREVIEW, PROGRESS_EVERY_FRAMES,
+    PIPELINE_QUEUE_DEPTH, PIPELINE_TRANSPORT, INFERENCE_BATCH_SIZE, ADAPTIVE_SKIP, VIDEO_ENCODER, DETECTION_STORE,
+    PROFILE_STAGES, ADAPTIVE_IMGSZ, ROI_MODE, ROI_DIR
 )
 from .tracking import ObjectTracker
 from .detection import Detector
 from .estimation import focal_pixels
-from utils.helpers import current_timestamp
+from .annotation import annotate_frame
+from .pipeline import FrameReader, FrameEncoder, StageStats, batched, stage_summary
+from .frame_ring import ShmFrameReader
+from .scheduler import InferenceScheduler
+from .params import DEFAULT_PARAMS
+from .simulation_log import SimulationLog
+from .detection_store import DetectionStoreWriter
+from .profiling import StageTimer
+from .roi import ObjectRoi
 from utils.logger import get_logger
-from service.video_utils import finalize_video
+from service.video_utils import (
+    FFmpegPipeWriter, ffmpeg_available, final_video_path, finalize_video, video_url
+)
 
 logger = get_logger("ADASProcessor")
 
-FRAMES_DIR = Path(FRAMES_DIR); FRAMES_DIR.mkdir(parents=True, exist_ok=True)
-VIDEOS_DIR = Path(VIDEOS_DIR); VIDEOS_DIR.mkdir(parents=True, exist_ok=True)
 
 class ADASProcessor:
-    def __init__(self, coco_model: str, sign_model: str, device: str = "cpu"):
-        self.detector = Detector(coco_model, sign_model, device)
-        self.tracker = ObjectTracker()
+    def __init__(self, coco_model: Optional[str] = None, sign_model: Optional[str] = None,
+                 device: str = "cpu", detector: Optional[Detector] = None,
+                 adaptive_skip: bool = ADAPTIVE_SKIP, adaptive_imgsz: bool = ADAPTIVE_IMGSZ,
+                 roi_mode: str = ROI_MODE, roi_dir: Any = ROI_DIR, transport: str = PIPELINE_TRANSPORT):
+        # detector có thể được chia sẻ (ModelRegistry) -> không giữ state của simulation ở đây
+        self.detector = detector if detector is not None else Detector(coco_model, sign_model, device)
         self.device = device
-        self._last_alert_time = {}  # key = (alert_type or (track_id, type)) -> timestamp
-
-    def _should_emit_alert(self, key, now, cooldown=ALERT_COOLDOWN_S) -> bool:
-        last = self._last_alert_time.get(key)
-        if last is None or (now - last) > cooldown:
-            self._last_alert_time[key] = now
-            return True
-        return False
+        self.adaptive_skip = adaptive_skip
+        self.adaptive_imgsz = adaptive_imgsz
+        self.roi_mode = roi_mode
+        self.roi_dir = roi_dir
+        self.transport = transport
 
     def run(self, video_path: str, output_path: Any, simulation_id: str,
-            vehicle_id: str, user_id: str) -> Dict:
+            vehicle_id: str, user_id: str,
+            progress_cb: Optional[Callable[[int, int, float], None]] = None,
+            on_record: Optional[Callable[[str, Dict], None]] = None,
+            collect: bool = True, store_path: Any = None, profile: Optional[bool] = None,
+            timer: Optional[StageTimer] = None) -> Dict:
+        """
+        progress_cb(frames_done, total_frames, fps) được gọi mỗi PROGRESS_EVERY_FRAMES frame.
+        Exception raise từ progress_cb (vd: job bị cancel) sẽ dừng xử lý.
+        on_record(kind, record) nhận từng sensor entry ("sensor") / alert ("alert") ngay khi
+        có (streaming). collect=False: không giữ lại trong sensorData/alerts của kết quả ->
+        bộ nhớ không tăng theo độ dài video.
+        store_path: lưu detection từng frame (Parquet) để replay (core/replay.py);
+        mặc định DETECTIONS_DIR/simulation_<id>.parquet nếu DETECTION_STORE bật.
+        profile: đo thời gian từng stage -> summary["profile"] (mặc định PROFILE_STAGES).
+        timer: StageTimer của caller (vd. worker gửi histogram về /metrics), đo kể cả khi profile tắt.
+        """
         output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)   # thư mục output chỉ tạo khi thật sự ghi
         raw_out = output_path.with_name(output_path.stem + "_raw.mp4")
 
         cap = cv2.VideoCapture(str(video_path))
@@ -44,114 +69,184 @@ class ADASProcessor:
             raise RuntimeError(f"Cannot open video: {video_path}")
 
         fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
         W = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 1280
         H = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 720
-        f_pix = focal_pixels(W, H_FOV_DEG)
-
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        writer = cv2.VideoWriter(str(raw_out), fourcc, fps, (W, H))
+        params = DEFAULT_PARAMS
+        f_pix = focal_pixels(W, params.h_fov_deg)
+
+        # encode 1 lần qua ffmpeg pipe; không có ffmpeg -> mp4v tạm + finalize_video như cũ
+        piped = VIDEO_ENCODER == "ffmpeg_pipe" and ffmpeg_available()
+        if piped:
+            out_file = final_video_path(simulation_id, output_path.parent)
+            writer = FFmpegPipeWriter(out_file, fps, (W, H))
+        else:
+            if VIDEO_ENCODER == "ffmpeg_pipe":
+                logger.warning("ffmpeg not found, falling back to OpenCV mp4v writer")
+            out_file = raw_out
+            writer = cv2.VideoWriter(str(raw_out), cv2.VideoWriter_fourcc(*'mp4v'), fps, (W, H))
         if not writer.isOpened():
-            raise RuntimeError(f"Cannot open video writer: {raw_out}")
+            raise RuntimeError(f"Cannot open video writer: {out_file}")
 
-        sensor_data: List[Dict] = []
-        alerts: List[Dict] = []
-        frame_idx = 0
+        # per-simulation state
+        tracker = ObjectTracker(fps=fps)
+        scheduler = InferenceScheduler(enabled=self.adaptive_skip, adaptive_imgsz=self.adaptive_imgsz, params=params)
+        roi = ObjectRoi(W, H, vehicle_id, self.roi_mode, self.roi_dir)
+        signs: List[Dict] = []
         t_start = time.time()
-        last_sensor_time = 0
+        log = SimulationLog(simulation_id, vehicle_id, user_id, params, start_epoch=t_start,
+                            on_record=on_record, collect=collect)
+        frame_idx = 0
+
+        if store_path is None and DETECTION_STORE:
+            store_path = Path(DETECTIONS_DIR) / f"simulation_{simulation_id}.parquet"
+        store = None
+        if store_path is not None:
+            store = DetectionStoreWriter(store_path, {
+                "video": str(video_path), "fps": fps, "width": W, "height": H,
+                "simulationId": simulation_id, "vehicleId": vehicle_id, "userId": user_id,
+                "startEpoch": t_start, "params": params.to_dict(),
+                "signNames": getattr(self.detector.model_sign, "names", {}),
+            })
+
+        # decode / encode chạy ở thread riêng, inference ở thread hiện tại
+        depth = 0 if SHOW_PREVIEW else PIPELINE_QUEUE_DEPTH  # preview cần main thread
+        stop = threading.Event()
+        profile = PROFILE_STAGES if profile is None else profile
+        if timer is None:
+            timer = StageTimer(enabled=profile)
+        obj_timer = timer if timer.enabled else None
+        if self.transport == "shm" and depth > 0:
+            # decode ở process riêng, ghi thẳng vào shared memory; encoder trả slot sau khi ghi
+            reader = ShmFrameReader(video_path, (H, W, 3), depth, stop, obj_timer, INFERENCE_BATCH_SIZE).start()
+            release = reader.release
+        else:
+            reader = FrameReader(cap, depth, stop, obj_timer).start()
+            release = None
+        encoder = FrameEncoder(writer, annotate_frame, depth, stop, obj_timer, release).start()
+        infer_stats = StageStats()
 
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
+            for frames in batched(reader, INFERENCE_BATCH_SIZE):
+                # 1 forward pass / model cho các frame cần detect trong batch
+                t_infer = time.perf_counter()
+                obj_plan, sign_plan = scheduler.plan(frame_idx, len(frames))
+                obj_frames = [f for f, p in zip(frames, obj_plan) if p]
+                rois = [roi.next() for _ in obj_frames] if roi.active else None
+                obj_raw = iter(self.detector.predict_objects(obj_frames, scheduler.object_imgsz(len(obj_frames)), rois))
+                t_sign = time.perf_counter()
+                sign_raw = iter(self.detector.predict_signs([f for f, p in zip(frames, sign_plan) if p]))
+                t_done = time.perf_counter()
+                infer_stats.add(t_done - t_infer, frames=len(frames))
+                if timer.enabled:
+                    # 1 forward cho cả batch -> chia đều cho các frame được detect
+                    for stage, plan, dt in (("detect", obj_plan, t_sign - t_infer), ("signs", sign_plan, t_done - t_sign)):
+                        idx = [frame_idx + i for i, p in enumerate(plan) if p]
+                        for i in idx:
+                            timer.add(stage, dt / len(idx), i)
+
+                for frame, do_obj, do_sign in zip(frames, obj_plan, sign_plan):
+                    t_post = time.perf_counter()
+                    # tracker + nội suy đi đúng thứ tự frame
+                    frame_ts = frame_idx / fps
+                    if do_obj:
+                        obj_data, objs = self.detector.postprocess_objects(
+                            next(obj_raw), f_pix, tracker, frame_ts, timer=obj_timer, frame_idx=frame_idx
+                        )
+                        scheduler.observe(frame_idx, obj_data)
+                        roi.observe(obj_data)
+                    else:
+                        with timer.stage("postprocess", frame_idx):
+                            obj_data, objs = self.detector.build_objects(
+                                scheduler.predict(frame_idx), f_pix, tracker, frame_ts
+                            )
+                    scheduler.adapt(obj_data, self.detector.unconfirmed_tracks(tracker))
+                    if do_sign:
+                        with timer.stage("signs", frame_idx):
+                            signs = self.detector.postprocess_signs(next(sign_raw))
+                        scheduler.observe_signs(frame_idx)
+
+                    with timer.stage("postprocess", frame_idx):
+                        log.add_frame(frame_idx, frame_ts, obj_data, objs, signs if do_sign else [])  # signs cũ chỉ để vẽ
+                        if store is not None:
+                            store.add_frame(frame_idx, frame_ts, obj_data, objs, not do_obj, signs if do_sign else None)
+
+                    infer_stats.add(time.perf_counter() - t_post, frames=0)
+
+                    # --- Vẽ + ghi video (thread encoder, giữ đúng thứ tự frame) ---
+                    encoder.put(frame, obj_data, signs)
+                    frame_idx += 1
+
+                    if SHOW_PREVIEW:
+                        cv2.imshow("ADAS", frame)  # depth = 0 -> frame đã được vẽ
+                        if cv2.waitKey(1) & 0xFF == ord("q"):
+                            stop.set()  # 'q' -> dừng
+                            break
+
+                    if frame_idx % 100 == 0:
+                        logger.info(f"Processed frames: {frame_idx}, elapsed: {time.time() - t_start:.1f}s")
+                    if progress_cb and frame_idx % PROGRESS_EVERY_FRAMES == 0:
+                        progress_cb(frame_idx, total_frames, frame_idx / max(time.time() - t_start, 1e-6))
+
+                if stop.is_set():
                     break
 
-                vis, obj_data, obj_alerts = self.detector.detect_objects(
-                    frame, W, f_pix, self.tracker, frame_idx, simulation_id
-                )
-                vis, sign_alerts = self.detector.detect_signs(vis)
-
-                ts = current_timestamp()
-                now = time.time()
-
-                # --- chọn object gần nhất ---
-                nearest_obj = None
-                if obj_data:
-                    nearest_obj = min(obj_data, key=lambda d: d.get("dist") or 1e9)
-
-                # --- SensorData chỉ log mỗi FRAME_INTERVAL ---
-                if nearest_obj and now - last_sensor_time >= FRAME_INTERVAL:
-                    sensor_entry = {
-                        "vehicleId": vehicle_id,
-                        "simulationId": simulation_id,
-                        "userId": user_id,
-                        "timestamp": ts,
-                        "speed": float(nearest_obj.get("speed") or 0.0),
-                        "distance_to_object": float(nearest_obj.get("dist") or 0.0),
-                        "lane_status": nearest_obj.get("lane_status", "within"),
-                        "obstacle_detected": bool(nearest_obj.get("obstacle_detected")),
-                        "camera_frame_url": None,
-                        "track_id": nearest_obj.get("track_id"),
-                        "frame_index": frame_idx,
-                        "ttc": nearest_obj.get("ttc"),
-                        "warn": bool(nearest_obj.get("warn"))
-                    }
-                    sensor_data.append(sensor_entry)
-                    last_sensor_time = now
-
-                # --- Alerts (tổng hợp + cooldown) ---
-                def emit_once(key, atype, desc, severity="medium"):
-                    if self._should_emit_alert(key, now):
-                        alerts.append({
-                            "type": atype,
-                            "description": desc,
-                            "severity": severity,
-                            "timestamp": ts
-                        })
-
-                if any(a["type"] == "collision" for a in obj_alerts):
-                    emit_once("collision", "collision", "Collision risk detected", "high")
-                if any(a["type"] == "lane_departure" for a in obj_alerts):
-                    emit_once("lane_departure", "lane_departure", "Lane departure detected", "high")
-                if any(a["type"] == "obstacle" for a in obj_alerts):
-                    emit_once("obstacle", "obstacle", "Obstacle detected ahead", "low")
-                for a in sign_alerts:
-                    emit_once(f"sign_{a['description']}", "traffic_sign", a["description"], "medium")
-
-                # --- Ghi video ---
-                writer.write(vis)
-                frame_idx += 1
-
-                if SHOW_PREVIEW:
-                    cv2.imshow("ADAS", vis)
-                    if cv2.waitKey(1) & 0xFF == ord("q"):
-                        break
-
-                if frame_idx % 100 == 0:
-                    logger.info(f"Processed frames: {frame_idx}, elapsed: {time.time() - t_start:.1f}s")
-
+            encoder.close()
+            with timer.stage("finalize"):
+                writer.release()   # pipe: chờ ffmpeg ghi xong file final
+        except BaseException:
+            # dừng giữa chừng (lỗi / cancel) -> bỏ file dở dang
+            stop.set()
+            encoder.join()
+            if piped:
+                writer.abort()
+            else:
+                writer.release()
+            out_file.unlink(missing_ok=True)
+            if store is not None:
+                store.abort()
+            raise
         finally:
+            stop.set()
+            reader.join()
             cap.release()
             writer.release()
             if SHOW_PREVIEW:
                 cv2.destroyAllWindows()
 
-        # convert raw -> h264 final file (dùng video_utils)
-        final_url = finalize_video(simulation_id, raw_out, output_path.parent)
-        if not final_url:
-            final_url = f"/Processed/videos/{raw_out.name}"
+        if store is not None:
+            store.close()
+        roi.save()
+        pipeline_stats = stage_summary(reader, infer_stats, encoder, frame_idx, time.time() - t_start)
+        pipeline_stats["videoS"] = round(frame_idx / fps, 3)
+        if progress_cb:
+            progress_cb(frame_idx, total_frames, pipeline_stats["fps"])
+
+        if piped:
+            final_url = video_url(out_file)
+        else:
+            # convert raw -> h264 final file (dùng video_utils)
+            with timer.stage("finalize"):
+                final_url = finalize_video(simulation_id, raw_out, output_path.parent)
+            if not final_url:
+                final_url = video_url(raw_out)
 
         summary = {
-            "totalAlerts": len(alerts),
-            "collisionCount": sum(1 for a in alerts if a["type"] == "collision"),
-            "trafficSignCount": sum(1 for a in alerts if a["type"] == "traffic_sign"),
-            "laneDepartureCount": sum(1 for a in alerts if a["type"] == "lane_departure"),
-            "obstacleCount": sum(1 for a in alerts if a["type"] == "obstacle"),
+            **log.summary(),
+            "pipeline": pipeline_stats,
+            "frameSchedule": scheduler.report(),
         }
+        if roi.active:
+            summary["roi"] = roi.report()
+        if store is not None:
+            summary["detectionStore"] = str(store.path)
+        if profile:
+            summary["profile"] = timer.summary(frame_idx)
 
         return {
             "status": "completed",
             "summary": summary,
-            "sensorData": sensor_data,
-            "alerts": alerts,
+            "sensorData": log.sensor_data,
+            "alerts": log.alerts,
             "videoUrl": final_url
         }
@@ -0,0 +1,110 @@
+# core/profiling.py
+"""
+Timer theo stage cho ADASProcessor.run (bật bằng PROFILE_STAGES hoặc run(..., profile=True)).
+
+Mỗi stage ghi (frame_idx, giây) vào array -> ~16 byte / sample, 1 giờ video 30 fps vài MB.
+Latency 1 frame = tổng thời gian các stage của frame đó (không tính thời gian chờ trong queue).
+"""
+import resource
+import sys
+import time
+from array import array
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+import numpy as np
+
+# thứ tự hiển thị trong summary
+STAGES = ("decode", "detect", "track", "signs", "postprocess", "draw", "encode", "finalize")
+# upper bound (giây) các bucket của histogram() (metrics); finalize có thể vài giây
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NULL = nullcontext()
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)   # macOS: byte, Linux: KB
+
+
+def _percentiles_ms(seconds: np.ndarray) -> Dict:
+    p50, p95, p99 = np.percentile(seconds, (50, 95, 99)) * 1000
+    return {"p50Ms": round(p50, 3), "p95Ms": round(p95, 3), "p99Ms": round(p99, 3),
+            "maxMs": round(seconds.max() * 1000, 3)}
+
+
+class StageTimer:
+    """
+    add() / stage() gọi được từ nhiều thread (decode, infer, encode): mỗi stage chỉ do 1 thread ghi.
+    enabled = False -> mọi lời gọi là no-op.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._idx: Dict[str, array] = {}
+        self._sec: Dict[str, array] = {}
+
+    def add(self, stage: str, seconds: float, frame_idx: Optional[int] = None):
+        """frame_idx = None: stage chạy 1 lần / video (vd. finalize), không tính vào latency frame."""
+        if not self.enabled:
+            return
+        if stage not in self._sec:
+            self._idx[stage], self._sec[stage] = array("q"), array("d")
+        self._idx[stage].append(-1 if frame_idx is None else frame_idx)
+        self._sec[stage].append(seconds)
+
+    def stage(self, name: str, frame_idx: Optional[int] = None):
+        """with timer.stage("track", frame_idx): ..."""
+        return self._timed(name, frame_idx) if self.enabled else _NULL
+
+    @contextmanager
+    def _timed(self, name, frame_idx):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0, frame_idx)
+
+    def _samples(self, name: str, frames: Optional[int] = None):
+        """-> (thời gian stage mỗi lần chạy, thời gian theo frame_idx hoặc None)."""
+        idx = np.frombuffer(self._idx[name], dtype=np.int64)
+        sec = np.frombuffer(self._sec[name], dtype=np.float64)
+        framed = idx >= 0
+        if not framed.any():
+            return sec, None
+        # 1 stage có thể ghi nhiều lần / frame (vd. postprocess) -> gộp theo frame
+        cost = np.bincount(idx[framed], weights=sec[framed], minlength=frames or 0)
+        ran = np.bincount(idx[framed], minlength=len(cost)) > 0
+        return np.concatenate([cost[ran], sec[~framed]]), cost
+
+    def summary(self, frames: Optional[int] = None) -> Dict:
+        stages = {}
+        per_frame = None
+        for name in sorted(self._sec, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            samples, cost = self._samples(name, frames)
+            if cost is not None:
+                per_frame = cost if per_frame is None else _add_padded(per_frame, cost)
+            stages[name] = {"count": len(samples), "totalS": round(float(samples.sum()), 4),
+                            "meanMs": round(float(samples.mean()) * 1000, 3), **_percentiles_ms(samples)}
+        out = {"stages": stages}
+        if per_frame is not None:
+            out["frameLatency"] = _percentiles_ms(per_frame)
+        out["peakRssMb"] = peak_rss_mb()
+        out["peakRssChildrenMb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)   # ffmpeg
+        return out
+
+    def histogram(self, buckets=STAGE_BUCKETS) -> Dict[str, Dict]:
+        """{stage: {"buckets": số mẫu <= từng bound (cộng dồn), "sum", "count"}} - gửi về process chính."""
+        out = {}
+        for name in self._sec:
+            samples, _ = self._samples(name)
+            out[name] = {"buckets": np.searchsorted(np.sort(samples), buckets, side="right").tolist(),
+                         "sum": float(samples.sum()), "count": len(samples)}
+        return out
+
+
+def _add_padded(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if len(a) < len(b):
+        a, b = b, a
+    a = a.copy()
+    a[:len(b)] += b
+    return a
@@ -0,0 +1,116 @@
+# core/replay.py
+"""
+Replay post-processing từ detection store (không chạy model): tính lại khoảng cách, tốc độ,
+TTC, sensor data, alert và summary với TuningParams mới, có thể vẽ lại video overlay.
+Cùng params với lần chạy gốc -> cùng sensor data / alert.
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+
+from config.config import PIPELINE_QUEUE_DEPTH
+from .annotation import annotate_frame
+from .detection import build_object_data
+from .detection_store import DetectionStore
+from .estimation import focal_pixels
+from .params import TuningParams
+from .pipeline import FrameReader, FrameEncoder
+from .simulation_log import SimulationLog
+from .tracking import ObjectTracker
+from utils.logger import get_logger
+
+logger = get_logger("Replay")
+
+
+def _open_writer(path: Path, fps: float, size):
+    from service.video_utils import FFmpegPipeWriter, ffmpeg_available
+    if ffmpeg_available():
+        return FFmpegPipeWriter(path, fps, size)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+
+
+def replay(store_path: Any, params: Optional[TuningParams] = None, render_path: Any = None,
+           video_path: Any = None, on_record: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """
+    store_path: file Parquet do ADASProcessor.run ghi (store_path / DETECTION_STORE)
+    render_path: nếu có, vẽ lại overlay lên video gốc (meta "video" hoặc video_path) và ghi ra đây
+    Trả về cùng format với ADASProcessor.run.
+    """
+    t0 = time.perf_counter()
+    store = DetectionStore(store_path)
+    meta = store.meta
+    params = params or TuningParams()
+    fps, W, H = meta["fps"], meta["width"], meta["height"]
+    f_pix = focal_pixels(W, params.h_fov_deg)
+    sign_names = {int(k): v for k, v in meta.get("signNames", {}).items()}
+
+    tracker = ObjectTracker(fps=fps)
+    log = SimulationLog(meta["simulationId"], meta["vehicleId"], meta["userId"], params,
+                        start_epoch=meta["startEpoch"], on_record=on_record)
+
+    reader = encoder = writer = cap = None
+    stop = threading.Event()
+    if render_path is not None:
+        render_path = Path(render_path)
+        cap = cv2.VideoCapture(str(video_path or meta["video"]))
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video: {video_path or meta['video']}")
+        writer = _open_writer(render_path, fps, (W, H))
+        reader = iter(FrameReader(cap, PIPELINE_QUEUE_DEPTH, stop).start())
+        encoder = FrameEncoder(writer, annotate_frame, PIPELINE_QUEUE_DEPTH, stop).start()
+
+    signs = []
+    n_frames = 0
+    try:
+        for fr in store.frames():
+            o = fr.objects
+            obj_data, objs = build_object_data(o["cls"], o["xyxy"], o["track_id"], f_pix, tracker,
+                                               fr.pts, o["conf"], params)
+            if fr.sign_frame:
+                s = fr.signs
+                signs = [{"cls": c, "name": sign_names.get(c, f"sign{c}"), "conf": conf, "bbox": bbox}
+                         for c, conf, bbox in zip(s["cls"].tolist(), s["conf"].astype(float).tolist(),
+                                                  s["xyxy"].tolist())]
+            log.add_frame(fr.frame_idx, fr.pts, obj_data, objs, signs if fr.sign_frame else [])
+            n_frames += 1
+
+            if encoder is not None:
+                frame = next(reader, None)
+                if frame is None:
+                    raise RuntimeError(f"Video has fewer frames than the detection store ({fr.frame_idx})")
+                encoder.put(frame, obj_data, signs)
+        if encoder is not None:
+            encoder.close()
+            writer.release()
+    except BaseException:
+        stop.set()
+        if encoder is not None:
+            encoder.join()
+            if hasattr(writer, "abort"):
+                writer.abort()
+            else:
+                writer.release()
+                render_path.unlink(missing_ok=True)
+        raise
+    finally:
+        stop.set()
+        if cap is not None:
+            cap.release()
+
+    seconds = time.perf_counter() - t0
+    logger.info(f"Replayed {n_frames} frames from {store.path.name} in {seconds:.2f}s")
+    return {
+        "status": "completed",
+        "summary": {
+            **log.summary(),
+            "replay": {"store": str(store.path), "frames": n_frames, "seconds": round(seconds, 3),
+                       "params": params.to_dict()},
+        },
+        "sensorData": log.sensor_data,
+        "alerts": log.alerts,
+        "videoUrl": str(render_path) if render_path is not None else None,
+    }
@@ -0,0 +1,166 @@
+# core/roi.py
+"""
+Vùng ảnh (ROI) đưa vào detector object: dashcam nhìn thẳng -> trời và nắp capo không bao giờ có
+vật cản, cắt bỏ để model chạy trên ảnh nhỏ hơn. Box trả về được map lại toạ độ frame gốc
+(Detector.predict_objects).
+
+- "static":  ROI cố định theo tỉ lệ frame (OBJECT_ROI, hoặc OBJECT_ROI_BY_VEHICLE[vehicleId])
+- "learned": học từ vị trí detection các lần chạy trước của cùng vehicle (grid đếm lưu ở ROI_DIR);
+             chưa đủ ROI_MIN_SAMPLES box -> cả frame; cứ ROI_EXPLORE_EVERY lần detect chạy 1 lần cả
+             frame để grid mở rộng được khi camera / góc lắp thay đổi
+"""
+import json
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.config import (
+    ROI_MODE, OBJECT_ROI, OBJECT_ROI_BY_VEHICLE, ROI_DIR, ROI_GRID, ROI_COVERAGE, ROI_MARGIN,
+    ROI_MIN_SAMPLES, ROI_EXPLORE_EVERY
+)
+from utils.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:   # Windows: không có flock, save() chỉ còn os.replace
+    fcntl = None
+
+logger = get_logger("ROI")
+
+Roi = Tuple[int, int, int, int]   # x1, y1, x2, y2 (pixel)
+
+
+def roi_pixels(frac, W: int, H: int) -> Optional[Roi]:
+    """(x1, y1, x2, y2) tỉ lệ [0, 1] -> pixel; ROI phủ cả frame -> None."""
+    x1, y1, x2, y2 = (min(max(float(v), 0.0), 1.0) for v in frac)
+    roi = (int(x1 * W), int(y1 * H), int(round(x2 * W)), int(round(y2 * H)))
+    if roi[2] - roi[0] < 32 or roi[3] - roi[1] < 32:
+        raise ValueError(f"ROI too small: {frac}")
+    return None if roi == (0, 0, W, H) else roi
+
+
+def _span(marginal: np.ndarray, coverage: float) -> Tuple[int, int]:
+    """Đoạn [lo, hi) nhỏ nhất chứa `coverage` khối lượng, cắt đều 2 đầu."""
+    cdf = np.cumsum(marginal) / marginal.sum()
+    tail = (1.0 - coverage) / 2
+    lo = int(np.searchsorted(cdf, tail, side="right"))
+    hi = int(np.searchsorted(cdf, 1.0 - tail, side="left")) + 1
+    return lo, max(hi, lo + 1)
+
+
+class ObjectRoi:
+    def __init__(self, W: int, H: int, vehicle_id: Optional[str] = None, mode: str = ROI_MODE,
+                 root=ROI_DIR, grid: Tuple[int, int] = ROI_GRID):
+        if mode not in ("off", "static", "learned"):
+            raise ValueError(f"Unknown ROI mode: {mode}")
+        self.W, self.H = W, H
+        self.mode = mode
+        self.roi: Optional[Roi] = None
+        self.n_roi = 0
+        self.n_full = 0
+        self._detects = 0
+        if mode == "static":
+            self.roi = roi_pixels(OBJECT_ROI_BY_VEHICLE.get(vehicle_id, OBJECT_ROI), W, H)
+        elif mode == "learned":
+            key = re.sub(r"[^A-Za-z0-9_.-]", "_", str(vehicle_id or "default"))
+            self.path = Path(root) / f"{key}.json"
+            self.grid_shape = grid   # (cột, hàng)
+            self.counts = np.zeros(grid[::-1], dtype=np.int64)   # tích luỹ các lần trước
+            self.samples = 0
+            self._new = np.zeros_like(self.counts)   # của lần chạy này (merge khi save)
+            self._new_samples = 0
+            self._load()
+            self.roi = self._learned_roi()
+
+    @property
+    def active(self) -> bool:
+        return self.mode != "off"
+
+    # --- planning ---
+    def next(self) -> Optional[Roi]:
+        """ROI cho lần detect kế tiếp (None = cả frame)."""
+        self._detects += 1
+        roi = self.roi
+        if self.mode == "learned" and roi is not None and self._detects % ROI_EXPLORE_EVERY == 0:
+            roi = None   # khám phá: cả frame
+        if roi is None:
+            self.n_full += 1
+        else:
+            self.n_roi += 1
+        return roi
+
+    # --- learning ---
+    def observe(self, obj_data: List[Dict]):
+        """Box detect thật (toạ độ frame gốc) -> tăng các ô grid mà box phủ lên."""
+        if self.mode != "learned" or not obj_data:
+            return
+        gw, gh = self.grid_shape
+        xyxy = np.array([d["bbox"] for d in obj_data], dtype=np.float64)
+        c1 = np.clip((xyxy[:, 0] / self.W * gw).astype(int), 0, gw - 1)
+        c2 = np.clip((xyxy[:, 2] / self.W * gw).astype(int), 0, gw - 1)
+        r1 = np.clip((xyxy[:, 1] / self.H * gh).astype(int), 0, gh - 1)
+        r2 = np.clip((xyxy[:, 3] / self.H * gh).astype(int), 0, gh - 1)
+        for a, b, c, d in zip(r1, r2, c1, c2):
+            self._new[a:b + 1, c:d + 1] += 1
+        self._new_samples += len(xyxy)
+
+    def _learned_roi(self) -> Optional[Roi]:
+        if self.samples < ROI_MIN_SAMPLES:
+            return None
+        gw, gh = self.grid_shape
+        c_lo, c_hi = _span(self.counts.sum(0), ROI_COVERAGE)
+        r_lo, r_hi = _span(self.counts.sum(1), ROI_COVERAGE)
+        frac = (c_lo / gw - ROI_MARGIN, r_lo / gh - ROI_MARGIN, c_hi / gw + ROI_MARGIN, r_hi / gh + ROI_MARGIN)
+        return roi_pixels(frac, self.W, self.H)
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return
+        counts = np.asarray(data.get("counts", []), dtype=np.int64)
+        if counts.shape == self.counts.shape:
+            self.counts, self.samples = counts, int(data.get("samples", 0))
+
+    @contextmanager
+    def _locked(self):
+        """flock trên file .lock cạnh grid: đọc - cộng - ghi của các worker không xen nhau."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def save(self):
+        """Cộng grid của lần chạy này vào file (đọc lại trong lock: worker khác có thể vừa ghi)."""
+        if self.mode != "learned" or not self._new_samples:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            self.counts = np.zeros_like(self._new)
+            self.samples = 0
+            self._load()
+            self.counts += self._new
+            self.samples += self._new_samples
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"grid": list(self.grid_shape), "samples": self.samples,
+                                       "counts": self.counts.tolist()}), encoding="utf-8")
+            os.replace(tmp, self.path)
+        self._new[:] = 0
+        self._new_samples = 0
+
+    def report(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "roi": list(self.roi) if self.roi is not None else None,
+            "roiDetects": self.n_roi,
+            "fullFrameDetects": self.n_full,
+        }
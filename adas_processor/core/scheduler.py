@@ -0,0 +1,153 @@
+# core/scheduler.py
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.config import (
+    ADAPTIVE_SKIP, SKIP_MIN_INTERVAL, SKIP_MAX_INTERVAL, SIGN_DETECT_INTERVAL,
+    ADAPTIVE_IMGSZ, COCO_IMGSZ, COCO_IMGSZ_LOW
+)
+from .params import TuningParams, DEFAULT_PARAMS
+
+
+class InferenceScheduler:
+    """
+    Chọn frame nào chạy detector thật, frame nào chỉ nội suy box từ track.
+
+    - object detection chạy mỗi `interval` frame; interval = min khi có xe trong
+      vùng cảnh báo / TTC ngắn hoặc còn track ByteTrack chưa xác nhận, = max chỉ khi
+      frame không có detection nào, ở giữa khi có object (xe ở xa, người, ...)
+    - biển báo chạy theo nhịp riêng (sign_interval), frame giữa giữ kết quả cũ để vẽ
+    - frame bị bỏ qua: box của mỗi track được ngoại suy tuyến tính (vận tốc giữa
+      2 lần detect gần nhất)
+    - adaptive_imgsz: không có gì nguy hiểm -> detect ở imgsz_low, có -> imgsz đầy đủ
+    - "nguy hiểm" theo params.dist_warn_m / params.ttc_warn_s (cùng ngưỡng với alert)
+    """
+    def __init__(self, enabled: bool = ADAPTIVE_SKIP, min_interval: int = SKIP_MIN_INTERVAL,
+                 max_interval: int = SKIP_MAX_INTERVAL, sign_interval: int = SIGN_DETECT_INTERVAL,
+                 adaptive_imgsz: bool = ADAPTIVE_IMGSZ, imgsz: int = COCO_IMGSZ, imgsz_low: int = COCO_IMGSZ_LOW,
+                 params: Optional[TuningParams] = None):
+        self.enabled = enabled
+        self.params = params or DEFAULT_PARAMS
+        self.adaptive_imgsz = adaptive_imgsz
+        self.imgsz_high = imgsz
+        self.imgsz_low = min(imgsz_low, imgsz)
+        self.imgsz = imgsz   # frame đầu: độ phân giải đầy đủ
+        self.n_low_res = 0
+        self.min_interval = max(1, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.sign_interval = max(1, sign_interval) if enabled else 1
+        self.interval = self.min_interval if enabled else 1
+        self._last_detect: Optional[int] = None
+        self._last_sign: Optional[int] = None
+        # track_id -> (frame_idx, bbox, bbox velocity / frame); box không có id giữ nguyên
+        self._tracks: Dict[int, Tuple[int, np.ndarray, np.ndarray, int]] = {}
+        self._untracked: List[Tuple[int, Tuple[int, int, int, int]]] = []
+        self._inferred: List[List[int]] = []   # [start, end, step]
+        self.n_inferred = 0
+        self.n_interpolated = 0
+        self.n_sign = 0
+
+    # --- planning ---
+    def plan(self, start_idx: int, n: int) -> Tuple[List[bool], List[bool]]:
+        """Kế hoạch cho n frame tiếp theo: (detect objects?, detect signs?) cho từng frame."""
+        objs, signs = [], []
+        last, last_sign = self._last_detect, self._last_sign
+        for fi in range(start_idx, start_idx + n):
+            d = last is None or fi - last >= self.interval
+            s = last_sign is None or fi - last_sign >= self.sign_interval
+            if d:
+                last = fi
+            if s:
+                last_sign = fi
+            objs.append(d)
+            signs.append(s)
+        return objs, signs
+
+    def object_imgsz(self, n: int) -> int:
+        """imgsz cho n frame detect object của batch kế tiếp."""
+        if self.imgsz < self.imgsz_high:
+            self.n_low_res += n
+        return self.imgsz
+
+    # --- state update ---
+    def observe(self, frame_idx: int, obj_data: List[Dict]):
+        """Ghi nhận kết quả detect thật của frame_idx."""
+        self._last_detect = frame_idx
+        self.n_inferred += 1
+        self._record_inferred(frame_idx)
+
+        tracks, untracked = {}, []
+        for d in obj_data:
+            bbox = np.asarray(d["bbox"], dtype=np.float64)
+            tid = d["track_id"]
+            if tid == -1:
+                untracked.append((d["cls"], tuple(d["bbox"])))
+                continue
+            vel = np.zeros(4)
+            prev = self._tracks.get(tid)
+            if prev is not None and frame_idx > prev[0]:
+                vel = (bbox - prev[1]) / (frame_idx - prev[0])
+            tracks[tid] = (frame_idx, bbox, vel, d["cls"])
+        self._tracks, self._untracked = tracks, untracked
+
+    def observe_signs(self, frame_idx: int):
+        self._last_sign = frame_idx
+        self.n_sign += 1
+
+    def predict(self, frame_idx: int) -> List[Tuple[int, Tuple[int, int, int, int], int]]:
+        """Box dự đoán cho frame bị bỏ qua, cùng format với Detector.build_objects."""
+        self.n_interpolated += 1
+        boxes = []
+        for tid, (fi, bbox, vel, cls) in self._tracks.items():
+            x1, y1, x2, y2 = (bbox + vel * (frame_idx - fi)).round().astype(int).tolist()
+            if x2 <= x1 or y2 <= y1:
+                continue
+            boxes.append((cls, (x1, y1, x2, y2), tid))
+        boxes.extend((cls, bbox, -1) for cls, bbox in self._untracked)
+        return boxes
+
+    def adapt(self, obj_data: List[Dict], unconfirmed: int = 0):
+        """
+        Chỉnh interval / imgsz theo mức nguy hiểm của frame vừa xử lý.
+        unconfirmed: số track ByteTrack mới chưa xác nhận (Detector.unconfirmed_tracks) -- chúng chưa có
+        trong obj_data và bị xoá nếu lần update kế tiếp không khớp, nên phải detect frame liền sau.
+        """
+        if not (self.enabled or self.adaptive_imgsz):
+            return
+        dists = [d["dist"] for d in obj_data if d["dist"] is not None]
+        danger = any(dist < self.params.dist_warn_m * 1.5 for dist in dists) or \
+            any(d["ttc"] is not None and d["ttc"] < self.params.ttc_warn_s for d in obj_data)
+        if self.adaptive_imgsz:
+            self.imgsz = self.imgsz_high if danger else self.imgsz_low
+        if not self.enabled:
+            return
+        if danger or unconfirmed:
+            self.interval = self.min_interval
+        elif not obj_data:
+            self.interval = self.max_interval
+        else:
+            self.interval = max(self.min_interval, (self.min_interval + self.max_interval) // 2)
+
+    def _record_inferred(self, frame_idx: int):
+        runs = self._inferred
+        if runs:
+            start, end, step = runs[-1]
+            if start == end:
+                runs[-1] = [start, frame_idx, frame_idx - start]
+                return
+            if frame_idx - end == step:
+                runs[-1][1] = frame_idx
+                return
+        runs.append([frame_idx, frame_idx, 1])
+
+    def report(self) -> Dict:
+        return {
+            "adaptive": self.enabled,
+            "inferredFrames": self.n_inferred,
+            "interpolatedFrames": self.n_interpolated,
+            "signFrames": self.n_sign,
+            "lowResFrames": self.n_low_res,
+            # frame detect thật, dạng [start, end, step] (range đóng)
+            "inferred": self._inferred,
+        }
@@ -0,0 +1,92 @@
+# core/simulation_log.py
+"""
+Sensor data + alert (AlertEngine, core/alerts.py) của 1 simulation, cập nhật từng frame sau post-processing.
+Dùng chung cho ADASProcessor.run và replay từ detection store -> cùng input cho ra cùng output.
+"""
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+from utils.helpers import timestamp_at
+from .alerts import AlertEngine, FrameObjects
+from .params import TuningParams, DEFAULT_PARAMS
+
+
+class SimulationLog:
+    """
+    Mọi mốc thời gian theo timestamp video của frame:
+    - sensor data log mỗi params.frame_interval giây
+    - cooldown alert params.alert_cooldown_s giây (hoặc cooldown_s của luật), luật theo params.alert_rules
+    - "timestamp" = start_epoch + frame_ts (ISO, UTC)
+    """
+    def __init__(self, simulation_id: str, vehicle_id: str, user_id: str,
+                 params: Optional[TuningParams] = None, start_epoch: Optional[float] = None,
+                 on_record: Optional[Callable[[str, Dict], None]] = None, collect: bool = True):
+        self.simulation_id = simulation_id
+        self.vehicle_id = vehicle_id
+        self.user_id = user_id
+        self.params = params or DEFAULT_PARAMS
+        self.start_epoch = time.time() if start_epoch is None else start_epoch
+        self.on_record = on_record
+        self.collect = collect
+        self.sensor_data: List[Dict] = []
+        self.alerts: List[Dict] = []
+        self.engine = AlertEngine(params=self.params)
+        self.alert_counts: Counter = self.engine.counts
+        self._last_sensor_ts = -self.params.frame_interval   # frame đầu luôn log
+
+    def _emit(self, kind: str, record: Dict):
+        if self.collect:
+            (self.sensor_data if kind == "sensor" else self.alerts).append(record)
+        if self.on_record:
+            self.on_record(kind, record)
+
+    def add_frame(self, frame_idx: int, frame_ts: float, obj_data: List[Dict],
+                  objs: FrameObjects, signs: Sequence[Dict] = ()) -> List[Dict]:
+        """
+        objs: FrameObjects của obj_data; signs: biển báo detect ở frame này ([] nếu frame không chạy sign).
+        Returns alert phát ở frame này.
+        """
+        ts = None
+
+        # --- chọn object gần nhất ---
+        nearest_obj = None
+        if obj_data:
+            nearest_obj = min(obj_data, key=lambda d: d.get("dist") or 1e9)
+
+        # --- SensorData chỉ log mỗi frame_interval ---
+        if nearest_obj and frame_ts - self._last_sensor_ts >= self.params.frame_interval:
+            ts = timestamp_at(self.start_epoch + frame_ts)
+            self._emit("sensor", {
+                "vehicleId": self.vehicle_id,
+                "simulationId": self.simulation_id,
+                "userId": self.user_id,
+                "timestamp": ts,
+                "speed": float(nearest_obj.get("speed") or 0.0),
+                "distance_to_object": float(nearest_obj.get("dist") or 0.0),
+                "lane_status": nearest_obj.get("lane_status", "within"),
+                "obstacle_detected": bool(nearest_obj.get("obstacle_detected")),
+                "camera_frame_url": None,
+                "track_id": nearest_obj.get("track_id"),
+                "frame_index": frame_idx,
+                "ttc": nearest_obj.get("ttc"),
+                "warn": bool(nearest_obj.get("warn"))
+            })
+            self._last_sensor_ts = frame_ts
+
+        # --- Alerts (luật + cooldown trong AlertEngine) ---
+        alerts = self.engine.evaluate(frame_ts, objs, signs)
+        for alert in alerts:
+            alert["timestamp"] = ts or timestamp_at(self.start_epoch + frame_ts)
+            alert["frame_index"] = frame_idx
+            self._emit("alert", alert)
+        return alerts
+
+    def summary(self) -> Dict:
+        return {
+            "totalAlerts": sum(self.alert_counts.values()),
+            "collisionCount": self.alert_counts["collision"],
+            "trafficSignCount": self.alert_counts["traffic_sign"],
+            "laneDepartureCount": self.alert_counts["lane_departure"],
+            "obstacleCount": self.alert_counts["obstacle"],
+        }
@@ -0,0 +1,293 @@
+# core/sinks.py
+"""
+Ghi sensor data / alert ra nơi lưu trữ theo batch trong lúc xử lý, thay vì trả 1 khối JSON lớn ở
+cuối job cho NodeJS insert 1 lần.
+
+- RecordSink.add(kind, record) có cùng chữ ký với on_record của ADASProcessor.run / LiveProcessor.run
+- thread nền flush khi đủ batch_size record hoặc sau flush_interval_s giây; writer chậm hơn pipeline
+  -> add() chờ khi đã có max_pending record chưa ghi (bộ nhớ bị chặn)
+- mỗi record có key idempotent: "<simulationId>:<frame_index>" (sensor),
+  "<simulationId>:<frame_index>:<type>:<description>" (alert) -> retry không tạo bản ghi trùng
+- batch lỗi được retry (backoff nhân đôi); vẫn lỗi -> SinkError, job fail thay vì mất dữ liệu
+
+open_sink(spec, simulation_id): "ndjson[:path]", "sqlite[:path]", "http(s)://..." (POST bulk).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.config import (
+    SINKS_DIR, SINK_BATCH_SIZE, SINK_FLUSH_INTERVAL_S, SINK_MAX_PENDING, SINK_RETRIES,
+    SINK_RETRY_BACKOFF_S, SINK_HTTP_TIMEOUT_S, SINK_HTTP_HEADERS
+)
+from utils.logger import get_logger
+
+logger = get_logger("Sink")
+
+Entry = Tuple[str, str, Dict]   # (kind, key, record)
+
+
+class SinkError(Exception):
+    """Ghi batch thất bại (không retry được / đã hết số lần retry)."""
+
+
+def record_key(kind: str, record: Dict, simulation_id: str) -> str:
+    key = f"{simulation_id}:{record['frame_index']}"
+    if kind == "alert":
+        key += f":{record['type']}:{record['description']}"
+        if "track_id" in record:   # luật scope "track" (AlertEngine): nhiều xe cùng mô tả trong 1 frame
+            key += f":{record['track_id']}"
+    return key
+
+
+class RecordSink:
+    name = "sink"
+
+    def __init__(self, simulation_id: str, batch_size: int = SINK_BATCH_SIZE,
+                 flush_interval_s: float = SINK_FLUSH_INTERVAL_S, max_pending: int = SINK_MAX_PENDING,
+                 retries: int = SINK_RETRIES, backoff_s: float = SINK_RETRY_BACKOFF_S):
+        self.simulation_id = simulation_id
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self.max_pending = max(self.batch_size, max_pending)
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._buf: List[Entry] = []
+        self._cond = threading.Condition()
+        self._closing = False
+        self._writing = 0   # số record của batch đang ghi (vẫn tính vào pending)
+        self.error: Optional[BaseException] = None
+        self.n_records = 0
+        self.n_batches = 0
+        self.n_retries = 0
+        self.max_pending_seen = 0
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+        self._thread.start()
+
+    # --- producer side ---
+    def add(self, kind: str, record: Dict):
+        with self._cond:
+            self._cond.wait_for(lambda: self.error is not None
+                                or len(self._buf) + self._writing < self.max_pending)
+            if self.error is not None:
+                raise SinkError(f"{self.name} sink failed: {self.error}") from self.error
+            self._buf.append((kind, record_key(kind, record, self.simulation_id), record))
+            self.max_pending_seen = max(self.max_pending_seen, len(self._buf) + self._writing)
+            if len(self._buf) >= self.batch_size:
+                self._cond.notify_all()
+
+    def close(self):
+        """Flush phần còn lại rồi dừng writer; raise SinkError nếu có batch không ghi được."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self.error is not None:
+            raise SinkError(f"{self.name} sink failed: {self.error}") from self.error
+
+    def stats(self) -> Dict:
+        return {
+            "sink": self.name,
+            "records": self.n_records,
+            "batches": self.n_batches,
+            "retries": self.n_retries,
+            "maxPending": self.max_pending_seen,
+        }
+
+    # --- writer thread ---
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._closing or len(self._buf) >= self.batch_size,
+                                        self.flush_interval_s)
+                    batch, self._buf = self._buf[:self.batch_size], self._buf[self.batch_size:]
+                    self._writing = len(batch)
+                    done = self._closing and not self._buf
+                if batch:
+                    self._write_with_retry(batch)
+                with self._cond:
+                    self._writing = 0
+                    self._cond.notify_all()
+                if done:
+                    return
+        except BaseException as e:
+            with self._cond:
+                self.error = e
+                self._buf = []
+                self._writing = 0
+                self._cond.notify_all()
+        finally:
+            try:
+                self._close()
+            except Exception as e:
+                logger.warning(f"{self.name} sink close failed: {e}")
+
+    def _write_with_retry(self, batch: List[Entry]):
+        delay = self.backoff_s
+        for attempt in range(self.retries + 1):
+            try:
+                self._write(batch)
+                break
+            except SinkError:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                self.n_retries += 1
+                logger.warning(f"{self.name} sink write failed ({e}), retry {attempt + 1}/{self.retries}")
+                time.sleep(delay)
+                delay *= 2
+        self.n_records += len(batch)
+        self.n_batches += 1
+
+    def _write(self, batch: List[Entry]):
+        """Ghi 1 batch; phải idempotent theo key (có thể bị gọi lại sau khi đã ghi 1 phần)."""
+        raise NotImplementedError
+
+    def _close(self):
+        """Giải phóng tài nguyên (gọi trên writer thread)."""
+
+
+class NdjsonSink(RecordSink):
+    """1 dòng JSON / record {"kind", "key", "data"}; file ghi mới mỗi lần chạy (chạy lại = ghi đè)."""
+    name = "ndjson"
+
+    def __init__(self, path, simulation_id: str, **kwargs):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "wb")
+        super().__init__(simulation_id, **kwargs)
+
+    def _write(self, batch):
+        start = self._f.tell()
+        data = b"".join(json.dumps({"kind": kind, "key": key, "data": rec}, ensure_ascii=False).encode() + b"\n"
+                        for kind, key, rec in batch)
+        try:
+            self._f.write(data)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+        except OSError:
+            # bỏ phần đã ghi dở để lần retry không tạo dòng trùng
+            self._f.seek(start)
+            self._f.truncate()
+            raise
+
+    def _close(self):
+        self._f.close()
+
+
+class SqliteSink(RecordSink):
+    """
+    Bảng sensor_data / alerts, khóa chính = key (INSERT OR REPLACE). Index theo các trường mà model
+    SensorData bên NodeJS index (vehicleId, simulationId, userId, timestamp, trackId).
+    WAL + busy_timeout: nhiều worker có thể ghi cùng 1 file.
+    """
+    name = "sqlite"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sensor_data (
+            key TEXT PRIMARY KEY, simulation_id TEXT, vehicle_id TEXT, user_id TEXT, timestamp TEXT,
+            frame_index INTEGER, track_id INTEGER, data TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS sensor_data_simulation ON sensor_data (simulation_id);
+        CREATE INDEX IF NOT EXISTS sensor_data_vehicle ON sensor_data (vehicle_id);
+        CREATE INDEX IF NOT EXISTS sensor_data_user ON sensor_data (user_id);
+        CREATE INDEX IF NOT EXISTS sensor_data_timestamp ON sensor_data (timestamp);
+        CREATE INDEX IF NOT EXISTS sensor_data_track ON sensor_data (track_id);
+        CREATE TABLE IF NOT EXISTS alerts (
+            key TEXT PRIMARY KEY, simulation_id TEXT, vehicle_id TEXT, user_id TEXT, timestamp TEXT,
+            frame_index INTEGER, type TEXT, severity TEXT, data TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS alerts_simulation ON alerts (simulation_id);
+    """
+
+    def __init__(self, path, simulation_id: str, vehicle_id: str = None, user_id: str = None, **kwargs):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ids = (vehicle_id, user_id)
+        self._db: Optional[sqlite3.Connection] = None   # tạo trên writer thread
+        super().__init__(simulation_id, **kwargs)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(self.SCHEMA)
+        return self._db
+
+    def _write(self, batch):
+        db = self._connect()
+        sensors, alerts = [], []
+        for kind, key, rec in batch:
+            row = (key, self.simulation_id, rec.get("vehicleId", self.ids[0]), rec.get("userId", self.ids[1]),
+                   rec.get("timestamp"), rec.get("frame_index"))
+            data = json.dumps(rec, ensure_ascii=False)
+            if kind == "alert":
+                alerts.append(row + (rec["type"], rec["severity"], data))
+            else:
+                sensors.append(row + (rec.get("track_id"), data))
+        with db:   # 1 transaction / batch
+            db.executemany("INSERT OR REPLACE INTO sensor_data VALUES (?, ?, ?, ?, ?, ?, ?, ?)", sensors)
+            db.executemany("INSERT OR REPLACE INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", alerts)
+
+    def _close(self):
+        if self._db is not None:
+            self._db.close()
+
+
+class HttpSink(RecordSink):
+    """
+    POST JSON {"simulationId", "sensorData": [...], "alerts": [...]} (mỗi record thêm "key"),
+    header Idempotency-Key = hash các key của batch (giống nhau giữa các lần retry).
+    Retry khi lỗi mạng / 5xx / 429; 4xx khác -> SinkError ngay.
+    """
+    name = "http"
+
+    def __init__(self, url: str, simulation_id: str, headers: Optional[Dict] = None,
+                 timeout_s: float = SINK_HTTP_TIMEOUT_S, **kwargs):
+        self.url = url
+        self.headers = {"Content-Type": "application/json", **SINK_HTTP_HEADERS, **(headers or {})}
+        self.timeout_s = timeout_s
+        super().__init__(simulation_id, **kwargs)
+
+    def _write(self, batch):
+        body = {"simulationId": self.simulation_id, "sensorData": [], "alerts": []}
+        for kind, key, rec in batch:
+            body["alerts" if kind == "alert" else "sensorData"].append({**rec, "key": key})
+        digest = hashlib.sha1("\n".join(key for _, key, _ in batch).encode()).hexdigest()
+        req = urllib.request.Request(self.url, data=json.dumps(body).encode(), method="POST",
+                                     headers={**self.headers, "Idempotency-Key": digest})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout_s) as resp:
+                resp.read()
+        except urllib.error.HTTPError as e:
+            if e.code < 500 and e.code != 429:
+                raise SinkError(f"HTTP {e.code} from {self.url}") from e
+            raise
+
+
+def open_sink(spec: Optional[str], simulation_id: str, vehicle_id: str = None, user_id: str = None,
+              **kwargs) -> Optional[RecordSink]:
+    """
+    spec:
+    - "ndjson" / "ndjson:<path>"  (mặc định SINKS_DIR/<simulationId>.ndjson, path có thể chứa {simulationId})
+    - "sqlite" / "sqlite:<path>"  (mặc định SINKS_DIR/adas.sqlite3, dùng chung cho mọi job)
+    - "http://..." / "https://..."
+    """
+    if not spec:
+        return None
+    scheme, _, rest = spec.partition(":")
+    if scheme in ("http", "https"):
+        return HttpSink(spec, simulation_id, **kwargs)
+    if scheme == "ndjson":
+        path = rest or str(SINKS_DIR / "{simulationId}.ndjson")
+        return NdjsonSink(path.format(simulationId=simulation_id), simulation_id, **kwargs)
+    if scheme == "sqlite":
+        path = rest or str(SINKS_DIR / "adas.sqlite3")
+        return SqliteSink(path.format(simulationId=simulation_id), simulation_id, vehicle_id, user_id, **kwargs)
+    raise ValueError(f"Unknown sink: {spec}")
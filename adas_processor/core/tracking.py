@@ -1,37 +1,123 @@
 # core/tracking.py
-import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from config.config import TRACK_HISTORY, TRACK_EVICT_S, TRACK_CAPACITY
+
 
 class ObjectTracker:
     """
-    Simple tracker state to estimate relative speed from consecutive distance estimates.
-    estimate_speed returns (speed_kmh, v_rel_m_s)
+    Per-simulation track state to estimate relative speed from consecutive distance estimates.
+
+    - time is the video timestamp of the frame (frame_idx / fps), never the wall clock,
+      so results do not depend on how fast the host processes frames
+    - each track keeps a ring buffer of the last `history` (timestamp, distance) samples;
+      v_rel is the least-squares slope over that window
+    - tracks unseen for more than `evict_after_s` (video time) free their slot
+    - storage: preallocated arrays indexed by slot, `_slots` only maps track_id -> slot
+
+    estimate_speed(s) returns (speed_kmh, v_rel_m_s)
     - speed_kmh: float or None
     - v_rel_m_s: float (m/s) positive when object is approaching, negative when receding
     """
-    def __init__(self):
-        # track_id -> (last_distance_m, last_timestamp)
-        self.last_distances = {}
+    def __init__(self, fps: float = 30.0, history: int = TRACK_HISTORY,
+                 evict_after_s: float = TRACK_EVICT_S, capacity: int = TRACK_CAPACITY):
+        self.fps = fps
+        self.history = max(2, history)
+        self.evict_after_s = evict_after_s
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._ids = np.empty(0, dtype=np.int64)
+        self._dist = np.empty((0, self.history))
+        self._ts = np.empty((0, self.history))
+        self._count = np.empty(0, dtype=np.int64)   # số sample đang có (<= history)
+        self._head = np.empty(0, dtype=np.int64)    # vị trí ghi tiếp theo trong ring buffer
+        self._last_seen = np.empty(0)
+        self._grow(max(1, capacity))
+        # per-simulation ByteTrack instance (created by Detector on first frame)
+        self.mot_tracker = None
 
-    def estimate_speed(self, track_id, dist):
-        """Estimate speed (km/h) and relative speed (m/s) for a track_id given current distance.
-        If not enough history, returns (None, None).
+    def __len__(self):
+        return len(self._slots)
+
+    # --- slot store ---
+    def _grow(self, capacity: int):
+        old = len(self._ids)
+        extra = capacity - old
+        self._ids = np.concatenate([self._ids, np.full(extra, -1, dtype=np.int64)])
+        self._dist = np.concatenate([self._dist, np.zeros((extra, self.history))])
+        self._ts = np.concatenate([self._ts, np.zeros((extra, self.history))])
+        self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+        self._head = np.concatenate([self._head, np.zeros(extra, dtype=np.int64)])
+        self._last_seen = np.concatenate([self._last_seen, np.zeros(extra)])
+        self._free.extend(range(capacity - 1, old - 1, -1))
+
+    def _slot(self, track_id: int) -> int:
+        slot = self._slots.get(track_id)
+        if slot is None:
+            if not self._free:
+                self._grow(2 * len(self._ids))
+            slot = self._free.pop()
+            self._slots[track_id] = slot
+            self._ids[slot] = track_id
+            self._count[slot] = 0
+            self._head[slot] = 0
+        return slot
+
+    def evict(self, now: float):
+        """Giải phóng slot của track không xuất hiện quá evict_after_s (theo thời gian video)."""
+        stale = np.flatnonzero((self._ids != -1) & (now - self._last_seen > self.evict_after_s))
+        for slot in stale.tolist():
+            del self._slots[int(self._ids[slot])]
+            self._ids[slot] = -1
+            self._free.append(slot)
+
+    # --- speed ---
+    def estimate_speeds(self, track_ids, dists, now: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Thêm sample (now, dist) cho từng track và trả về (speed_kmh, v_rel) dạng mảng,
+        NaN khi chưa đủ lịch sử (1 sample hoặc khoảng thời gian <= 1ms).
+        track_ids: (N,) int, không trùng nhau; dists: (N,) float; now: timestamp video (s).
         """
-        now = time.time()
+        if now is None:
+            raise ValueError("now (video timestamp of the frame) is required")
+        self.evict(now)
+        dists = np.asarray(dists, dtype=np.float64)
+        if len(dists) == 0:
+            return np.empty(0), np.empty(0)
+        slots = np.array([self._slot(int(tid)) for tid in np.asarray(track_ids).tolist()], dtype=np.int64)
 
-        # If we have no previous value, store and return None
-        if track_id not in self.last_distances or self.last_distances[track_id][0] is None:
-            self.last_distances[track_id] = (dist, now)
-            return None, None
+        pos = self._head[slots]
+        self._dist[slots, pos] = dists
+        self._ts[slots, pos] = now
+        self._head[slots] = (pos + 1) % self.history
+        self._count[slots] = np.minimum(self._count[slots] + 1, self.history)
+        self._last_seen[slots] = now
 
-        prev_dist, prev_t = self.last_distances[track_id]
-        dt = now - prev_t
-        if dt <= 1e-3:
-            return None, None
+        # least-squares slope d(dist)/dt trên các sample hợp lệ (ring buffer ghi từ vị trí 0)
+        valid = np.arange(self.history)[None, :] < self._count[slots][:, None]
+        n = valid.sum(1)
+        t, d = self._ts[slots], self._dist[slots]
+        t_mean = np.where(valid, t, 0).sum(1) / n
+        d_mean = np.where(valid, d, 0).sum(1) / n
+        tc = np.where(valid, t - t_mean[:, None], 0)
+        sxx = (tc * tc).sum(1)
+        sxy = (tc * np.where(valid, d - d_mean[:, None], 0)).sum(1)
+        span = np.where(valid, t, -np.inf).max(1) - np.where(valid, t, np.inf).min(1)
 
-        # positive v_rel means approaching (prev_dist > dist)
-        v_rel = (prev_dist - dist) / dt  # m/s
-        speed_kmh = v_rel * 3.6
-        # update stored last distance/time
-        self.last_distances[track_id] = (dist, now)
+        ok = (n >= 2) & (span > 1e-3)
+        v_rel = np.full(len(slots), np.nan)
+        # positive v_rel means approaching (distance decreasing)
+        v_rel[ok] = 0.0 - sxy[ok] / sxx[ok]   # 0.0 - x: không ra -0.0 khi đứng yên
+        return v_rel * 3.6, v_rel
 
-        return speed_kmh, v_rel
+    def estimate_speed(self, track_id, dist, now):
+        """Estimate speed (km/h) and relative speed (m/s) for a track_id given current distance.
+        now: video timestamp (s) of the frame.
+        If not enough history, returns (None, None).
+        """
+        speed, v_rel = self.estimate_speeds([track_id], [dist], now)
+        if np.isnan(v_rel[0]):
+            return None, None
+        return float(speed[0]), float(v_rel[0])
@@ -0,0 +1,66 @@
+# demo/live.py
+"""
+Chạy ADAS trên stream trực tiếp, in sensor data / alert (NDJSON) ngay khi có:
+
+    python -m demo.live rtsp://192.168.1.10:554/stream --duration 60
+    python -m demo.live http://127.0.0.1:8090/cam.mjpg
+    ffmpeg -re -i clip.mp4 -f rawvideo -pix_fmt bgr24 -s 1280x720 - | python -m demo.live - --size 1280x720
+
+Stream thử không cần camera: ffmpeg phát 1 file như camera MJPEG
+    ffmpeg -re -stream_loop -1 -i clip.mp4 -f mpjpeg -listen 1 http://127.0.0.1:8090/cam.mjpg
+"""
+import argparse
+import json
+import sys
+
+from config.config import YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE
+from core.detection import Detector
+from core.live import LiveProcessor, LiveSource
+
+
+def parse_size(text):
+    w, sep, h = text.lower().partition("x")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected WxH, got {text!r}")
+    return int(w), int(h)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("url", help="URL cv2.VideoCapture mở được, pipe:<path> hoặc - (frame BGR thô từ stdin)")
+    ap.add_argument("--size", type=parse_size, help="WxH của frame thô (bắt buộc với pipe)")
+    ap.add_argument("--fps", type=float, default=0.0, help="fps nguồn nếu stream không báo")
+    ap.add_argument("--duration", type=float, help="dừng sau N giây")
+    ap.add_argument("--max-frames", type=int, help="dừng sau N frame đã xử lý")
+    ap.add_argument("--vehicle", default="live-vehicle")
+    ap.add_argument("--simulation", default="live")
+    ap.add_argument("--out", help="ghi record NDJSON ra file (mặc định stdout, lẫn với log)")
+    ap.add_argument("--json", help="ghi summary ra file")
+    args = ap.parse_args()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+
+    def on_record(kind, record):
+        out.write(json.dumps({"event": kind, "data": record}, ensure_ascii=False) + "\n")
+        out.flush()
+
+    detector = Detector(YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE)
+    detector.warmup()
+    source = LiveSource(args.url, size=args.size, fps=args.fps)
+    try:
+        result = LiveProcessor(detector).run(source, args.simulation, args.vehicle, "demo-user",
+                                             on_record=on_record, duration_s=args.duration,
+                                             max_frames=args.max_frames)
+    except KeyboardInterrupt:
+        return
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print("Summary:", json.dumps(result["summary"], indent=2, default=str))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result["summary"], f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
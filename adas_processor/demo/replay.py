@@ -0,0 +1,48 @@
+# demo/replay.py
+"""
+Replay post-processing từ detection store với tham số mới (không chạy model):
+
+    python -m demo.replay detections/simulation_x.parquet --set DIST_WARN_M=6 --set ALERT_COOLDOWN_S=1
+    python -m demo.replay store.parquet --set "W_REAL_M={2: 1.9}" --render out.mp4 --json result.json
+"""
+import argparse
+import json
+
+from core.params import TuningParams
+from core.replay import replay
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("store", help="Parquet detection store (ADASProcessor.run store_path / DETECTION_STORE)")
+    ap.add_argument("--set", dest="overrides", action="append", default=[], metavar="NAME=VALUE",
+                    help=f"override tham số ({', '.join(TuningParams.CONFIG_NAMES)})")
+    ap.add_argument("--render", help="vẽ lại video overlay ra file này")
+    ap.add_argument("--video", help="video nguồn (mặc định lấy từ metadata của store)")
+    ap.add_argument("--json", help="ghi result đầy đủ (sensorData, alerts) ra file")
+    args = ap.parse_args()
+
+    overrides = {}
+    for item in args.overrides:
+        name, sep, value = item.partition("=")
+        if not sep:
+            ap.error(f"--set expects NAME=VALUE, got {item!r}")
+        overrides[name.strip()] = value.strip()
+    try:
+        params = TuningParams.from_overrides(overrides)
+    except (ValueError, SyntaxError) as e:
+        ap.error(str(e))
+
+    result = replay(args.store, params, render_path=args.render, video_path=args.video)
+    print("✅ Replay completed")
+    print("Summary:", json.dumps(result["summary"], indent=2, default=str))
+    if args.render:
+        print("Video saved at:", result["videoUrl"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print("Result saved at:", args.json)
+
+
+if __name__ == "__main__":
+    main()
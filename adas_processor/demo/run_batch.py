@@ -0,0 +1,253 @@
+# demo/run_batch.py
+"""
+Xử lý hàng loạt video trên nhiều worker process (vd. chạy lại kho video hàng đêm).
+
+    python -m demo.run_batch /data/fleet --out /data/fleet_out --workers 4 --threads 2
+    python -m demo.run_batch manifest.txt --out out/ --format parquet --store
+
+Input: thư mục (quét đệ quy *.mp4, *.avi, *.mov, *.mkv) hoặc manifest .txt (1 đường dẫn / dòng)
+/ .json (list đường dẫn hoặc {"video", "simulationId", "vehicleId", "userId"}).
+
+Mỗi worker load model 1 lần, giới hạn `--threads` thread inference và (Linux, `--pin`) chạy
+trên tập core riêng. Kết quả từng video ghi vào --out:
+  <id>.json                      result (format json) hoặc summary (format parquet)
+  <id>.sensor.parquet / .alerts.parquet   (format parquet)
+  <id>.parquet                   detection store để replay (--store)
+  videos/simulation_<id>.mp4     video annotate
+  <id>.running                   chỉ có trong lúc video đang chạy
+<id>.json ghi sau cùng -> chạy lại cùng lệnh sau khi crash sẽ bỏ qua video đã xong.
+Video lỗi được báo cáo (batch_report.json), không dừng cả batch.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List
+
+VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv"}
+
+
+# ------------------------------------------------------------------
+# Worker process side
+# ------------------------------------------------------------------
+def _init_worker(threads: int, core_sets):
+    from core.backends import limit_threads
+    from core.model_registry import get_registry
+
+    # initializer raise -> cả pool hỏng trước khi video nào chạy: mọi lỗi để từng video tự báo
+    try:
+        if core_sets is not None and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, core_sets.get())
+        limit_threads(threads)
+        get_registry().load()
+    except Exception:
+        pass  # từng video sẽ fail với lỗi load model cụ thể
+
+
+def _process(entry: Dict, out_dir: str, fmt: str, store: bool) -> Dict:
+    from core.model_registry import get_registry
+    from core.processing import ADASProcessor
+
+    out = Path(out_dir)
+    sid = entry["simulationId"]
+    # worker crash -> main process chỉ tính 1 lần chạy cho video có marker này (đang chạy lúc crash)
+    running = _running_marker(out, sid)
+    running.touch()
+    try:
+        t0 = time.perf_counter()
+        processor = ADASProcessor(detector=get_registry().get_detector())
+        result = processor.run(entry["video"], out / "videos" / f"simulation_{sid}.mp4", sid,
+                               entry["vehicleId"], entry["userId"],
+                               store_path=out / f"{sid}.parquet" if store else None)
+        seconds = time.perf_counter() - t0
+    finally:
+        running.unlink(missing_ok=True)
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        for kind, key in (("sensor", "sensorData"), ("alerts", "alerts")):
+            pq.write_table(pa.Table.from_pylist(result.pop(key)), str(out / f"{sid}.{kind}.parquet"),
+                           compression="zstd")
+    result["batch"] = {"video": entry["video"], "seconds": round(seconds, 3), "pid": os.getpid()}
+    _write_json(out / f"{sid}.json", result)   # marker hoàn thành, ghi cuối
+    return {"frames": result["summary"]["pipeline"]["frames"], "seconds": seconds}
+
+
+# ------------------------------------------------------------------
+# Main process
+# ------------------------------------------------------------------
+def _running_marker(out: Path, sid: str) -> Path:
+    return out / f"{sid}.running"
+
+
+def _write_json(path: Path, data):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _sim_id(path: Path, taken: set) -> str:
+    sid = re.sub(r"[^A-Za-z0-9_.-]", "_", path.stem)
+    if sid in taken:   # trùng tên ở thư mục khác -> thêm hash đường dẫn (ổn định giữa các lần chạy)
+        sid = f"{sid}-{hashlib.sha1(str(path).encode()).hexdigest()[:8]}"
+    taken.add(sid)
+    return sid
+
+
+def load_entries(source: str, vehicle_id: str, user_id: str) -> List[Dict]:
+    src = Path(source)
+    if src.is_dir():
+        items = [str(p) for p in sorted(src.rglob("*")) if p.suffix.lower() in VIDEO_EXTS]
+    elif src.suffix == ".json":
+        items = json.loads(src.read_text(encoding="utf-8"))
+    else:
+        items = [line.strip() for line in src.read_text(encoding="utf-8").splitlines()
+                 if line.strip() and not line.lstrip().startswith("#")]
+
+    entries, taken = [], set()
+    for item in items:
+        item = {"video": item} if isinstance(item, str) else dict(item)
+        video = Path(item["video"])
+        if not video.is_absolute() and not src.is_dir():
+            video = src.parent / video   # manifest: đường dẫn tương đối theo file manifest
+        item["video"] = str(video)
+        item["simulationId"] = item.get("simulationId") or _sim_id(video, taken)
+        item.setdefault("vehicleId", vehicle_id)
+        item.setdefault("userId", user_id)
+        entries.append(item)
+    return entries
+
+
+def is_done(out: Path, sid: str) -> bool:
+    try:
+        return json.loads((out / f"{sid}.json").read_text(encoding="utf-8")).get("status") == "completed"
+    except (FileNotFoundError, ValueError):
+        return False
+
+
+def run_batch(entries: List[Dict], out: Path, workers: int, threads: int, fmt: str = "json",
+              store: bool = False, pin: bool = False, retries: int = 1) -> Dict:
+    out.mkdir(parents=True, exist_ok=True)
+    (out / "videos").mkdir(exist_ok=True)
+    todo = [e for e in entries if not is_done(out, e["simulationId"])]
+    skipped = len(entries) - len(todo)
+    for e in todo:
+        _running_marker(out, e["simulationId"]).unlink(missing_ok=True)   # lần chạy trước bị kill
+    if skipped:
+        print(f"⏭️  {skipped} video(s) already completed, skipping")
+
+    ctx = mp.get_context("spawn")
+    done, failures = [], {}
+    attempts = {e["simulationId"]: 0 for e in todo}
+    t0 = time.perf_counter()
+    while todo:
+        core_sets = None
+        if pin and hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+            core_sets = ctx.Queue()
+            for i in range(workers):
+                core_sets.put(set(cores[(i * threads + j) % len(cores)] for j in range(threads)))
+        retry, broken = [], []   # broken: (entry, đang chạy lúc crash, lỗi)
+
+        def report(sid, status):
+            print(f"[{len(done) + len(failures)}/{len(entries) - skipped}] {sid}: {status}")
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(threads, core_sets)) as pool:
+            futures = {pool.submit(_process, e, str(out), fmt, store): e for e in todo}
+            for fut in as_completed(futures):
+                entry = futures[fut]
+                sid = entry["simulationId"]
+                try:
+                    stats = fut.result()
+                except BrokenProcessPool as e:
+                    running = _running_marker(out, sid)
+                    broken.append((entry, running.exists(), e))
+                    running.unlink(missing_ok=True)
+                    continue
+                except Exception as e:
+                    failures[sid] = {"video": entry["video"], "error": f"{type(e).__name__}: {e}"}
+                    report(sid, "❌ " + failures[sid]["error"])
+                else:
+                    done.append({"id": sid, **stats})
+                    failures.pop(sid, None)
+                    report(sid, f"✅ {stats['frames']} frames, "
+                                f"{stats['frames'] / max(stats['seconds'], 1e-6):.1f} fps")
+
+        # 1 worker chết (OOM / segfault) -> cả pool hỏng, chạy lại các video chưa xong; chỉ video đang
+        # chạy lúc crash bị tính 1 lần. Không video nào đang chạy (worker chết trước _process, vd. lúc
+        # khởi động) -> tính cho tất cả, nếu không vòng lặp không bao giờ kết thúc
+        charge_all = not any(running for _, running, _ in broken)
+        for entry, running, e in broken:
+            sid = entry["simulationId"]
+            if running or charge_all:
+                attempts[sid] += 1
+            if attempts[sid] <= retries:
+                retry.append(entry)
+                continue
+            failures[sid] = {"video": entry["video"], "error": f"worker crashed: {e}"}
+            report(sid, "❌ " + failures[sid]["error"])
+        todo = retry
+
+    wall = time.perf_counter() - t0
+    frames = sum(d["frames"] for d in done)
+    cores_used = workers * threads
+    report = {
+        "videos": len(entries),
+        "completed": len(done),
+        "skipped": skipped,
+        "failed": len(failures),
+        "workers": workers,
+        "threadsPerWorker": threads,
+        "wallSeconds": round(wall, 2),
+        "videosPerHour": round(len(done) / wall * 3600, 1) if wall else 0.0,
+        "framesPerSec": round(frames / wall, 2) if wall else 0.0,
+        "framesPerSecPerCore": round(frames / wall / cores_used, 2) if wall else 0.0,
+        "failures": failures,
+    }
+    _write_json(out / "batch_report.json", report)
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("source", help="thư mục video hoặc manifest (.txt / .json)")
+    ap.add_argument("--out", required=True, help="thư mục kết quả")
+    ap.add_argument("--workers", type=int, default=0, help="số worker process (0 = số core / --threads)")
+    ap.add_argument("--threads", type=int, default=0, help="thread inference / worker (0 = số core / --workers)")
+    ap.add_argument("--format", choices=("json", "parquet"), default="json")
+    ap.add_argument("--store", action="store_true", help="lưu detection store (Parquet) để replay")
+    ap.add_argument("--pin", action="store_true", help="gán mỗi worker vào tập core riêng (Linux)")
+    ap.add_argument("--retries", type=int, default=1, help="số lần chạy lại video khi worker crash")
+    ap.add_argument("--vehicle-id", default="batch")
+    ap.add_argument("--user-id", default="batch")
+    args = ap.parse_args()
+
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    if args.workers <= 0 and args.threads <= 0:
+        args.threads = 2 if cpus >= 4 else 1
+    if args.workers <= 0:
+        args.workers = max(1, cpus // args.threads)
+    if args.threads <= 0:
+        args.threads = max(1, cpus // args.workers)
+
+    entries = load_entries(args.source, args.vehicle_id, args.user_id)
+    if not entries:
+        ap.error(f"No videos found in {args.source}")
+    print(f"🎬 {len(entries)} video(s), {args.workers} worker(s) x {args.threads} thread(s)")
+    report = run_batch(entries, Path(args.out), args.workers, args.threads, args.format,
+                       args.store, args.pin, args.retries)
+    print("Summary:", json.dumps({k: v for k, v in report.items() if k != "failures"}, indent=2))
+    for sid, f in report["failures"].items():
+        print(f"❌ {sid} ({f['video']}): {f['error']}")
+
+
+if __name__ == "__main__":
+    main()
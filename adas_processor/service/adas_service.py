@@ -1,60 +1,289 @@
 # service/adas_service.py
+import asyncio
+import json
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pathlib import Path
-from config.config import VIDEOS_DIR, YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE
-from core.processing import ADASProcessor
-from service.schemas import ProcessRequest, ProcessResponse
+from config.config import (
+    VIDEOS_DIR, RESULT_CACHE, METRICS, LIVE_URL_SCHEMES, LIVE_MAX_DURATION_S, SINK, IMAGE_EXTENSIONS, IMAGE_MAX_FILES
+)
+from service.jobs import JobManager, QueueFullError
+from service.result_cache import ResultCache
+from service.schemas import ProcessRequest, ProcessResponse, JobStatus, LiveRequest, ImagesRequest, ImagesResponse
 from utils.logger import get_logger
 import time
+from urllib.parse import urlsplit
 
 logger = get_logger("ADASService")
-app = FastAPI()
+
+# sink: kết quả không giữ sensorData / alerts, cache hit sẽ không ghi gì vào sink -> tắt cache
+cache = ResultCache() if RESULT_CACHE and not SINK else None
+metrics = None
+if METRICS:
+    from service.metrics import ServiceMetrics
+    metrics = ServiceMetrics()
+jobs = JobManager(cache=cache, metrics=metrics)
+if metrics is not None:
+    metrics.watch(jobs.status, cache.stats if cache is not None else None)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Worker process load + warm-up model ngay khi start, /healthz trả lời luôn
+    jobs.start()
+    if cache is not None:
+        # model đổi -> bỏ kết quả cũ
+        try:
+            await asyncio.to_thread(cache.invalidate, True)
+        except OSError as e:
+            logger.warning(f"Result cache check skipped: {e}")
+    yield
+    jobs.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Thư mục gốc project
 BASE_DIR = Path(__file__).resolve().parent.parent
-# Thư mục upload video từ NodeJS
+# Thư mục upload video / ảnh từ NodeJS
 UPLOADS_DIR = BASE_DIR.parent / "server" / "Uploads" / "videos"
+IMAGE_UPLOADS_DIR = UPLOADS_DIR.parent / "images"
+
+
+def _is_image(filepath: Path) -> bool:
+    return filepath.suffix.lower() in IMAGE_EXTENSIONS
+
+
+def _resolve_upload(filepath_str: str) -> Path:
+    filepath = Path(filepath_str)
+    uploads = IMAGE_UPLOADS_DIR if _is_image(filepath) else UPLOADS_DIR
+
+    # 🔹 Chuẩn hóa lại đường dẫn
+    if str(filepath).startswith("/Uploads/"):
+        filepath = uploads / filepath.name
+    elif not filepath.is_absolute():
+        filepath = uploads / filepath.name
+
+    if not filepath.exists():
+        raise HTTPException(status_code=404, detail=f"File not found: {filepath}")
+    return filepath
+
+
+async def _cache_lookup(request: ProcessRequest, filepath: Path):
+    """(cache_key, result | None). Hash video đọc cả file -> chạy ngoài event loop."""
+    if cache is None:
+        return None, None
+    try:
+        key = await asyncio.to_thread(cache.key_for, filepath, request.vehicleId)
+        if key is None:
+            return None, None
+        result = await asyncio.to_thread(cache.get, key, request.simulationId,
+                                         request.vehicleId, request.userId, VIDEOS_DIR)
+    except OSError as e:
+        logger.warning(f"Result cache unavailable: {e}")
+        return None, None
+    return key, result
+
+
+async def _submit(request: ProcessRequest, stream: bool = False):
+    filepath = _resolve_upload(request.filepath)
+    if _is_image(filepath):
+        # simulation fileType "image" của NodeJS: đường ảnh tĩnh, không mở như video 1 frame
+        return _submit_images([filepath], request.simulationId, request.vehicleId, request.userId, stream=stream)
+    cache_key, cached = await _cache_lookup(request, filepath)
+    if cached is not None:
+        return jobs.add_cached(request.simulationId, cached, stream=stream)
+    # 🔹 Đường dẫn video output (final video sẽ nằm ở đây sau khi finalize)
+    output_path = VIDEOS_DIR / f"simulation_{request.simulationId}.mp4"
+    try:
+        job = jobs.submit(str(filepath), str(output_path), request.simulationId,
+                          request.vehicleId, request.userId, stream=stream, cache_key=cache_key)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    logger.info(f"▶️ Queued simulation {request.simulationId} with file: {filepath} (job {job.id})")
+    return job
+
+
+def _submit_images(filepaths, simulation_id: str, vehicle_id: str, user_id: str,
+                   annotate: bool = False, stream: bool = False):
+    try:
+        job = jobs.submit_images([str(p) for p in filepaths], simulation_id, vehicle_id, user_id,
+                                 annotate=annotate, stream=stream)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return job
+
+
+async def _wait_result(job, simulation_id: str, start_time: float):
+    """Chờ job xong (không block event loop) -> result, lỗi / cancel -> HTTPException."""
+    await asyncio.wait({asyncio.wrap_future(job.future)})
+    if job.status == "cancelled":
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    if job.status != "completed":
+        logger.error(f"❌ Error processing ADAS: {job.error}")
+        raise HTTPException(status_code=500, detail=f"Processing failed: {job.error}")
+    logger.info(f"✅ Simulation {simulation_id} completed in {time.time() - start_time:.2f}s")
+    return job.result
+
+
+def _get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+async def _ndjson(job):
+    async for event in job.stream.events():
+        yield json.dumps(event) + "\n"
+
+
+async def _sse(job):
+    async for event in job.stream.events():
+        yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def _stream_response(job, fmt: str) -> StreamingResponse:
+    if fmt == "ndjson":
+        return StreamingResponse(_ndjson(job), media_type="application/x-ndjson")
+    if fmt == "sse":
+        return StreamingResponse(_sse(job), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    raise HTTPException(status_code=400, detail=f"Unknown stream format: {fmt}")
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "jobs": jobs.status()}
+
+
+@app.get("/readyz")
+async def readyz():
+    status = jobs.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    body, content_type = await asyncio.to_thread(metrics.render)
+    return Response(content=body, media_type=content_type)
+
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(request: ProcessRequest, stream: bool = False):
+    """stream=true: sensor data / alert đọc qua GET /jobs/{id}/events, result chỉ còn summary."""
+    return (await _submit(request, stream)).to_dict()
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    return _get_job(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/result", response_model=ProcessResponse)
+async def get_job_result(job_id: str):
+    job = _get_job(job_id)
+    if job.status == "completed":
+        return job.result
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Processing failed: {job.error}")
+    if job.status == "cancelled":
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, format: str = "sse"):
+    """Sensor data + alert (đã lọc cooldown) + progress ngay khi có, event cuối là summary."""
+    job = _get_job(job_id)
+    if job.stream is None:
+        raise HTTPException(status_code=409, detail="Job was not submitted with stream=true")
+    return _stream_response(job, format)
+
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    job = _get_job(job_id)
+    if not jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+    return job.to_dict()
 
 
 @app.post("/process", response_model=ProcessResponse)
 async def process_adas(request: ProcessRequest):
+    """Giữ API cũ cho NodeJS: submit job rồi chờ kết quả (không block event loop)."""
     start_time = time.time()
-    try:
-        filepath = Path(request.filepath)
+    job = await _submit(request)
+    # result đã có videoUrl (ảnh: None) nên chỉ cần trả thẳng ra
+    return await _wait_result(job, request.simulationId, start_time)
+
+
+@app.post("/images", response_model=ImagesResponse)
+async def process_images(request: ImagesRequest):
+    """
+    Nhiều ảnh JPEG / PNG trong 1 job: detect theo batch, không tracker / video. Kết quả từng ảnh
+    (objects, khoảng cách, signs, alerts) + sensorData / alerts gộp (frame_index = thứ tự ảnh).
+    """
+    start_time = time.time()
+    if not request.filepaths:
+        raise HTTPException(status_code=400, detail="No images given")
+    if len(request.filepaths) > IMAGE_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many images ({len(request.filepaths)} > {IMAGE_MAX_FILES})")
+    filepaths = [_resolve_upload(p) for p in request.filepaths]
+    unsupported = [p.name for p in filepaths if not _is_image(p)]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported image type: {', '.join(unsupported[:5])}")
+    job = _submit_images(filepaths, request.simulationId, request.vehicleId, request.userId, request.annotate)
+    logger.info(f"▶️ Queued {len(filepaths)} images for simulation {request.simulationId} (job {job.id})")
+    return await _wait_result(job, request.simulationId, start_time)
 
-        # 🔹 Chuẩn hóa lại đường dẫn
-        if str(filepath).startswith("/Uploads/videos"):
-            filepath = UPLOADS_DIR / filepath.name
-        elif not filepath.is_absolute():
-            filepath = UPLOADS_DIR / filepath.name
 
-        if not filepath.exists():
-            raise HTTPException(status_code=404, detail=f"File not found: {filepath}")
+@app.post("/live", response_model=JobStatus, status_code=202)
+async def start_live(request: LiveRequest):
+    """
+    Phiên live trên camera stream: sensor data / alert qua GET /jobs/{id}/events ngay khi có,
+    DELETE /jobs/{id} để kết thúc phiên (summary có latency capture -> alert, số frame bị bỏ).
+    """
+    scheme = urlsplit(request.url).scheme.lower()
+    if scheme not in LIVE_URL_SCHEMES:
+        # không cho mở file / device / pipe trên máy chủ qua API
+        raise HTTPException(status_code=400, detail=f"Unsupported stream URL scheme: {scheme or '(none)'}")
+    duration_s = min(request.durationS or LIVE_MAX_DURATION_S, LIVE_MAX_DURATION_S)
+    try:
+        job = jobs.submit_live(request.url, request.simulationId, request.vehicleId, request.userId,
+                               duration_s=duration_s, max_frames=request.maxFrames)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return job.to_dict()
 
-        logger.info(f"▶️ Processing simulation {request.simulationId} with file: {filepath}")
 
-        # 🔹 Đường dẫn video output (final video sẽ nằm ở đây sau khi finalize)
-        output_path = VIDEOS_DIR / f"simulation_{request.simulationId}.mp4"
+@app.get("/cache")
+async def cache_stats():
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Result cache is disabled")
+    return await asyncio.to_thread(cache.stats)
 
-        # 🔹 Khởi tạo ADAS Processor và chạy
-        processor = ADASProcessor(YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH, DEVICE)
-        result = processor.run(
-            str(filepath),
-            str(output_path),
-            request.simulationId,
-            request.vehicleId,
-            request.userId
-        )
 
-        processing_time = time.time() - start_time
-        logger.info(f"✅ Simulation {request.simulationId} completed in {processing_time:.2f}s")
+@app.delete("/cache")
+async def invalidate_cache(stale_only: bool = False):
+    """Xóa result cache (stale_only=true: chỉ entry tạo bằng model weights cũ)."""
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Result cache is disabled")
+    removed = await asyncio.to_thread(cache.invalidate, stale_only)
+    return {"removed": removed}
 
-        # result đã có videoUrl nên chỉ cần trả thẳng ra
-        return result
 
-    except Exception as e:
-        logger.error(f"❌ Error processing ADAS: {e}")
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+@app.post("/process/stream")
+async def process_adas_stream(request: ProcessRequest, format: str = "ndjson"):
+    """Như /process nhưng trả sensor data / alert dạng NDJSON (hoặc SSE) trong lúc xử lý."""
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail=f"Unknown stream format: {format}")
+    return _stream_response(await _submit(request, stream=True), format)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,558 @@
+# service/jobs.py
+import asyncio
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from config.config import (
+    JOB_WORKERS, JOB_QUEUE_MAX, JOB_RESULT_TTL_S, STREAM_BACKLOG, STREAM_QUEUE_MAX, METRICS, SINK, IMAGES_DIR
+)
+from utils.logger import get_logger
+
+logger = get_logger("JobManager")
+
+
+class QueueFullError(Exception):
+    """Hàng đợi job đã đầy (service trả về 429)."""
+
+
+class JobCancelled(Exception):
+    """Raise trong worker khi job bị cancel giữa chừng."""
+
+
+# ------------------------------------------------------------------
+# Worker process side
+# ------------------------------------------------------------------
+_events = None      # mp.Queue -> main process
+_cancelled = None   # Manager dict: job_id -> True
+
+
+def _init_worker(events, cancelled):
+    global _events, _cancelled
+    _events, _cancelled = events, cancelled
+    from core.model_registry import get_registry
+    try:
+        registry = get_registry()
+        registry.load()  # load + warm-up 1 lần cho mỗi worker
+        events.put((None, "worker_ready", registry.status()))
+    except Exception:
+        pass  # job sẽ fail với lỗi load model cụ thể
+
+
+def _ping():
+    return os.getpid()
+
+
+def _record_handler(job_id: str, stream: bool, sink):
+    """on_record: stream -> client, sink -> ghi batch; None nếu không có nơi nhận."""
+    def on_record(kind, record):
+        if sink is not None:
+            sink.add(kind, record)
+        if stream:
+            _events.put((job_id, "record", (kind, record)))
+    return on_record if stream or sink is not None else None
+
+
+def _close_sink(sink, result: Dict) -> Dict:
+    sink.close()   # flush phần còn lại; batch lỗi -> SinkError, job failed
+    result["summary"]["sink"] = sink.stats()
+    return result
+
+
+def _run_job(job_id: str, filepath: str, output_path: str,
+             simulation_id: str, vehicle_id: str, user_id: str, stream: bool = False) -> Dict:
+    from core.model_registry import get_registry
+    from core.processing import ADASProcessor
+    from core.profiling import StageTimer
+    from core.sinks import open_sink
+
+    def on_progress(frames_done, total_frames, fps):
+        _events.put((job_id, "progress", (frames_done, total_frames, fps)))
+        if _cancelled.get(job_id):
+            raise JobCancelled(job_id)
+
+    _events.put((job_id, "started", os.getpid()))
+    sink = None
+    try:
+        sink = open_sink(SINK, simulation_id, vehicle_id, user_id)
+        processor = ADASProcessor(detector=get_registry().get_detector())
+        timer = StageTimer() if METRICS else None
+        # stream / sink: record đi thẳng ra ngoài, kết quả cuối chỉ còn summary + videoUrl
+        result = processor.run(filepath, output_path, simulation_id, vehicle_id, user_id,
+                               progress_cb=on_progress, on_record=_record_handler(job_id, stream, sink),
+                               collect=not stream and sink is None, timer=timer)
+        if sink is not None:
+            result = _close_sink(sink, result)
+            sink = None
+        if timer is not None:
+            _events.put((job_id, "metrics", timer.histogram()))   # 1 message / job
+        return result
+    finally:
+        if sink is not None:
+            try:
+                sink.close()   # job lỗi / bị cancel: vẫn ghi nốt record đã có
+            except Exception:
+                pass
+        # đánh dấu hết event của job (future về main process theo đường khác)
+        _events.put((job_id, "events_done", None))
+
+
+def _run_live_job(job_id: str, url: str, simulation_id: str, vehicle_id: str, user_id: str,
+                  duration_s: Optional[float] = None, max_frames: Optional[int] = None) -> Dict:
+    """Phiên live: record luôn stream về client; cancel = dừng phiên, kết quả vẫn completed."""
+    from core.live import LiveProcessor, LiveSource
+    from core.model_registry import get_registry
+    from core.sinks import open_sink
+
+    def on_progress(frames_done, total_frames, fps):
+        _events.put((job_id, "progress", (frames_done, total_frames, fps)))
+
+    _events.put((job_id, "started", os.getpid()))
+    sink = None
+    try:
+        sink = open_sink(SINK, simulation_id, vehicle_id, user_id)
+        source = LiveSource(url)
+        processor = LiveProcessor(get_registry().get_detector())
+        result = processor.run(source, simulation_id, vehicle_id, user_id,
+                               on_record=_record_handler(job_id, True, sink),
+                               should_stop=lambda: bool(_cancelled.get(job_id)), progress_cb=on_progress,
+                               duration_s=duration_s, max_frames=max_frames)
+        if sink is not None:
+            result = _close_sink(sink, result)
+            sink = None
+        return result
+    finally:
+        if sink is not None:
+            try:
+                sink.close()
+            except Exception:
+                pass
+        _events.put((job_id, "events_done", None))
+
+
+def _run_images_job(job_id: str, paths: List[str], simulation_id: str, vehicle_id: str, user_id: str,
+                    annotate: bool = False, stream: bool = False) -> Dict:
+    """Ảnh tĩnh theo batch (core/images.py); progress tính theo số ảnh."""
+    from core.images import ImageProcessor
+    from core.model_registry import get_registry
+    from core.sinks import open_sink
+
+    def on_progress(images_done, total, rate):
+        _events.put((job_id, "progress", (images_done, total, rate)))
+        if _cancelled.get(job_id):
+            raise JobCancelled(job_id)
+
+    _events.put((job_id, "started", os.getpid()))
+    sink = None
+    try:
+        sink = open_sink(SINK, simulation_id, vehicle_id, user_id)
+        processor = ImageProcessor(get_registry().get_detector())
+        annotate_dir = IMAGES_DIR / f"simulation_{simulation_id}" if annotate else None
+        result = processor.run(paths, simulation_id, vehicle_id, user_id, annotate_dir=annotate_dir,
+                               progress_cb=on_progress, on_record=_record_handler(job_id, stream, sink),
+                               collect=not stream and sink is None)
+        if sink is not None:
+            result = _close_sink(sink, result)
+            sink = None
+        return result
+    finally:
+        if sink is not None:
+            try:
+                sink.close()
+            except Exception:
+                pass
+        _events.put((job_id, "events_done", None))
+
+
+# ------------------------------------------------------------------
+# Streaming
+# ------------------------------------------------------------------
+DATA_EVENTS = ("sensor", "alert")
+
+
+def _offer(q: asyncio.Queue, event: Dict):
+    """
+    put_nowait, giới hạn q.limit event chờ / client (queue tự nó không giới hạn).
+    Client đọc chậm, queue đầy:
+    - progress: bỏ (event progress sau thay thế được)
+    - sensor / alert: bỏ nhưng đếm theo loại; event "dropped" {sensor, alert, reason} được chèn
+      vào đúng chỗ bị mất ngay khi queue có chỗ -> client biết mình thiếu record nào
+    - summary: luôn được đưa vào (kèm "dropped" còn treo)
+    """
+    kind = event["event"]
+    if kind != "summary" and q.qsize() >= q.limit:
+        if kind in DATA_EVENTS:
+            q.pending[kind] += 1
+            q.dropped += 1
+        return
+    if q.pending:
+        q.put_nowait({"event": "dropped", "data": {**dict(q.pending), "reason": "slow_client"}})
+        q.pending.clear()
+    q.put_nowait(event)
+
+
+class JobStream:
+    """
+    Phát event {"event": sensor | alert | progress | dropped | summary, "data": ...} của 1 job
+    tới các client đang nghe (mỗi client 1 asyncio.Queue trên event loop của nó).
+    Chỉ giữ `backlog` event gần nhất cho client kết nối muộn -> bộ nhớ không tăng theo
+    độ dài video; client đó nhận trước 1 event "dropped" (reason "backlog") với số sensor /
+    alert đã ra khỏi cửa sổ. Event cuối cùng luôn là "summary" (droppedEvents = tổng số
+    record client này không nhận được).
+    """
+    def __init__(self, backlog: int = STREAM_BACKLOG, queue_max: int = STREAM_QUEUE_MAX):
+        self.queue_max = queue_max
+        self._backlog = deque(maxlen=backlog)
+        self._evicted = Counter()   # sensor / alert đã ra khỏi backlog
+        self._subs = []   # [(loop, asyncio.Queue)]
+        self._lock = threading.Lock()
+
+    def publish(self, kind: str, data: Dict):
+        event = {"event": kind, "data": data}
+        with self._lock:
+            if len(self._backlog) == self._backlog.maxlen and self._backlog[0]["event"] in DATA_EVENTS:
+                self._evicted[self._backlog[0]["event"]] += 1
+            self._backlog.append(event)
+            subs = list(self._subs)
+        for loop, q in subs:
+            try:
+                loop.call_soon_threadsafe(_offer, q, event)
+            except RuntimeError:
+                pass  # event loop đã đóng
+
+    def subscribe(self) -> asyncio.Queue:
+        """Gọi trong event loop."""
+        q = asyncio.Queue()
+        q.limit, q.pending, q.dropped = self.queue_max, Counter(), 0
+        with self._lock:
+            if self._evicted:
+                q.put_nowait({"event": "dropped", "data": {**dict(self._evicted), "reason": "backlog"}})
+                q.dropped += sum(self._evicted.values())
+            for event in self._backlog:
+                _offer(q, event)
+            self._subs.append((asyncio.get_running_loop(), q))
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        with self._lock:
+            self._subs = [(loop, s) for loop, s in self._subs if s is not q]
+
+    async def events(self) -> AsyncIterator[Dict]:
+        q = self.subscribe()
+        try:
+            while True:
+                event = await q.get()
+                if event["event"] == "summary":
+                    event = {"event": "summary", "data": {**event["data"], "droppedEvents": q.dropped}}
+                yield event
+                if event["event"] == "summary":
+                    return
+        finally:
+            self.unsubscribe(q)
+
+
+class ReplayStream:
+    """Stream của job lấy từ result cache: phát lại sensor data / alert đã lưu rồi summary."""
+    def __init__(self, result: Dict):
+        self.result = result
+
+    async def events(self) -> AsyncIterator[Dict]:
+        for record in self.result.get("sensorData", []):
+            yield {"event": "sensor", "data": record}
+        for record in self.result.get("alerts", []):
+            yield {"event": "alert", "data": record}
+        yield {"event": "summary", "data": {
+            "status": self.result["status"], "summary": self.result["summary"],
+            "videoUrl": self.result.get("videoUrl"), "error": None, "droppedEvents": 0,
+        }}
+
+
+# ------------------------------------------------------------------
+# Main process side
+# ------------------------------------------------------------------
+@dataclass
+class Job:
+    id: str
+    simulation_id: str
+    args: tuple
+    fn: Callable = _run_job   # hàm chạy trong worker: _run_job(job_id, *args) | _run_live_job | _run_images_job
+    status: str = "queued"   # queued | running | completed | failed | cancelled
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    frames_done: int = 0
+    total_frames: int = 0
+    fps: float = 0.0
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    future: Optional[Future] = None
+    stream: Optional[JobStream] = None
+    events_done: bool = False
+    cache_key: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self) -> Dict:
+        return {
+            "jobId": self.id,
+            "simulationId": self.simulation_id,
+            "status": self.status,
+            "framesDone": self.frames_done,
+            "totalFrames": self.total_frames,
+            "fps": round(self.fps, 2),
+            "error": self.error,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Chạy ADASProcessor trên 1 process pool giới hạn số worker.
+    - mỗi worker load model 1 lần (ModelRegistry của process đó)
+    - tối đa `queue_max` job chờ, quá thì submit() raise QueueFullError
+    - tiến độ từ worker về qua 1 mp.Queue, cancel qua 1 Manager dict
+    """
+    def __init__(self, workers: int = JOB_WORKERS, queue_max: int = JOB_QUEUE_MAX,
+                 result_ttl_s: float = JOB_RESULT_TTL_S, cache=None, metrics=None):
+        self.workers = workers
+        self.cache = cache   # ResultCache: lưu kết quả job completed có cache_key
+        self.metrics = metrics   # ServiceMetrics (/metrics)
+        self.queue_max = queue_max
+        self.result_ttl_s = result_ttl_s
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._ctx = mp.get_context("spawn")
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._events = None
+        self._manager = None
+        self._cancelled = None
+        self._pump: Optional[threading.Thread] = None
+        self._workers_ready = 0
+        # ghi result cache (copy result + video) không chạy trên thread callback của executor
+        self._cache_io = ThreadPoolExecutor(1, thread_name_prefix="result-cache") if cache is not None else None
+
+    # --- lifecycle ---
+    def start(self):
+        self._events = self._ctx.Queue()
+        self._manager = self._ctx.Manager()
+        self._cancelled = self._manager.dict()
+        self._pump = threading.Thread(target=self._pump_events, name="job-events", daemon=True)
+        self._pump.start()
+        self._start_pool()
+
+    def _start_pool(self):
+        self._workers_ready = 0
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=self._ctx,
+            initializer=_init_worker, initargs=(self._events, self._cancelled)
+        )
+        # spawn + warm-up tất cả worker ngay khi start
+        for _ in range(self.workers):
+            self._pool.submit(_ping)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._events is not None:
+            self._events.put(None)
+        if self._manager is not None:
+            self._manager.shutdown()
+        if self._cache_io is not None:
+            self._cache_io.shutdown(wait=True)   # entry đang ghi dở được hoàn tất
+
+    # --- jobs ---
+    def submit(self, filepath: str, output_path: str, simulation_id: str,
+               vehicle_id: str, user_id: str, stream: bool = False,
+               cache_key: Optional[str] = None) -> Job:
+        job = Job(id=uuid.uuid4().hex, simulation_id=simulation_id,
+                  args=(filepath, output_path, simulation_id, vehicle_id, user_id, stream),
+                  stream=JobStream() if stream else None, cache_key=cache_key)
+        self._enqueue(job)
+        logger.info(f"📥 Job {job.id} queued (simulation {simulation_id})")
+        return job
+
+    def submit_live(self, url: str, simulation_id: str, vehicle_id: str, user_id: str,
+                    duration_s: Optional[float] = None, max_frames: Optional[int] = None) -> Job:
+        """Phiên live chiếm 1 worker tới khi stream kết thúc / hết duration_s / bị cancel."""
+        job = Job(id=uuid.uuid4().hex, simulation_id=simulation_id, fn=_run_live_job,
+                  args=(url, simulation_id, vehicle_id, user_id, duration_s, max_frames),
+                  stream=JobStream())
+        self._enqueue(job)
+        logger.info(f"📡 Live job {job.id} queued (simulation {simulation_id})")
+        return job
+
+    def submit_images(self, paths: List[str], simulation_id: str, vehicle_id: str, user_id: str,
+                      annotate: bool = False, stream: bool = False) -> Job:
+        job = Job(id=uuid.uuid4().hex, simulation_id=simulation_id, fn=_run_images_job,
+                  args=(list(paths), simulation_id, vehicle_id, user_id, annotate, stream),
+                  stream=JobStream() if stream else None)
+        self._enqueue(job)
+        logger.info(f"🖼️ Image job {job.id} queued ({len(paths)} images, simulation {simulation_id})")
+        return job
+
+    def _enqueue(self, job: Job):
+        with self._lock:
+            self._prune()
+            queued = sum(1 for j in self._jobs.values() if j.status == "queued")
+            if queued >= self.queue_max:
+                raise QueueFullError(f"Job queue is full ({queued} waiting)")
+            self._jobs[job.id] = job
+            try:
+                job.future = self._pool.submit(job.fn, job.id, *job.args)
+            except BrokenProcessPool:
+                logger.warning("Process pool broken, restarting workers")
+                self._start_pool()
+                job.future = self._pool.submit(job.fn, job.id, *job.args)
+        job.future.add_done_callback(lambda f, job=job: self._on_done(job, f))
+
+    def add_cached(self, simulation_id: str, result: Dict, stream: bool = False) -> Job:
+        """Job đã xong ngay từ result cache (không qua worker)."""
+        now = time.time()
+        future = Future()
+        future.set_result(result)
+        frames = result["summary"].get("pipeline", {}).get("frames", 0)
+        job = Job(id=uuid.uuid4().hex, simulation_id=simulation_id, args=(), status="completed",
+                  started_at=now, finished_at=now, frames_done=frames, total_frames=frames,
+                  result=result, future=future, events_done=True,
+                  stream=ReplayStream(result) if stream else None)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        if self.metrics is not None:
+            self.metrics.job_finished("completed", result, cached=True)
+        logger.info(f"⚡ Job {job.id} served from cache (simulation {simulation_id})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        if not job.future.cancel():
+            # đang chạy -> worker sẽ dừng ở lần báo tiến độ kế tiếp (live: sau frame hiện tại)
+            self._cancelled[job_id] = True
+        return True
+
+    def status(self) -> Dict:
+        with self._lock:
+            counts = {"queued": 0, "running": 0}
+            for j in self._jobs.values():
+                if j.status in counts:
+                    counts[j.status] += 1
+        return {
+            "ready": self._workers_ready > 0,
+            "workers": self.workers,
+            "workersReady": self._workers_ready,
+            "queueMax": self.queue_max,
+            **counts,
+        }
+
+    # --- internals ---
+    def _on_done(self, job: Job, fut: Future):
+        with self._lock:
+            job.finished_at = time.time()
+            if fut.cancelled():
+                job.status = "cancelled"
+            else:
+                exc = fut.exception()
+                if exc is None:
+                    job.result = fut.result()
+                    job.status = "completed"
+                elif isinstance(exc, JobCancelled):
+                    job.status = "cancelled"
+                else:
+                    job.status = "failed"
+                    job.error = str(exc)
+            if fut.cancelled() or isinstance(fut.exception(), BrokenProcessPool):
+                job.events_done = True   # worker không chạy / đã chết -> không còn event nào
+            self._close_stream(job)
+        if self._cancelled is not None:
+            self._cancelled.pop(job.id, None)
+        if self.metrics is not None:
+            self.metrics.job_finished(job.status, job.result)
+        logger.info(f"🏁 Job {job.id} {job.status}")
+        # job stream không giữ sensorData / alerts trong result -> không cache
+        if job.status == "completed" and job.cache_key and self.cache is not None and job.stream is None:
+            self._cache_io.submit(self._store_cached, job)
+
+    def _store_cached(self, job: Job):
+        video = Path(job.args[1]).parent / Path(job.result.get("videoUrl") or "").name
+        try:
+            self.cache.put(job.cache_key, job.result, video if video.is_file() else None, job.started_at)
+        except OSError as e:
+            logger.warning(f"Cannot store job {job.id} in result cache: {e}")
+
+    def _close_stream(self, job: Job):
+        """Gửi event summary khi đã có kết quả VÀ đã nhận hết record của worker (gọi khi giữ lock)."""
+        if job.stream is None or not job.finished or not job.events_done:
+            return
+        result = job.result or {}
+        job.stream.publish("summary", {
+            "status": job.status,
+            "summary": result.get("summary"),
+            "videoUrl": result.get("videoUrl"),
+            "error": job.error,
+        })
+
+    def _pump_events(self):
+        while True:
+            try:
+                msg = self._events.get()
+            except (EOFError, OSError):
+                return
+            if msg is None:
+                return
+            job_id, kind, payload = msg
+            if kind == "worker_ready":
+                self._workers_ready += 1
+                if self.metrics is not None:
+                    self.metrics.model_loaded(payload.get("loadTimeS"))
+                continue
+            if kind == "metrics":
+                if self.metrics is not None:
+                    self.metrics.stages.merge(payload)
+                continue
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                if kind == "events_done":
+                    job.events_done = True
+                    self._close_stream(job)
+                elif kind == "record":
+                    if job.stream is not None:
+                        job.stream.publish(*payload)
+                elif job.finished:
+                    continue
+                elif kind == "started":
+                    job.status = "running"
+                    job.started_at = time.time()
+                    if self.metrics is not None:
+                        self.metrics.job_started()
+                elif kind == "progress":
+                    job.frames_done, job.total_frames, job.fps = payload
+                    if job.stream is not None:
+                        job.stream.publish("progress", {"framesDone": job.frames_done,
+                                                        "totalFrames": job.total_frames,
+                                                        "fps": round(job.fps, 2)})
+
+    def _prune(self):
+        now = time.time()
+        expired = [jid for jid, j in self._jobs.items()
+                   if j.finished and j.finished_at and now - j.finished_at > self.result_ttl_s]
+        for jid in expired:
+            del self._jobs[jid]
@@ -0,0 +1,156 @@
+# service/metrics.py
+"""
+Metrics Prometheus cho service (GET /metrics).
+
+Hot path (từng frame) chỉ chạy trong worker: StageTimer ghi vào array, không lock. Hết job worker
+gửi histogram đã gom theo bucket qua queue event -> process chính cộng vào 1 lần / job.
+Trạng thái (queue, worker, cache, RSS / CPU) đọc lúc scrape, không tốn gì giữa các lần scrape.
+"""
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import psutil
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily, HistogramMetricFamily
+
+from core.profiling import STAGE_BUCKETS
+
+JOB_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+FPS_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 240)
+LOAD_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+
+class StageHistograms:
+    """Collector: histogram latency từng stage, cộng dồn từ StageTimer.histogram() của worker."""
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stages: Dict[str, list] = {}   # stage -> [cumulative counts, sum, count]
+
+    def merge(self, stages: Dict[str, Dict]):
+        with self._lock:
+            for name, h in stages.items():
+                cur = self._stages.setdefault(name, [np.zeros(len(self.buckets), dtype=np.int64), 0.0, 0])
+                cur[0] += np.asarray(h["buckets"], dtype=np.int64)
+                cur[1] += h["sum"]
+                cur[2] += h["count"]
+
+    def collect(self):
+        m = HistogramMetricFamily("adas_stage_latency_seconds",
+                                  "Thời gian mỗi stage / frame (finalize: 1 lần / video)", labels=["stage"])
+        with self._lock:
+            for name, (counts, total, count) in sorted(self._stages.items()):
+                buckets = [(repr(float(b)), int(c)) for b, c in zip(self.buckets, counts)]
+                m.add_metric([name], buckets + [("+Inf", count)], total)
+        yield m
+
+
+class StateCollector:
+    """Đọc lúc scrape: hàng đợi job, worker, result cache, RSS / CPU của service + process con."""
+    def __init__(self, job_status: Callable[[], Dict], cache_stats: Optional[Callable[[], Dict]] = None):
+        self.job_status = job_status
+        self.cache_stats = cache_stats
+        self._proc = psutil.Process(os.getpid())
+        self._children: Dict[int, psutil.Process] = {}   # giữ object để cpu_percent() tính theo lần scrape trước
+
+    def _process_stats(self):
+        """(rss, cpu %) của service và tổng các process con (worker, ffmpeg)."""
+        rss_children, cpu_children = 0, 0.0
+        alive = {}
+        for child in self._proc.children(recursive=True):
+            proc = self._children.get(child.pid, child)
+            try:
+                rss_children += proc.memory_info().rss
+                cpu_children += proc.cpu_percent(None)
+                alive[child.pid] = proc
+            except psutil.Error:
+                continue   # process vừa thoát
+        self._children = alive
+        return ((self._proc.memory_info().rss, self._proc.cpu_percent(None)),
+                (rss_children, cpu_children), len(alive))
+
+    def collect(self):
+        status = self.job_status()
+        for name, key, doc in (
+            ("adas_jobs_queued", "queued", "Job đang chờ worker"),
+            ("adas_jobs_running", "running", "Job đang chạy"),
+            ("adas_workers", "workers", "Số worker process cấu hình"),
+            ("adas_workers_ready", "workersReady", "Worker đã load xong model"),
+            ("adas_job_queue_max", "queueMax", "Số job chờ tối đa"),
+        ):
+            yield GaugeMetricFamily(name, doc, value=status[key])
+
+        (rss, cpu), (rss_c, cpu_c), n_children = self._process_stats()
+        m = GaugeMetricFamily("adas_process_resident_memory_bytes", "RSS", labels=["process"])
+        m.add_metric(["service"], rss)
+        m.add_metric(["children"], rss_c)
+        yield m
+        m = GaugeMetricFamily("adas_process_cpu_percent", "CPU % từ lần scrape trước (100 = 1 core)",
+                              labels=["process"])
+        m.add_metric(["service"], cpu)
+        m.add_metric(["children"], cpu_c)
+        yield m
+        yield GaugeMetricFamily("adas_child_processes", "Worker + ffmpeg đang chạy", value=n_children)
+        times = self._proc.cpu_times()
+        yield CounterMetricFamily("adas_service_cpu_seconds", "CPU time của process service",
+                                  value=times.user + times.system)
+
+        if self.cache_stats is not None:
+            stats = self.cache_stats()
+            yield CounterMetricFamily("adas_cache_hits", "Result cache hit", value=stats["hits"])
+            yield CounterMetricFamily("adas_cache_misses", "Result cache miss", value=stats["misses"])
+            yield GaugeMetricFamily("adas_cache_entries", "Số entry result cache", value=stats["entries"])
+            yield GaugeMetricFamily("adas_cache_bytes", "Dung lượng result cache", value=stats["bytes"])
+
+
+class ServiceMetrics:
+    """Counter / histogram cập nhật từ JobManager (1 lần / job, không theo frame)."""
+    def __init__(self):
+        self.registry = CollectorRegistry()
+        r = self.registry
+        self.jobs_started = Counter("adas_jobs_started", "Job bắt đầu chạy trên worker", registry=r)
+        self.jobs_completed = Counter("adas_jobs_completed", "Job hoàn thành", ["source"], registry=r)
+        self.jobs_failed = Counter("adas_jobs_failed", "Job lỗi (kể cả worker crash)", registry=r)
+        self.jobs_cancelled = Counter("adas_jobs_cancelled", "Job bị cancel", registry=r)
+        self.frames = Counter("adas_frames_processed", "Frame đã xử lý", registry=r)
+        self.video_seconds = Counter("adas_video_processed_seconds", "Thời lượng video đã xử lý", registry=r)
+        self.job_duration = Histogram("adas_job_duration_seconds", "Thời gian chạy 1 job trên worker",
+                                      buckets=JOB_BUCKETS, registry=r)
+        self.job_fps = Histogram("adas_job_fps", "Throughput (frame/s) của từng job",
+                                 buckets=FPS_BUCKETS, registry=r)
+        self.model_load = Histogram("adas_model_load_seconds", "Thời gian load + warm-up model / worker",
+                                    buckets=LOAD_BUCKETS, registry=r)
+        self.stages = StageHistograms()
+        r.register(self.stages)
+
+    def watch(self, job_status: Callable[[], Dict], cache_stats: Optional[Callable[[], Dict]] = None):
+        self.registry.register(StateCollector(job_status, cache_stats))
+
+    # --- JobManager hooks ---
+    def job_started(self):
+        self.jobs_started.inc()
+
+    def job_finished(self, status: str, result: Optional[Dict] = None, cached: bool = False):
+        if status == "failed":
+            self.jobs_failed.inc()
+        elif status == "cancelled":
+            self.jobs_cancelled.inc()
+        elif status == "completed":
+            self.jobs_completed.labels("cache" if cached else "worker").inc()
+            if cached or result is None:
+                return
+            pipeline = result.get("summary", {}).get("pipeline", {})
+            self.frames.inc(pipeline.get("frames", 0))
+            self.video_seconds.inc(pipeline.get("videoS", 0.0))
+            if pipeline.get("wallTimeS"):
+                self.job_duration.observe(pipeline["wallTimeS"])
+                self.job_fps.observe(pipeline.get("fps", 0.0))
+
+    def model_loaded(self, seconds: Optional[float]):
+        if seconds is not None:
+            self.model_load.observe(seconds)
+
+    def render(self):
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
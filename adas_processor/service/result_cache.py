@@ -0,0 +1,237 @@
+# service/result_cache.py
+"""
+Cache kết quả xử lý theo nội dung video.
+
+key = sha256(nội dung video + hash weights 2 model + các tham số config ảnh hưởng tới
+kết quả; ROI_MODE "static": + vehicleId vì ROI theo camera). Upload lại cùng 1 clip (tên file
+khác do prefix Date.now()) -> trả kết quả cũ và hard-link video đã annotate, không chạy lại
+detector / ffmpeg. ROI_MODE "learned": không cache (grid ROI của vehicle thay đổi sau mỗi lần chạy).
+
+Mỗi entry là 1 thư mục <root>/<key>/ gồm result.json + video.mp4 + meta.json.
+LRU theo mtime của result.json (touch khi hit), tổng dung lượng <= max_bytes.
+"""
+import copy
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import config.config as cfg
+from config.config import (
+    CACHE_DIR, CACHE_MAX_BYTES, YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH
+)
+from utils.helpers import epoch_of, timestamp_at
+from utils.logger import get_logger
+
+logger = get_logger("ResultCache")
+
+# đổi khi format result / logic xử lý thay đổi mà config không đổi
+CACHE_VERSION = 2
+
+# tham số config.py có ảnh hưởng tới result / video output
+KEY_PARAMS = (
+    "H_FOV_DEG", "DIST_WARN_M", "TTC_WARN_S", "ALERT_COOLDOWN_S", "ALERT_RULES", "FRAME_INTERVAL",
+    "COCO_IMGSZ", "COCO_CONF", "SIGN_IMGSZ", "SIGN_CONF", "DETECTOR_BACKEND",
+    "ADAPTIVE_SKIP", "SKIP_MIN_INTERVAL", "SKIP_MAX_INTERVAL", "SIGN_DETECT_INTERVAL",
+    "TRACK_HISTORY", "TRACK_EVICT_S", "COCO_NAMES", "VEHICLES", "W_REAL_M",
+    "ADAPTIVE_IMGSZ", "COCO_IMGSZ_LOW", "ROI_MODE", "OBJECT_ROI", "OBJECT_ROI_BY_VEHICLE",
+    "VIDEO_ENCODER", "FFMPEG_PRESET", "FFMPEG_CRF",
+)
+
+
+def file_hash(path, chunk_size=1 << 20) -> str:
+    """sha256 đọc theo chunk (không load cả video vào RAM)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+
+
+class ResultCache:
+    def __init__(self, root=CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 model_paths=(YOLO_MODEL_PATH, TRAFFIC_SIGN_MODEL_PATH)):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.model_paths = tuple(str(p) for p in model_paths)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._weights: Dict[str, tuple] = {}   # path -> ((size, mtime), hash)
+
+    # --- key ---
+    def model_hashes(self) -> Dict[str, str]:
+        """Hash weights, chỉ tính lại khi file đổi (size / mtime)."""
+        out = {}
+        for path in self.model_paths:
+            st = os.stat(path)
+            sig = (st.st_size, st.st_mtime_ns)
+            cached = self._weights.get(path)
+            if cached is None or cached[0] != sig:
+                cached = (sig, file_hash(path))
+                self._weights[path] = cached
+            out[Path(path).name] = cached[1]
+        return out
+
+    @staticmethod
+    def params() -> Dict:
+        return {name: getattr(cfg, name, None) for name in KEY_PARAMS}
+
+    def key_for(self, video_path, vehicle_id: str) -> Optional[str]:
+        """
+        Đọc toàn bộ video để hash -> gọi ngoài event loop.
+        None = kết quả không cache được (ROI học theo vehicle, đổi sau mỗi lần chạy).
+        """
+        if cfg.ROI_MODE == "learned":
+            return None
+        payload = {
+            "version": CACHE_VERSION,
+            "video": file_hash(video_path),
+            "models": self.model_hashes(),
+            "params": self.params(),
+        }
+        if cfg.ROI_MODE != "off":
+            payload["vehicle"] = vehicle_id   # OBJECT_ROI_BY_VEHICLE[vehicleId]
+        payload = json.dumps(payload, sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # --- get / put ---
+    def get(self, key: str, simulation_id: str, vehicle_id: str, user_id: str,
+            output_dir, start_epoch: Optional[float] = None) -> Optional[Dict]:
+        """
+        Hit -> result cho simulation mới (id + videoUrl đổi theo) và link video sang output_dir.
+        timestamp của sensorData / alerts dời theo start_epoch (mặc định: lúc hit) như 1 lần chạy mới.
+        """
+        entry = self.root / key
+        result_file = entry / "result.json"
+        video = entry / "video.mp4"
+        target = Path(output_dir) / f"simulation_{simulation_id}.mp4"
+        # link video trong lock: put / _evict / invalidate không xóa được entry giữa chừng
+        with self._lock:
+            try:
+                result = json.loads(result_file.read_text(encoding="utf-8"))
+                meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+                has_video = video.exists()
+                if has_video:
+                    _link_or_copy(video, target)
+                os.utime(result_file)   # LRU
+            except (FileNotFoundError, ValueError):
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        result = copy.deepcopy(result)
+        if has_video:
+            result["videoUrl"] = f"/Processed/videos/{target.name}"
+        for entry_data in result.get("sensorData", []):
+            entry_data.update(vehicleId=vehicle_id, simulationId=simulation_id, userId=user_id)
+        shift = (time.time() if start_epoch is None else start_epoch) - meta.get("startEpoch", 0.0)
+        for record in result.get("sensorData", []) + result.get("alerts", []):
+            if record.get("timestamp") and "startEpoch" in meta:
+                record["timestamp"] = timestamp_at(epoch_of(record["timestamp"]) + shift)
+        result["summary"]["cached"] = True
+        return result
+
+    def put(self, key: str, result: Dict, video_path=None, start_epoch: Optional[float] = None):
+        """
+        Lưu result (+ video) vào cache. Ghi vào thư mục tạm rồi rename -> không có entry dở dang.
+        start_epoch: lúc job bắt đầu (gốc của timestamp trong result), để get() dời timestamp.
+        Copy result + video -> gọi ngoài event loop / callback của executor.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=self.root, prefix=".tmp_"))
+        try:
+            (tmp / "result.json").write_text(json.dumps(result), encoding="utf-8")
+            (tmp / "meta.json").write_text(json.dumps({
+                "models": self.model_hashes(), "version": CACHE_VERSION, "createdAt": time.time(),
+                "startEpoch": time.time() if start_epoch is None else start_epoch,
+            }), encoding="utf-8")
+            if video_path is not None and Path(video_path).exists():
+                _link_or_copy(Path(video_path), tmp / "video.mp4")
+            with self._lock:
+                entry = self.root / key
+                if entry.exists():
+                    return
+                os.replace(tmp, entry)
+                self.stores += 1
+                self._evict()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    # --- eviction / invalidation ---
+    def _entries(self):
+        """[(mtime, size, path)] của các entry, cũ nhất trước."""
+        out = []
+        if not self.root.exists():
+            return out
+        for entry in self.root.iterdir():
+            result_file = entry / "result.json"
+            if entry.name.startswith(".") or not result_file.exists():
+                continue
+            out.append((result_file.stat().st_mtime, _dir_size(entry), entry))
+        out.sort(key=lambda e: e[0])
+        return out
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+    def invalidate(self, stale_models_only: bool = False) -> int:
+        """Xóa tất cả entry, hoặc chỉ entry tạo bằng weights khác weights hiện tại."""
+        current = self.model_hashes() if stale_models_only else None
+        removed = 0
+        with self._lock:
+            for _, _, entry in self._entries():
+                if stale_models_only:
+                    try:
+                        meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+                    except (FileNotFoundError, ValueError):
+                        meta = {}
+                    if meta.get("models") == current and meta.get("version") == CACHE_VERSION:
+                        continue
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.info(f"🧹 Invalidated {removed} cache entries")
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._entries()
+            total = self.hits + self.misses
+            return {
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / total, 4) if total else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+def _link_or_copy(src: Path, dst: Path):
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)   # khác filesystem / không hỗ trợ hard link
@@ -8,6 +8,21 @@ class ProcessRequest(BaseModel):
     simulationId: str
     userId: str
 
+class ImagesRequest(BaseModel):
+    filepaths: List[str]              # JPEG / PNG (config IMAGE_EXTENSIONS), tối đa IMAGE_MAX_FILES
+    vehicleId: str
+    simulationId: str
+    userId: str
+    annotate: bool = False            # ghi ảnh đã vẽ box vào Processed/images/simulation_<id>/
+
+class LiveRequest(BaseModel):
+    url: str                          # rtsp://, http(s):// (MJPEG), ... (config LIVE_URL_SCHEMES)
+    vehicleId: str
+    simulationId: str
+    userId: str
+    durationS: Optional[float] = None # None = tới khi stream kết thúc / DELETE /jobs/{id}
+    maxFrames: Optional[int] = None
+
 class SensorData(BaseModel):
     vehicleId: str
     simulationId: str
@@ -35,3 +50,34 @@ class ProcessResponse(BaseModel):
     sensorData: List[SensorData]
     alerts: List[Alert]
     videoUrl: Optional[str]
+
+class ImageResult(BaseModel):
+    index: int
+    image: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    objects: List[dict] = []          # cls, name, conf, dist (xe), bbox, warn, ...
+    signs: List[dict] = []
+    alerts: List[Alert] = []
+    imageUrl: Optional[str] = None
+    error: Optional[str] = None       # ảnh không decode được
+
+class ImagesResponse(BaseModel):
+    status: str
+    summary: dict
+    sensorData: List[SensorData]
+    alerts: List[Alert]
+    images: List[ImageResult]
+    videoUrl: Optional[str] = None
+
+class JobStatus(BaseModel):
+    jobId: str
+    simulationId: str
+    status: str                       # queued | running | completed | failed | cancelled
+    framesDone: int = 0
+    totalFrames: int = 0
+    fps: float = 0.0
+    error: Optional[str] = None
+    createdAt: float
+    startedAt: Optional[float] = None
+    finishedAt: Optional[float] = None
@@ -1,9 +1,99 @@
 from pathlib import Path
-import os, subprocess
+import os, shutil, subprocess, tempfile
+import numpy as np
+from config.config import FFMPEG_PRESET, FFMPEG_CRF, FFMPEG_THREADS
 from utils.logger import get_logger
 
 logger = get_logger("video_utils")
 
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def final_video_path(simulation_id: str, output_dir: Path) -> Path:
+    return Path(output_dir) / f"simulation_{simulation_id}.mp4"
+
+
+def video_url(video: Path) -> str:
+    """Đường dẫn web (frontend) tới video trong VIDEOS_DIR."""
+    return f"/Processed/videos/{Path(video).name}"
+
+
+class FFmpegPipeWriter:
+    """
+    Ghi frame BGR thẳng vào stdin của ffmpeg (libx264, faststart) -> khi frame cuối
+    được ghi xong thì file H.264 final cũng xong, không cần file mp4v tạm + convert lại.
+    Cùng interface với cv2.VideoWriter (write / isOpened / release) để dùng với FrameEncoder.
+    """
+    def __init__(self, path, fps: float, size, preset: str = FFMPEG_PRESET,
+                 crf: int = FFMPEG_CRF, threads: int = FFMPEG_THREADS):
+        self.path = Path(path)
+        self.size = tuple(size)
+        W, H = self.size
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error", "-nostdin",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{W}x{H}", "-r", f"{fps:g}", "-i", "-",
+            "-vcodec", "libx264",
+            "-preset", preset,
+            "-crf", str(crf),
+            "-threads", str(threads),
+            "-pix_fmt", "yuv420p",   # browser chỉ phát được 4:2:0
+        ]
+        if W % 2 or H % 2:
+            cmd += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]   # yuv420p cần kích thước chẵn
+        cmd += ["-movflags", "+faststart", str(self.path)]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # file cũ có thể là hard link vào result cache -> unlink thay vì ghi đè lên cùng inode
+        self.path.unlink(missing_ok=True)
+        # stderr ra file tạm: PIPE không đọc có thể đầy buffer và treo ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+        self._closed = False
+
+    def isOpened(self) -> bool:
+        return not self._closed and self.proc.poll() is None
+
+    def _error(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode(errors="ignore").strip()
+
+    def write(self, frame):
+        if frame.shape[1::-1] != self.size:
+            raise ValueError(f"Frame size {frame.shape[1::-1]} != writer size {self.size}")
+        try:
+            self.proc.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, ValueError):
+            self.proc.wait()
+            raise RuntimeError(f"ffmpeg exited early: {self._error()}")
+
+    def release(self):
+        """Đóng stdin và chờ ffmpeg ghi xong (moov atom cho faststart). Raise nếu ffmpeg lỗi."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        code = self.proc.wait()
+        err = self._error()
+        self._stderr.close()
+        if code != 0:
+            self.path.unlink(missing_ok=True)
+            raise RuntimeError(f"ffmpeg encoding failed ({code}): {err}")
+        logger.info(f"✅ Encoded {self.path}")
+
+    def abort(self):
+        """Dừng giữa chừng: kill ffmpeg + xóa file dở dang."""
+        if not self._closed:
+            self._closed = True
+            self.proc.kill()
+            self.proc.wait()
+            self._stderr.close()
+        self.path.unlink(missing_ok=True)
+
 def finalize_video(simulation_id: str, tmp_video: Path, output_dir: Path):
     """
     Nhận video tạm (mp4v) từ OpenCV, convert sang H.264 để phát frontend.
@@ -18,7 +108,7 @@ def finalize_video(simulation_id: str, tmp_video: Path, output_dir: Path):
     """
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    final_video = output_dir / f"simulation_{simulation_id}.mp4"
+    final_video = final_video_path(simulation_id, output_dir)
 
     if not tmp_video.exists():
         logger.error(f"Tmp video {tmp_video} not found!")
@@ -26,6 +116,7 @@ def finalize_video(simulation_id: str, tmp_video: Path, output_dir: Path):
 
     # convert sang H.264 MP4 bằng ffmpeg
     try:
+        final_video.unlink(missing_ok=True)  # có thể là hard link vào result cache
         cmd = [
             "ffmpeg", "-y",
             "-i", str(tmp_video),
@@ -46,7 +137,7 @@ def finalize_video(simulation_id: str, tmp_video: Path, output_dir: Path):
             logger.warning(f"Không xóa được tmp video: {e}")
 
         # Trả về path để frontend load
-        return f"/Processed/videos/simulation_{simulation_id}.mp4"
+        return video_url(final_video)
 
     except subprocess.CalledProcessError as e:
         logger.error(f"ffmpeg conversion failed: {e.stderr.decode(errors='ignore')}")
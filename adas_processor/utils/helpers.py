@@ -2,3 +2,11 @@ import datetime
 
 def current_timestamp():
     return datetime.datetime.utcnow().isoformat() + "Z"
+
+def timestamp_at(epoch_s):
+    """ISO UTC timestamp của 1 thời điểm (giây, epoch)."""
+    return datetime.datetime.fromtimestamp(epoch_s, datetime.timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+def epoch_of(timestamp):
+    """Ngược lại timestamp_at: ISO UTC ("...Z") -> giây epoch."""
+    return datetime.datetime.fromisoformat(timestamp.rstrip("Z")).replace(tzinfo=datetime.timezone.utc).timestamp()